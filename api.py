@@ -1,13 +1,17 @@
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import HumanMessage
 from langgraph.graph import MessagesState
 from fastapi import Request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +25,84 @@ import os, sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 # workflow chatbot tools
+from agent_rutas.a2a import QueueFullError, TaskWorkerPool, create_task_store, new_task
 from agent_rutas.graph import graph as graph_tools
+from agent_rutas.graph.nodes import model_core
+from agent_rutas.utils.admission import A2A, ADMISSION, CHAT, AdmissionRejected
+from agent_rutas.utils.cache import digest, get_cache
+from agent_rutas.utils.config_cache import CONFIG_CACHE
+from agent_rutas.utils.deadline import deadline_config
+from agent_rutas.utils.metrics import REGISTRY, track_in_flight
+from agent_rutas.utils.profiling import PROFILE_API_ENABLED, maybe_profile, public_report
+from agent_rutas.warmup import WARMUP, WARMUP_ENABLED
+
+# Respuestas finales cacheadas por pregunta normalizada (0 desactiva)
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "60"))
+
+
+def answer_cache_key(question: str) -> str:
+    """Cache key of a question: model plus lower-cased, whitespace-normalized text."""
+    return digest(model_core, " ".join(question.lower().split()))
+
+
+def get_cached_answer(question: str) -> Optional[str]:
+    """Return the cached final answer for ``question``, if any."""
+    if ANSWER_CACHE_TTL_SECONDS <= 0:
+        return None
+    return get_cache().get("answer", answer_cache_key(question))
+
+
+def store_answer(question: str, answer: str, degraded: bool = False):
+    """Cache a non-empty final answer for ``question`` (never a partial or stale one)."""
+    if answer and not degraded and ANSWER_CACHE_TTL_SECONDS > 0:
+        get_cache().set("answer", answer_cache_key(question), answer, ANSWER_CACHE_TTL_SECONDS)
+
+
+def final_answer(result: dict) -> Tuple[str, bool]:
+    """Last message content of a graph run and whether the graph flagged it as degraded."""
+    bot_answer = ""
+    for msg in result.get("messages", []):
+        if hasattr(msg, "content"):
+            bot_answer = msg.content
+    return bot_answer, bool(result.get("degraded"))
+
+
+def run_graph(question: str, deadline: Optional[float] = None) -> Tuple[str, bool]:
+    """Run the graph for ``question`` within ``deadline``; return the answer and its degraded flag."""
+    result = graph_tools.invoke(
+        MessagesState(messages=[HumanMessage(content=question)]),
+        config=deadline_config(deadline),
+    )
+    return final_answer(result)
+
+
+def answer_task(task: dict) -> str:
+    """Answer an A2A task (cached answers are reused; graph runs go through admission)."""
+    question = task["messages"][0]["parts"][0]["text"]
+    bot_answer = get_cached_answer(question)
+    if bot_answer is not None:
+        return bot_answer
+    deadline = (task.get("metadata") or {}).get("deadline") or ADMISSION.default_deadline(A2A)
+    with ADMISSION.admit_sync(A2A, deadline), track_in_flight("a2a-worker"):
+        bot_answer, degraded = run_graph(question, deadline)
+    store_answer(question, bot_answer, degraded)
+    return bot_answer
+
+
+def client_deadline(deadline_ms: Optional[int], request_class: str) -> float:
+    """Absolute deadline from the client's relative budget in milliseconds."""
+    if deadline_ms is not None and deadline_ms > 0:
+        return time.time() + deadline_ms / 1000
+    return ADMISSION.default_deadline(request_class)
+
+
+def overloaded(e: AdmissionRejected) -> HTTPException:
+    """503 with Retry-After for a rejected request."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+# Cola de tareas A2A: tasks/send encola y un pool acotado de workers la procesa
+TASK_POOL = TaskWorkerPool(create_task_store(), handler=answer_task)
 
 # Definición de Agent Card para protocolo A2A
 AGENT_CARD = {
@@ -31,7 +112,10 @@ AGENT_CARD = {
     "version": "1.0",
     "capabilities": {
         "streaming": False,
-        "pushNotifications": False
+        "pushNotifications": False,
+        "stateTransitionHistory": False,
+        "asyncTasks": True,
+        "methods": ["tasks/send", "tasks/get", "tasks/cancel"],
     }
 }
 
@@ -51,6 +135,31 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def warmup_config_cache():
+    """Prefetch the SSM parameters and secrets listed in CONFIG_PREFETCH_* env vars."""
+    CONFIG_CACHE.warmup()
+
+
+@app.on_event("startup")
+async def start_warmup():
+    """Prime the route snapshot and the model connection in the background (see /ready)."""
+    if WARMUP_ENABLED:
+        WARMUP.start()
+
+
+@app.on_event("startup")
+async def start_task_pool():
+    """Start the A2A workers (and resume tasks left pending in the SQLite store)."""
+    TASK_POOL.start()
+
+
+@app.on_event("shutdown")
+async def stop_task_pool():
+    """Let the A2A workers finish their current task."""
+    TASK_POOL.stop()
+
+
 class ChatRequest(BaseModel):
     input_question: str = Field(
         description="Question to ask the chatbot about routes in Neuquén.",
@@ -98,26 +207,56 @@ class ChatResponse(BaseModel):
     description="Send a question about routes and get a response from the AI",
     tags=["Chatbot"],
 )
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    x_profile: Optional[str] = Header(
+        default=None,
+        description="Optional: set to '1' to profile this request (flamegraph + top allocations written to PROFILE_DIR). Ignored unless PROFILE_API_ENABLED=1.",
+    ),
+    x_deadline_ms: Optional[int] = Header(
+        default=None,
+        description="Optional: milliseconds the client will wait. Requests that cannot finish in time are rejected early with 503.",
+    ),
+):
     """Process chat request and return response"""
     try:
         logger.info(f"Processing request for user: {request.user_id}")
         
-        # Create the initial state with the user's question
-        initial_state = MessagesState(messages=[
-            SystemMessage(content="Eres un asistente especializado en informar sobre el estado de las rutas de la provincia de Neuquén."),
-            HumanMessage(content=request.input_question)
-        ])
-        
-        # Process the message through the graph
-        messages = graph_tools.invoke(initial_state)
-        
-        # Extract the bot's answer from the messages
-        # The last message should be the assistant's response
-        bot_answer = ""
-        for msg in messages["messages"]:
-            if hasattr(msg, "content"):
-                bot_answer = msg.content
+        profile_enabled = (
+            PROFILE_API_ENABLED and x_profile is not None and x_profile.lower() in ("1", "true", "yes")
+        )
+        # Identical questions are answered from the shared cache (not when profiling)
+        bot_answer = None if profile_enabled else get_cached_answer(request.input_question)
+        cached = bot_answer is not None
+        degraded = False
+        messages = {}
+        profile_report = {}
+        if not cached:
+            # Create the initial state with the user's question
+            # The graph nodes add the system prompt (resolved by PROMPT_REGISTRY)
+            initial_state = MessagesState(messages=[
+                HumanMessage(content=request.input_question)
+            ])
+            # The deadline travels in the graph config to every node, tool and LLM call
+            deadline = client_deadline(x_deadline_ms, CHAT)
+
+            def run():
+                with track_in_flight("/api/chat"), maybe_profile(
+                    profile_enabled, label=f"chat-{request.user_id}"
+                ) as report:
+                    return graph_tools.invoke(initial_state, config=deadline_config(deadline)), report
+
+            # Process the message through the graph once admitted (off the event loop)
+            try:
+                async with ADMISSION.admit(CHAT, deadline):
+                    messages, profile_report = await run_in_threadpool(run)
+            except AdmissionRejected as e:
+                raise overloaded(e)
+
+            # Extract the bot's answer from the messages
+            # The last message should be the assistant's response
+            bot_answer, degraded = final_answer(messages)
+            store_answer(request.input_question, bot_answer, degraded)
         
         # Prepare the response
         response = ChatResponse(
@@ -130,12 +269,17 @@ async def chat(request: ChatRequest):
             answer_details={},
             metadata={
                 "model_used": request.llm_model_core,
-                "timestamp": messages.get("timestamp", "")
+                "timestamp": messages.get("timestamp", ""),
+                "cached": cached,
+                "degraded": degraded,
+                **({"profile": public_report(profile_report)} if profile_enabled else {}),
             }
         )
         
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing chat request for user {request.user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -147,43 +291,91 @@ async def get_agent_card():
     return AGENT_CARD
 
 
+# Códigos de error JSON-RPC 2.0 usados por los endpoints A2A
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_PARAMS = -32602
+
+
+def jsonrpc_error(code: int, message: str, request_id=None) -> JSONResponse:
+    """400 con un error JSON-RPC (``{"jsonrpc", "id", "error": {"code", "message"}}``)."""
+    return JSONResponse(
+        status_code=400,
+        content={"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}},
+    )
+
+
+def task_params_error(task_request) -> Optional[str]:
+    """Return why a tasks/send payload is invalid, or ``None`` if it can be queued."""
+    if not isinstance(task_request, dict):
+        return "La solicitud debe ser un objeto JSON"
+    task_id = task_request.get("id")
+    if not isinstance(task_id, str) or not task_id:
+        return "Falta el id de la tarea"
+    message = task_request.get("message")
+    parts = message.get("parts") if isinstance(message, dict) else None
+    if not isinstance(parts, list) or not parts or not isinstance(parts[0], dict):
+        return "Formato de solicitud inválido: falta message.parts"
+    if not isinstance(parts[0].get("text"), str):
+        return "Formato de solicitud inválido: el primer part debe tener 'text'"
+    metadata = task_request.get("metadata")
+    if metadata is not None and not isinstance(metadata, dict):
+        return "metadata debe ser un objeto"
+    deadline_ms = (metadata or {}).get("deadline_ms")
+    if deadline_ms is not None and (isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float))):
+        return "metadata.deadline_ms debe ser un número"
+    return None
+
+
 @app.post("/tasks/send")
 async def handle_task(request: Request):
-    """Endpoint A2A para recibir tareas (tasks/send) y responder siguiendo el protocolo Google A2A"""
+    """Endpoint A2A tasks/send: encola la tarea y responde de inmediato con su estado (submitted).
+
+    El resultado se consulta con tasks/get. Reenviar el mismo id devuelve la tarea existente.
+    Una solicitud mal formada recibe un error JSON-RPC (invalid params).
+    """
     try:
         task_request = await request.json()
-        task_id = task_request.get("id")
-        # Extraer mensaje de usuario (primer TextPart)
-        try:
-            user_message = task_request["message"]["parts"][0]["text"]
-        except Exception:
-            raise HTTPException(status_code=400, detail="Formato de solicitud inválido")
-        # Procesar con LangGraph
-        initial_state = MessagesState(messages=[
-            SystemMessage(content="Eres un asistente especializado en informar sobre el estado de las rutas de la provincia de Neuquén."),
-            HumanMessage(content=user_message)
-        ])
-        messages = graph_tools.invoke(initial_state)
-        # Extraer respuesta del agente
-        bot_answer = ""
-        for msg in messages.get("messages", []):
-            if hasattr(msg, "content"):
-                bot_answer = msg.content
-        # Construir respuesta en formato Task
-        response_task = {
-            "id": task_id,
-            "status": {"state": "completed"},
-            "messages": [
-                task_request.get("message", {}),
-                {"role": "agent", "parts": [{"text": bot_answer}]}
-            ]
-        }
-        return response_task
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error en /tasks/send: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError:
+        return jsonrpc_error(JSONRPC_PARSE_ERROR, "JSON inválido")
+    error = task_params_error(task_request)
+    if error:
+        request_id = task_request.get("id") if isinstance(task_request, dict) else None
+        return jsonrpc_error(JSONRPC_INVALID_PARAMS, error, request_id)
+    task_id = task_request["id"]
+    task = new_task(task_id, task_request["message"], task_request.get("sessionId"))
+    # Plazo opcional del cliente (metadata.deadline_ms), usado por el control de admisión
+    deadline_ms = (task_request.get("metadata") or {}).get("deadline_ms")
+    task["metadata"] = {"deadline": client_deadline(deadline_ms, A2A)}
+    try:
+        return TASK_POOL.submit(task)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def _task_id(request: Request) -> str:
+    body = await request.json()
+    task_id = body.get("id") if isinstance(body, dict) else None
+    if not task_id:
+        raise HTTPException(status_code=400, detail="Falta el id de la tarea")
+    return task_id
+
+
+@app.post("/tasks/get")
+async def get_task(request: Request):
+    """Endpoint A2A tasks/get: devuelve el estado (y la respuesta, si terminó) de una tarea"""
+    task = TASK_POOL.get(await _task_id(request))
+    if task is None:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return task
+
+
+@app.post("/tasks/cancel")
+async def cancel_task(request: Request):
+    """Endpoint A2A tasks/cancel: cancela una tarea encolada o en curso"""
+    task = TASK_POOL.cancel(await _task_id(request))
+    if task is None:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return task
 
 
 @app.get("/health")
@@ -195,6 +387,24 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for traffic: 200 once the startup warmup finished, 503 while it runs.
+
+    The body reports the state of each component (snapshot, semantic_index, llm, prompt_prefix).
+    """
+    if not WARMUP_ENABLED:
+        return {"ready": True, "components": {}}
+    report = WARMUP.report()
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Expose Prometheus metrics for graph nodes, tools, fetcher and LLM calls"""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
 
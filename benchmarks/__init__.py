@@ -0,0 +1 @@
+"""Offline benchmark suite for the routes agent."""
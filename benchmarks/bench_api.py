@@ -0,0 +1,66 @@
+"""API throughput and latency percentiles under concurrent in-process load."""
+import asyncio
+import time
+
+from .common import summarize
+from .offline import set_pdf_content
+
+
+async def _load(app, total, concurrency, payload):
+    """Send ``total`` chat requests keeping ``concurrency`` in flight."""
+    import httpx
+
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/chat", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def run(fixtures, requests_per_level=200, concurrency_levels=(1, 8, 32)):
+    """
+    Drive ``/api/chat`` through an in-process ASGI client.
+
+    Args:
+        fixtures (list[dict]): Output of ``fixtures.load_fixtures()``; the
+            largest fixture is served to the tool.
+        requests_per_level (int): Requests sent at each concurrency level.
+        concurrency_levels (tuple[int]): Concurrent in-flight requests.
+
+    Returns:
+        dict: Throughput, error count and latency percentiles per level.
+    """
+    from api import app
+
+    fixture = max(fixtures, key=lambda f: len(f["content"]))
+    set_pdf_content(fixture["content"])
+    code = fixture["codes"][0] if fixture["codes"] else "P001"
+    payload = {
+        "input_question": f"¿Cuál es el estado de la ruta {code}?",
+        "user_id": "benchmark",
+    }
+
+    results = {"fixture": fixture["name"], "levels": {}}
+    for concurrency in concurrency_levels:
+        latencies, errors, elapsed = asyncio.run(
+            _load(app, requests_per_level, concurrency, payload)
+        )
+        stats = summarize(latencies)
+        stats["errors"] = errors
+        stats["throughput_rps"] = len(latencies) / elapsed if elapsed else 0.0
+        results["levels"][str(concurrency)] = stats
+    return results
@@ -0,0 +1,42 @@
+"""End-to-end graph latency with the local fake LLM provider."""
+from .common import measure, summarize
+from .offline import set_pdf_content
+
+QUESTIONS = [
+    "¿Cuál es el estado de la ruta {code}?",
+    "¿Qué rutas hay disponibles?",
+    "¿Cómo está el camino a Villa La Angostura?",
+]
+
+
+def run(fixtures, repeat=20):
+    """
+    Time ``graph.invoke`` for a few representative questions per fixture.
+
+    Args:
+        fixtures (list[dict]): Output of ``fixtures.load_fixtures()``.
+        repeat (int): Iterations per question.
+
+    Returns:
+        dict: Results keyed by fixture name, then by question.
+    """
+    from langchain_core.messages import HumanMessage
+    from langgraph.graph import MessagesState
+
+    from agent_rutas.graph import graph
+
+    results = {}
+    for fixture in fixtures:
+        set_pdf_content(fixture["content"])
+        sample_code = fixture["codes"][0] if fixture["codes"] else "P001"
+        entry = {}
+        for template in QUESTIONS:
+            question = template.format(code=sample_code)
+
+            def invoke():
+                return graph.invoke(MessagesState(messages=[HumanMessage(content=question)]))
+
+            invoke()  # warm up compiled graph and imports
+            entry[question] = summarize(measure(invoke, repeat))
+        results[fixture["name"]] = entry
+    return results
@@ -0,0 +1,79 @@
+"""Compare the PDF extraction backends: speed, memory and route segmentation."""
+import tracemalloc
+
+from .common import measure, summarize
+
+
+def _segmentation(snapshot, expected):
+    """Share of the expected routes found, spurious codes, and parsed statuses."""
+    found = set(snapshot.records)
+    expected = set(expected)
+    return {
+        "routes": len(found),
+        "recall": len(found & expected) / len(expected) if expected else 1.0,
+        "spurious": len(found - expected),
+        "with_status": sum(1 for record in snapshot.records.values() if record.estado),
+    }
+
+
+def _peak_bytes(func):
+    """Peak Python heap allocated by ``func`` (native allocations are not traced)."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(fixtures, repeat=20):
+    """
+    Time text and row extraction per installed backend and fixture.
+
+    Segmentation is scored against the fixture's route codes; recorded
+    fixtures (codes unknown) are scored against the PyPDF2 output, the
+    historical reference.
+
+    Args:
+        fixtures (list[dict]): Output of ``fixtures.load_fixtures()``.
+        repeat (int): Iterations per measurement.
+
+    Returns:
+        dict: Results keyed by backend, then fixture name.
+    """
+    from agent_rutas.tools.parte_diario import parse_snapshot, rows_text
+    from agent_rutas.tools.pdf_backends import available_backends, get_pdf_backend
+
+    backends = available_backends()
+    references = {}
+    for fixture in fixtures:
+        if fixture["codes"] is not None:
+            references[fixture["name"]] = fixture["codes"]
+        elif "pypdf2" in backends:
+            text = get_pdf_backend("pypdf2").text(fixture["content"])
+            references[fixture["name"]] = list(parse_snapshot(text).records)
+        else:
+            references[fixture["name"]] = []
+
+    results = {}
+    for name in backends:
+        backend = get_pdf_backend(name)
+        entry = {}
+        for fixture in fixtures:
+            content = fixture["content"]
+            # Warm-up: first call pays imports and native library loading
+            text = backend.text(content)
+            rows = backend.rows(content)
+            entry[fixture["name"]] = {
+                "text": summarize(measure(lambda: backend.text(content), repeat)),
+                "rows": summarize(measure(lambda: backend.rows(content), repeat)),
+                "pages": len(backend.pages(content)),
+                "table_rows": len(rows),
+                "python_peak_bytes": _peak_bytes(lambda: backend.text(content)),
+                "segmentation": _segmentation(parse_snapshot(text), references[fixture["name"]]),
+                "row_segmentation": _segmentation(
+                    parse_snapshot(rows_text(rows), rows), references[fixture["name"]]
+                ),
+            }
+        results[name] = entry
+    return results
@@ -0,0 +1,54 @@
+"""Parse and query benchmark for ``buscar_estado_rutas`` on ParteDiario fixtures."""
+from .common import measure, summarize
+from .offline import set_pdf_content
+
+QUERIES = {
+    "code": "estado de la ruta {code}",
+    "descriptive": "villa la angostura",
+    "listing": "rutas disponibles",
+    "general": "cómo están las rutas hoy",
+    "status": "rutas cortadas",
+}
+
+
+def run(fixtures, repeat=20):
+    """
+    Time extraction (text and layout rows), route segmentation, record parsing and tool queries per fixture.
+
+    Args:
+        fixtures (list[dict]): Output of ``fixtures.load_fixtures()``.
+        repeat (int): Iterations per measurement.
+
+    Returns:
+        dict: Results keyed by fixture name.
+    """
+    from agent_rutas.tools import buscar_estado_rutas
+    from agent_rutas.tools.parte_diario import extract_layout, extract_text, parse_routes, parse_snapshot
+
+    results = {}
+    for fixture in fixtures:
+        content = fixture["content"]
+        full_text, rows = extract_layout(content)
+        _, codes, _ = parse_routes(full_text, rows)
+        entry = {
+            "pdf_bytes": len(content),
+            "routes": len(codes),
+            "expected_routes": len(fixture["codes"]) if fixture["codes"] is not None else None,
+            "extract_text": summarize(measure(lambda: extract_text(content), repeat)),
+            "extract_layout": summarize(measure(lambda: extract_layout(content), repeat)),
+            "parse_routes": summarize(measure(lambda: parse_routes(full_text, rows), repeat)),
+            "parse_snapshot": summarize(measure(lambda: parse_snapshot(full_text, rows), repeat)),
+            "queries": {},
+        }
+        set_pdf_content(content)
+        sample_code = codes[len(codes) // 2] if codes else "P000"
+        for name, template in QUERIES.items():
+            query = template.format(code=sample_code)
+            output = buscar_estado_rutas.invoke({"query": query})
+            stats = summarize(
+                measure(lambda: buscar_estado_rutas.invoke({"query": query}), repeat)
+            )
+            stats["output_chars"] = len(output)
+            entry["queries"][name] = stats
+        results[fixture["name"]] = entry
+    return results
@@ -0,0 +1,50 @@
+"""Shared helpers for the offline benchmarks."""
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Make the local package and api.py importable without installing
+for path in (os.path.join(ROOT_DIR, "src"), ROOT_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` (nearest-rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """
+    Summarize latency samples given in seconds.
+
+    Returns:
+        dict: Count plus mean/min/p50/p90/p99/max in milliseconds.
+    """
+    ms = [s * 1000.0 for s in samples]
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "min_ms": min(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p90_ms": percentile(ms, 90),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else 0.0,
+    }
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return the per-call durations."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
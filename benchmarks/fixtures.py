@@ -0,0 +1,153 @@
+"""
+ParteDiario fixtures for the offline benchmarks.
+
+Recorded PDFs dropped into ``benchmarks/fixtures/`` are used as-is. When
+that directory is empty, synthetic PDFs mimicking the DPV layout are
+generated deterministically (fixed seed) at a few sizes so every run
+measures the same input.
+"""
+import glob
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SYNTHETIC_SIZES = (20, 100, 400)
+
+_LOCALIDADES = [
+    "Neuquén", "Centenario", "Plottier", "Zapala", "Cutral Có", "Plaza Huincul",
+    "Chos Malal", "Junín de los Andes", "San Martín de los Andes",
+    "Villa La Angostura", "Aluminé", "Loncopué", "Las Lajas", "Andacollo",
+    "Piedra del Águila", "Rincón de los Sauces", "Añelo", "Picún Leufú",
+    "Primeros Pinos", "Caviahue", "Copahue", "El Huecú", "Buta Ranquil",
+]
+_ESTADOS = [
+    "TRANSITABLE",
+    "TRANSITABLE CON PRECAUCIÓN",
+    "INTRANSITABLE",
+    "CORTADA",
+    "TRANSITABLE CON CADENAS",
+]
+_OBSERVACIONES = [
+    "Calzada con hielo en sectores.",
+    "Presencia de nieve en banquinas.",
+    "Obras en ejecución, circular con precaución.",
+    "Calzada de ripio en buen estado.",
+    "Paso habilitado de 8 a 18 hs.",
+    "Sin novedades.",
+    "Viento intenso en la zona.",
+    "Niebla en sectores, circular con luces encendidas.",
+]
+
+_LINES_PER_PAGE = 60
+
+
+def synthetic_route_lines(n_routes, seed=0):
+    """
+    Build the text lines of a synthetic ParteDiario.
+
+    Args:
+        n_routes (int): Number of route entries.
+        seed (int): Seed for the deterministic generator.
+
+    Returns:
+        tuple[list[str], list[str]]: PDF text lines and route codes in order.
+    """
+    rng = random.Random(seed)
+    lines = [
+        "DIRECCIÓN PROVINCIAL DE VIALIDAD - NEUQUÉN",
+        "PARTE DIARIO DE RUTAS",
+        "Información Actualizada a las 08:30hs. del 19/10/2026",
+    ]
+    codes = []
+    for i in range(n_routes):
+        prefix = "N" if i % 7 == 0 else "P"
+        code = f"{prefix}{(i * 3 + 1) % 1000:03d}"
+        if code in codes:
+            continue
+        codes.append(code)
+        origen, destino = rng.sample(_LOCALIDADES, 2)
+        lines.append(f"{code} Tramo: {origen} - {destino}")
+        lines.append(f"Estado: {rng.choice(_ESTADOS)}")
+        lines.append(f"Observaciones: {rng.choice(_OBSERVACIONES)}")
+    return lines, codes
+
+
+def _pdf_escape(text):
+    """Escape ``text`` for a PDF literal string encoded as Latin-1."""
+    raw = text.encode("latin-1", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def build_pdf(lines):
+    """
+    Render ``lines`` into a minimal multi-page PDF using Helvetica.
+
+    Args:
+        lines (list[str]): Text lines, one per row.
+
+    Returns:
+        bytes: PDF document.
+    """
+    pages = [lines[i:i + _LINES_PER_PAGE] for i in range(0, len(lines), _LINES_PER_PAGE)] or [[]]
+    # Object numbers: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    objects = {}
+    kids = []
+    for idx, page_lines in enumerate(pages):
+        page_num = 4 + idx * 2
+        content_num = page_num + 1
+        kids.append(f"{page_num} 0 R")
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td\n"
+        for line in page_lines:
+            stream += b"(" + _pdf_escape(line) + b") Tj T*\n"
+        stream += b"ET"
+        objects[content_num] = (
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream"
+        )
+        objects[page_num] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_num} 0 R >>"
+        ).encode()
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += f"{num} 0 obj\n".encode() + objects[num] + b"\nendobj\n"
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for num in range(1, size):
+        out += f"{offsets[num]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return out
+
+
+def load_fixtures():
+    """
+    Return the ParteDiario fixtures to benchmark.
+
+    Returns:
+        list[dict]: One entry per fixture with ``name``, ``content`` (PDF
+        bytes) and ``codes`` (expected route codes, ``None`` when unknown
+        because the fixture is a recording).
+    """
+    recorded = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.pdf")))
+    if recorded:
+        fixtures = []
+        for path in recorded:
+            with open(path, "rb") as f:
+                fixtures.append(
+                    {"name": os.path.basename(path), "content": f.read(), "codes": None}
+                )
+        return fixtures
+
+    fixtures = []
+    for size in SYNTHETIC_SIZES:
+        lines, codes = synthetic_route_lines(size, seed=size)
+        fixtures.append(
+            {"name": f"synthetic-{size}", "content": build_pdf(lines), "codes": codes}
+        )
+    return fixtures
@@ -0,0 +1,45 @@
+"""
+Offline wiring for the benchmarks.
+
+Importing the graph normally builds a real provider client and every tool
+call downloads the live ParteDiario. ``setup_offline`` pins the graph to the
+local ``fake-instant`` model before those imports and replays the ParteDiario
+from a fixture (``ReplaySource``), so runs need no network. The cache backend is disabled so
+repeated queries measure the real work instead of cache hits.
+"""
+import os
+
+from . import common  # noqa: F401  (sets up sys.path)
+
+BENCHMARK_MODEL = "fake-instant"
+
+
+def setup_offline(pdf_content):
+    """
+    Prepare the agent for offline runs.
+
+    Args:
+        pdf_content (bytes): ParteDiario PDF served to the tool.
+
+    Returns:
+        module: The ``agent_rutas.graph.nodes`` module.
+    """
+    import dotenv
+
+    # A developer .env must not redirect the benchmark to a real provider
+    dotenv.load_dotenv = lambda *args, **kwargs: False
+    os.environ["MODEL_CORE"] = BENCHMARK_MODEL
+
+    from agent_rutas.graph import nodes
+
+    set_pdf_content(pdf_content)
+    return nodes
+
+
+def set_pdf_content(pdf_content, latency_ms=0):
+    """Replay ``pdf_content`` to ``buscar_estado_rutas`` instead of downloading."""
+    from agent_rutas.tools.sources import ReplaySource, set_source
+    from agent_rutas.utils.cache import NullCache, set_cache
+
+    set_cache(NullCache())
+    set_source(ReplaySource(contents=[pdf_content], latency_ms=latency_ms))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Run the offline benchmark suite and write the results as JSON.
+
+Usage:
+  python -m benchmarks.run
+  python -m benchmarks.run --suite tool --repeat 50 --output results.json
+  python -m benchmarks.run --suite pdf    # compare PDF extraction backends
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from .common import ROOT_DIR
+from .fixtures import load_fixtures
+from .offline import setup_offline
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SUITES = ("tool", "graph", "api", "pdf")
+
+
+def _git_commit():
+    """Return the current commit hash, or ``"unknown"`` outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline del agente de rutas.")
+    parser.add_argument(
+        "--suite", choices=SUITES, action="append", help="Suite a ejecutar (por defecto todas)"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Iteraciones por medición")
+    parser.add_argument(
+        "--api-requests", type=int, default=200, help="Requests por nivel de concurrencia"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Niveles de concurrencia para la suite api",
+    )
+    parser.add_argument(
+        "--output", default=None, help="Archivo JSON de salida (por defecto results/<commit>.json)"
+    )
+    args = parser.parse_args()
+    suites = args.suite or list(SUITES)
+
+    # Per-request INFO logs would dominate the API measurements
+    logging.disable(logging.INFO)
+
+    fixtures = load_fixtures()
+    setup_offline(fixtures[0]["content"])
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": [f["name"] for f in fixtures],
+        "results": {},
+    }
+    if "tool" in suites:
+        from . import bench_tool
+
+        report["results"]["tool"] = bench_tool.run(fixtures, repeat=args.repeat)
+    if "graph" in suites:
+        from . import bench_graph
+
+        report["results"]["graph"] = bench_graph.run(fixtures, repeat=args.repeat)
+    if "pdf" in suites:
+        from . import bench_pdf
+
+        report["results"]["pdf"] = bench_pdf.run(fixtures, repeat=args.repeat)
+    if "api" in suites:
+        from . import bench_api
+
+        report["results"]["api"] = bench_api.run(
+            fixtures,
+            requests_per_level=args.api_requests,
+            concurrency_levels=tuple(args.concurrency),
+        )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados escritos en {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
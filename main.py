@@ -3,33 +3,237 @@
 CLI script to query the agent_rutas chatbot.
 Usage:
   python main.py --question "¿Cuál es el estado de la ruta P040?"
+  python main.py --question "¿Cuál es el estado de la ruta P040?" --profile
+  python main.py --batch preguntas.txt --parallel 8 --output resultados.jsonl
+  cat preguntas.jsonl | python main.py --batch -
+  python main.py --question "¿Rutas cortadas?" --source replay --archive parte_diario_archive
 """
 import os
 import sys
+import json
+import time
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
 # Asegurar que el paquete src esté en el path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from agent_rutas.graph import graph
+from agent_rutas.tools.sources import PARTE_DIARIO_ARCHIVE, PARTE_DIARIO_SOURCE, create_source, set_source
+from agent_rutas.utils.deadline import deadline_config
+from agent_rutas.utils.profiling import maybe_profile
+
+
+def read_questions(stream):
+    """
+    Read batch questions, one per line.
+
+    A line may be plain text or a JSON object with ``question`` (and an
+    optional ``id``); blank lines are skipped. A malformed line does not stop
+    the batch: it yields an item with ``error`` instead of ``question``.
+
+    Args:
+        stream: Text stream to read.
+
+    Yields:
+        dict: ``{"index", "id", "question"}`` for each question, or
+        ``{"index", "id", "error"}`` for a line that could not be read.
+    """
+    index = 0
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        question_id = None
+        error = None
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+                question_id = item.get("id")
+                question = item["question"]
+            except json.JSONDecodeError as e:
+                question = None
+                error = f"Línea {line_number}: JSON inválido ({e.msg})"
+            except KeyError:
+                question = None
+                error = f"Línea {line_number}: falta el campo 'question'"
+            if error is None and (not isinstance(question, str) or not question.strip()):
+                question = None
+                error = f"Línea {line_number}: 'question' debe ser texto"
+        else:
+            question = line
+        item = {"index": index, "id": question_id if question_id is not None else index}
+        if question is None:
+            item["error"] = error
+        else:
+            item["question"] = question
+        yield item
+        index += 1
+
+
+def usage_totals(messages):
+    """Sum the token usage reported on the AI messages of a run."""
+    totals = {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "llm_calls": 0}
+    for msg in messages:
+        usage = getattr(msg, "usage_metadata", None)
+        if not usage:
+            continue
+        totals["llm_calls"] += 1
+        totals["input_tokens"] += usage.get("input_tokens") or 0
+        totals["output_tokens"] += usage.get("output_tokens") or 0
+        totals["cache_read_tokens"] += (usage.get("input_token_details") or {}).get("cache_read") or 0
+    return totals
+
+
+def answer_question(item, timeout):
+    """Run one batch question through the graph and build its result record."""
+    from langchain_core.messages import HumanMessage
+
+    deadline = time.time() + timeout if timeout > 0 else None
+    start = time.perf_counter()
+    record = {"id": item["id"], "question": item["question"]}
+    try:
+        result = graph.invoke(
+            {"messages": [HumanMessage(content=item["question"])]}, config=deadline_config(deadline)
+        )
+        messages = result.get("messages", [])
+        record["answer"] = messages[-1].content if messages else ""
+        record["tool_rounds"] = result.get("tool_rounds", 0)
+        record["degraded"] = bool(result.get("degraded"))
+        record.update(usage_totals(messages))
+    except Exception as e:
+        record["error"] = str(e)
+    record["latency_seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(source, output, parallel, timeout):
+    """
+    Answer every question from ``source`` with one loaded graph.
+
+    Results are written to ``output`` as JSONL in completion order (each
+    record keeps the input ``id``), so slow questions do not hold back the
+    rest. Questions are read as workers free up (at most ``2 * parallel``
+    in flight), so a large or endless input is not loaded up front. Lines
+    that cannot be read get an ``{"id", "error"}`` record.
+
+    Returns:
+        int: Number of questions that failed.
+    """
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+    failed = total = 0
+    start = time.perf_counter()
+
+    def write(record):
+        nonlocal failed, total
+        total += 1
+        failed += "error" in record
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    try:
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="agent-rutas-batch") as pool:
+            pending = set()
+            for item in read_questions(stream):
+                if "error" in item:
+                    write({"id": item["id"], "error": item["error"]})
+                    continue
+                if len(pending) >= 2 * parallel:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future.result())
+                pending.add(pool.submit(answer_question, item, timeout))
+            for future in as_completed(pending):
+                write(future.result())
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{total} preguntas en {elapsed:.1f}s ({total / elapsed if elapsed else 0:.2f}/s), {failed} con error",
+        file=sys.stderr,
+    )
+    return failed
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Agente de rutas Neuquén: consulta el estado de rutas."
     )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--question", "-q", help="Pregunta para el agente"
+    )
+    source.add_argument(
+        "--batch",
+        "-b",
+        metavar="ARCHIVO",
+        help="Responder en lote las preguntas del archivo ('-' para stdin): una por línea o JSONL con 'question' e 'id'",
+    )
     parser.add_argument(
-        "--question", "-q", required=True, help="Pregunta para el agente"
+        "--output",
+        "-o",
+        default="-",
+        help="Archivo JSONL de resultados del modo lote (por defecto stdout)",
+    )
+    parser.add_argument(
+        "--parallel",
+        "-p",
+        type=int,
+        default=int(os.getenv("BATCH_PARALLELISM", "4")),
+        help="Preguntas procesadas en paralelo en el modo lote",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfilar la ejecución (flamegraph y asignaciones de memoria en PROFILE_DIR)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Directorio de salida del perfilado (por defecto PROFILE_DIR o ./profiles)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=float(os.getenv("REQUEST_DEADLINE_SECONDS", "60")),
+        help="Segundos máximos para responder; al vencer se devuelve una respuesta parcial (0 sin límite)",
+    )
+    parser.add_argument(
+        "--source",
+        choices=("live", "record", "replay"),
+        default=PARTE_DIARIO_SOURCE,
+        help="Origen del parte diario: live (web de la DPV), record (descarga y archiva) o replay (sin red, desde el archivo)",
+    )
+    parser.add_argument(
+        "--archive",
+        default=PARTE_DIARIO_ARCHIVE,
+        help="Directorio (o PDF) del archivo de partes para --source record/replay",
     )
     args = parser.parse_args()
+    set_source(create_source(args.source, args.archive))
+
+    if args.batch:
+        with maybe_profile(args.profile, label="cli-batch", output_dir=args.profile_dir) as report:
+            failed = run_batch(args.batch, args.output, max(1, args.parallel), args.timeout)
+        if args.profile:
+            print(f"Perfil guardado en: {report['folded']} y {report['allocations']}", file=sys.stderr)
+        sys.exit(1 if failed else 0)
 
     # Estado inicial con mensaje de usuario
     from langgraph.graph import MessagesState
     from langchain_core.messages import HumanMessage
 
     initial_state = MessagesState(messages=[HumanMessage(content=args.question)])
+    deadline = time.time() + args.timeout if args.timeout > 0 else None
     # Invocar el grafo y obtener mensajes de respuesta
-    result = graph.invoke(initial_state)
+    with maybe_profile(args.profile, label="cli", output_dir=args.profile_dir) as report:
+        result = graph.invoke(initial_state, config=deadline_config(deadline))
+    if args.profile:
+        print(f"Perfil guardado en: {report['folded']} y {report['allocations']}", file=sys.stderr)
     messages = result.get("messages", [])
     # Imprimir cada mensaje de contenido
     for msg in messages:
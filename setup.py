@@ -16,6 +16,12 @@ setup(
     packages=find_packages(where='src'),
     package_dir={'': 'src'},
     install_requires=load_requirements(),
+    # Optional PDF backends (PDF_BACKEND); PyPDF2 stays the core one
+    extras_require={
+        'fast-pdf': ['pypdfium2'],
+        'pypdf': ['pypdf'],
+        'pdfminer': ['pdfminer.six'],
+    },
     python_requires='>=3.8',
     include_package_data=True,
 )
\ No newline at end of file
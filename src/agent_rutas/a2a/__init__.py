@@ -0,0 +1,14 @@
+"""Asynchronous A2A task subsystem: task stores and the worker pool that drains them."""
+
+from .store import TaskState, InMemoryTaskStore, SQLiteTaskStore, create_task_store, new_task
+from .worker import QueueFullError, TaskWorkerPool
+
+__all__ = [
+    "TaskState",
+    "InMemoryTaskStore",
+    "SQLiteTaskStore",
+    "create_task_store",
+    "new_task",
+    "QueueFullError",
+    "TaskWorkerPool",
+]
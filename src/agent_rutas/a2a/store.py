@@ -0,0 +1,358 @@
+"""
+Task stores for the A2A endpoints.
+
+A task is kept as a plain dict in the A2A ``Task`` shape returned by the
+API::
+
+    {"id": ..., "sessionId": ..., "status": {"state": ..., "timestamp": ...},
+     "messages": [<user message>, <agent message>?], "error": ...}
+
+``InMemoryTaskStore`` keeps tasks in the process. ``SQLiteTaskStore``
+persists them, so tasks that were queued or running when the process
+stopped are picked up again on restart. Both are bounded: past
+``max_tasks`` the oldest finished tasks are evicted first.
+
+Pending tasks carry a lease: the owner (one worker pool) renews it while
+the task is queued or running, and other pools only adopt tasks whose lease
+expired. Several API workers can share one SQLite file without running the
+same task twice.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+A2A_TASK_STORE = os.getenv("A2A_TASK_STORE", "memory").lower()
+A2A_TASK_DB = os.getenv("A2A_TASK_DB", "a2a_tasks.db")
+A2A_MAX_TASKS = int(os.getenv("A2A_MAX_TASKS", "10000"))
+# Lease of a queued or running task; its owner renews it while alive
+A2A_TASK_LEASE_SECONDS = float(os.getenv("A2A_TASK_LEASE_SECONDS", "60"))
+
+
+class TaskState:
+    """A2A task states used by the agent."""
+
+    SUBMITTED = "submitted"
+    WORKING = "working"
+    COMPLETED = "completed"
+    CANCELED = "canceled"
+    FAILED = "failed"
+
+    FINAL = frozenset({COMPLETED, CANCELED, FAILED})
+    PENDING = frozenset({SUBMITTED, WORKING})
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def new_task(task_id, message, session_id=None):
+    """Build the initial task dict for a submitted ``message``."""
+    return {
+        "id": task_id,
+        "sessionId": session_id,
+        "status": {"state": TaskState.SUBMITTED, "timestamp": _now()},
+        "messages": [message],
+    }
+
+
+def apply_transition(task, state, answer=None, error=None):
+    """Return ``task`` moved to ``state`` (with the agent answer or error if given)."""
+    task = dict(task)
+    task["status"] = {"state": state, "timestamp": _now()}
+    if answer is not None:
+        task["messages"] = list(task["messages"][:1]) + [
+            {"role": "agent", "parts": [{"text": answer}]}
+        ]
+    if error is not None:
+        task["error"] = error
+    return task
+
+
+class InMemoryTaskStore:
+    """
+    Thread-safe task store held in the process.
+
+    Args:
+        max_tasks (int): Maximum tasks kept; the oldest finished ones are
+            evicted first.
+        clock (callable): Epoch seconds, used for leases.
+    """
+
+    def __init__(self, max_tasks=A2A_MAX_TASKS, clock=time.time):
+        self.max_tasks = max_tasks
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tasks = OrderedDict()
+        self._leases = {}
+
+    def create(self, task, owner=None, lease=A2A_TASK_LEASE_SECONDS):
+        """
+        Store ``task`` unless its id already exists.
+
+        Args:
+            task (dict): Task from ``new_task``.
+            owner (str): Worker pool that will run it (leased for ``lease`` seconds).
+            lease (float): Lease duration in seconds.
+
+        Returns:
+            tuple[dict, bool]: The stored task and whether it was created.
+        """
+        with self._lock:
+            existing = self._tasks.get(task["id"])
+            if existing is not None:
+                return existing, False
+            self._tasks[task["id"]] = task
+            if owner is not None:
+                self._leases[task["id"]] = (owner, self._clock() + lease)
+            self._evict()
+            return task, True
+
+    def get(self, task_id):
+        """Return the task or ``None``."""
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def delete(self, task_id):
+        """Remove a task (one that could not be enqueued)."""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            self._leases.pop(task_id, None)
+
+    def transition(self, task_id, state, answer=None, error=None, allowed_from=None, owner=None):
+        """
+        Move a task to ``state``.
+
+        Args:
+            task_id (str): Task id.
+            state (str): New state.
+            answer (str): Agent answer to attach.
+            error (str): Error message to attach.
+            allowed_from (set[str]): Only transition from these states.
+            owner (str): Only transition if this pool holds the lease.
+
+        Returns:
+            dict | None: The updated task, or ``None`` if it does not exist,
+            was not in an allowed state or is leased by another pool.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            if allowed_from is not None and task["status"]["state"] not in allowed_from:
+                return None
+            if owner is not None and self._leases.get(task_id, (None,))[0] != owner:
+                return None
+            task = apply_transition(task, state, answer, error)
+            self._tasks[task_id] = task
+            if state in TaskState.FINAL:
+                self._leases.pop(task_id, None)
+            return task
+
+    def renew(self, owner, lease=A2A_TASK_LEASE_SECONDS):
+        """Extend the lease of every pending task held by ``owner``; return how many."""
+        with self._lock:
+            expires_at = self._clock() + lease
+            held = [tid for tid, (holder, _) in self._leases.items() if holder == owner]
+            for tid in held:
+                self._leases[tid] = (owner, expires_at)
+            return len(held)
+
+    def expired(self):
+        """Return the ids of pending tasks without a live lease (oldest first)."""
+        with self._lock:
+            now = self._clock()
+            return [
+                tid
+                for tid, t in self._tasks.items()
+                if t["status"]["state"] in TaskState.PENDING and self._leases.get(tid, (None, 0))[1] <= now
+            ]
+
+    def adopt(self, task_id, owner, lease=A2A_TASK_LEASE_SECONDS):
+        """
+        Take over a pending task whose lease expired and requeue it as submitted.
+
+        Returns:
+            dict | None: The task, or ``None`` if it finished or another pool
+            holds a live lease.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            now = self._clock()
+            if task is None or task["status"]["state"] not in TaskState.PENDING:
+                return None
+            if self._leases.get(task_id, (None, 0))[1] > now:
+                return None
+            task = apply_transition(task, TaskState.SUBMITTED)
+            self._tasks[task_id] = task
+            self._leases[task_id] = (owner, now + lease)
+            return task
+
+    def _evict(self):
+        excess = len(self._tasks) - self.max_tasks
+        if excess <= 0:
+            return
+        for tid in [tid for tid, t in self._tasks.items() if t["status"]["state"] in TaskState.FINAL][:excess]:
+            del self._tasks[tid]
+            self._leases.pop(tid, None)
+
+
+class SQLiteTaskStore:
+    """
+    Task store persisted in SQLite (WAL mode, one connection shared across threads).
+
+    The lease lives in the ``owner`` and ``lease_until`` columns; claims
+    and adoptions are single conditional ``UPDATE`` statements, so they are
+    atomic across processes sharing the file.
+
+    Args:
+        path (str): Database file.
+        max_tasks (int): Maximum rows kept; the oldest finished ones are
+            evicted first.
+        clock (callable): Epoch seconds, used for leases.
+    """
+
+    def __init__(self, path=A2A_TASK_DB, max_tasks=A2A_MAX_TASKS, clock=time.time):
+        self.path = path
+        self.max_tasks = max_tasks
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+            " owner TEXT,"
+            " lease_until REAL NOT NULL DEFAULT 0)"
+        )
+        # Databases created before leases existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN owner TEXT")
+        if "lease_until" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks(state)")
+
+    def create(self, task, owner=None, lease=A2A_TASK_LEASE_SECONDS):
+        """Store ``task`` unless its id exists (see ``InMemoryTaskStore.create``)."""
+        lease_until = self._clock() + lease if owner is not None else 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (id, state, body, owner, lease_until) VALUES (?, ?, ?, ?, ?)",
+                (task["id"], task["status"]["state"], json.dumps(task), owner, lease_until),
+            )
+            if cursor.rowcount:
+                self._evict()
+                return task, True
+            row = self._conn.execute("SELECT body FROM tasks WHERE id = ?", (task["id"],)).fetchone()
+        return json.loads(row[0]), False
+
+    def get(self, task_id):
+        """Return the task or ``None``."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, task_id):
+        """Remove a task (one that could not be enqueued)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def _evict(self):
+        excess = self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] - self.max_tasks
+        if excess <= 0:
+            return
+        final = sorted(TaskState.FINAL)
+        self._conn.execute(
+            "DELETE FROM tasks WHERE id IN (SELECT id FROM tasks WHERE state IN (?, ?, ?)"
+            " ORDER BY created_at, rowid LIMIT ?)",
+            (*final, excess),
+        )
+
+    def _update(self, task_id, state, where, params, answer=None, error=None, lease=None):
+        """
+        Apply a transition to the row if it matches ``where``.
+
+        The ``UPDATE`` repeats the condition and the body it read, so a row
+        changed by another process in between is left alone.
+
+        Args:
+            lease (tuple[str, float]): New ``(owner, lease_until)``, set in the same statement.
+
+        Returns:
+            dict | None: The updated task.
+        """
+        row = self._conn.execute(
+            f"SELECT body FROM tasks WHERE id = ? AND {where}", (task_id, *params)
+        ).fetchone()
+        if row is None:
+            return None
+        task = apply_transition(json.loads(row[0]), state, answer, error)
+        sets, values = "state = ?, body = ?", [state, json.dumps(task)]
+        if lease is not None:
+            sets += ", owner = ?, lease_until = ?"
+            values.extend(lease)
+        cursor = self._conn.execute(
+            f"UPDATE tasks SET {sets} WHERE id = ? AND body = ? AND {where}",
+            (*values, task_id, row[0], *params),
+        )
+        return task if cursor.rowcount else None
+
+    def transition(self, task_id, state, answer=None, error=None, allowed_from=None, owner=None):
+        """Move a task to ``state`` (see ``InMemoryTaskStore.transition``)."""
+        where, params = ["1 = 1"], []
+        if allowed_from is not None:
+            allowed = sorted(allowed_from)
+            where.append(f"state IN ({', '.join('?' * len(allowed))})")
+            params.extend(allowed)
+        if owner is not None:
+            where.append("owner = ?")
+            params.append(owner)
+        with self._lock:
+            return self._update(task_id, state, " AND ".join(where), params, answer, error)
+
+    def renew(self, owner, lease=A2A_TASK_LEASE_SECONDS):
+        """Extend the lease of every pending task held by ``owner``; return how many."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE owner = ? AND state IN (?, ?)",
+                (self._clock() + lease, owner, *sorted(TaskState.PENDING)),
+            )
+        return cursor.rowcount
+
+    def expired(self):
+        """Return the ids of pending tasks without a live lease (oldest first)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM tasks WHERE state IN (?, ?) AND lease_until <= ? ORDER BY created_at, rowid",
+                (*sorted(TaskState.PENDING), self._clock()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def adopt(self, task_id, owner, lease=A2A_TASK_LEASE_SECONDS):
+        """Take over a pending task whose lease expired (see ``InMemoryTaskStore.adopt``)."""
+        with self._lock:
+            now = self._clock()
+            return self._update(
+                task_id,
+                TaskState.SUBMITTED,
+                "state IN (?, ?) AND lease_until <= ?",
+                (*sorted(TaskState.PENDING), now),
+                lease=(owner, now + lease),
+            )
+
+
+def create_task_store(kind=A2A_TASK_STORE):
+    """Build the task store named ``kind`` (``memory`` or ``sqlite``)."""
+    if kind == "memory":
+        return InMemoryTaskStore()
+    if kind == "sqlite":
+        return SQLiteTaskStore()
+    raise ValueError(f"Unsupported A2A_TASK_STORE: {kind}")
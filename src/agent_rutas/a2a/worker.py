@@ -0,0 +1,203 @@
+"""
+Bounded worker pool that runs queued A2A tasks.
+
+``submit`` stores the task and enqueues its id in constant time (a task
+that does not fit in the queue is rejected without being stored); worker
+threads pick ids from a bounded queue, run the handler (the graph) and
+record the outcome in the task store, so a client that disconnects can
+still fetch the result with ``tasks/get``. Cancellation is cooperative: a
+queued task is never started, and the result of a task canceled while
+running is discarded.
+
+Each pool leases the tasks it queues and renews the leases from a
+heartbeat thread. The same thread adopts pending tasks whose lease expired
+(their pool stopped or died), so with several processes on one SQLite file
+a task is only requeued once its owner is gone.
+"""
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+
+from ..utils.metrics import TASK_QUEUE_DEPTH
+from .store import A2A_TASK_LEASE_SECONDS, TaskState
+
+logger = logging.getLogger(__name__)
+
+A2A_WORKERS = int(os.getenv("A2A_WORKERS", "4"))
+A2A_MAX_QUEUE = int(os.getenv("A2A_MAX_QUEUE", "100"))
+
+
+class QueueFullError(Exception):
+    """The task queue is at ``max_queue``; the client should retry later."""
+
+
+class TaskWorkerPool:
+    """
+    Drains the task queue with ``workers`` threads.
+
+    Args:
+        store: ``InMemoryTaskStore`` or ``SQLiteTaskStore``.
+        handler (callable): ``handler(task) -> answer`` run for each task.
+        workers (int): Number of worker threads.
+        max_queue (int): Maximum queued (not yet running) tasks.
+        lease (float): Lease of the pool's tasks, renewed every third of it.
+
+    Example:
+        ```python
+        pool = TaskWorkerPool(create_task_store(), handler=answer_task)
+        pool.start()
+        task = pool.submit(new_task("t1", message))
+        ```
+    """
+
+    def __init__(
+        self, store, handler, workers=A2A_WORKERS, max_queue=A2A_MAX_QUEUE, lease=A2A_TASK_LEASE_SECONDS
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._stopping = threading.Event()
+        # Submissions and recovery check for room and enqueue as one step
+        self._enqueue_lock = threading.Lock()
+
+    def start(self):
+        """Start the workers and the heartbeat that renews leases and adopts abandoned tasks."""
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"agent-rutas-a2a-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._heartbeat, name="agent-rutas-a2a-lease", daemon=True).start()
+
+    def _heartbeat(self):
+        while not self._stopping.is_set():
+            try:
+                self.store.renew(self.owner, self.lease)
+                self.recover()
+            except Exception as e:
+                logger.warning(f"A2A lease heartbeat failed: {e}")
+            self._stopping.wait(self.lease / 3)
+
+    def recover(self):
+        """
+        Adopt and enqueue pending tasks whose lease expired.
+
+        Returns:
+            int: Tasks adopted.
+        """
+        adopted = 0
+        for task_id in self.store.expired():
+            if self._stopping.is_set():
+                break
+            with self._enqueue_lock:
+                if self._queue.full():
+                    break
+                if self.store.adopt(task_id, self.owner, self.lease) is None:
+                    # Finished, canceled or adopted by another pool meanwhile
+                    continue
+                self._queue.put_nowait(task_id)
+            TASK_QUEUE_DEPTH.set(self._queue.qsize())
+            adopted += 1
+        if adopted:
+            logger.info(f"Recovered {adopted} pending A2A tasks")
+        return adopted
+
+    def stop(self, timeout=5.0):
+        """Ask the workers to exit after their current task."""
+        self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, task):
+        """
+        Store and enqueue ``task``.
+
+        A task id that already exists is not enqueued again; the stored task
+        is returned instead, so client retries are idempotent. A task that
+        does not fit in the queue is not stored, so retrying it later with the
+        same id enqueues it.
+
+        Returns:
+            dict: The stored task.
+
+        Raises:
+            QueueFullError: If the queue is full.
+        """
+        with self._enqueue_lock:
+            existing = self.store.get(task["id"])
+            if existing is not None:
+                return existing
+            if self._queue.full():
+                raise QueueFullError("La cola de tareas está llena, reintentá en unos segundos.")
+            stored, created = self.store.create(task, owner=self.owner, lease=self.lease)
+            if not created:
+                return stored
+            try:
+                self._queue.put_nowait(task["id"])
+            except queue.Full:
+                # Only the stop sentinels enqueue without the lock
+                self.store.delete(task["id"])
+                raise QueueFullError("La cola de tareas está llena, reintentá en unos segundos.")
+        TASK_QUEUE_DEPTH.set(self._queue.qsize())
+        return stored
+
+    def cancel(self, task_id):
+        """
+        Cancel a submitted or working task.
+
+        Returns:
+            dict | None: The task (unchanged if it had already finished), or
+            ``None`` if it does not exist.
+        """
+        task = self.store.transition(task_id, TaskState.CANCELED, allowed_from=TaskState.PENDING)
+        return task or self.store.get(task_id)
+
+    def get(self, task_id):
+        """Return the task or ``None``."""
+        return self.store.get(task_id)
+
+    def _work(self):
+        while True:
+            task_id = self._queue.get()
+            TASK_QUEUE_DEPTH.set(self._queue.qsize())
+            if task_id is None:
+                return
+            task = self.store.transition(
+                task_id, TaskState.WORKING, allowed_from={TaskState.SUBMITTED}, owner=self.owner
+            )
+            if task is None:
+                # Canceled, unknown or adopted by another pool before a worker picked it up
+                continue
+            try:
+                answer = self.handler(task)
+                self.store.transition(
+                    task_id,
+                    TaskState.COMPLETED,
+                    answer=answer,
+                    allowed_from={TaskState.WORKING},
+                    owner=self.owner,
+                )
+            except Exception as e:
+                logger.error(f"A2A task {task_id} failed: {e}")
+                self.store.transition(
+                    task_id,
+                    TaskState.FAILED,
+                    error=str(e),
+                    allowed_from={TaskState.WORKING},
+                    owner=self.owner,
+                )
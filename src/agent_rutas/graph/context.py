@@ -0,0 +1,167 @@
+"""
+Context window management for the LLM nodes.
+
+``llm_call_node`` and ``reflection_node`` pass the conversation through
+``build_context`` before calling the model, so the prompt stays within a
+per-model token budget however many turns or reflection loops the state
+holds. The graph state itself is never modified; only what is sent is.
+
+Order of operations:
+
+1. Tool results that were superseded (the same tool called again with the
+   same arguments later on, or results from earlier user turns that were
+   already answered) are collapsed to a one-line stub.
+2. Whole turns are dropped from the oldest until the rest fits the budget.
+   The last user turn (the last ``HumanMessage`` and everything after it)
+   is always kept, as is a leading ``SystemMessage``.
+3. If the last turn alone is over budget, tool results of all but the most
+   recent tool round are collapsed too.
+
+Stubs keep their ``tool_call_id``, so every tool call still has its answer
+and providers accept the history.
+"""
+import math
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from ..model.config import MODEL_CONFIGS
+
+DEFAULT_CONTEXT_BUDGET_TOKENS = int(os.getenv("CONTEXT_BUDGET_TOKENS", "6000"))
+# Collapsed tool results are replaced by this text
+COLLAPSED_TOOL_RESULT = "[Resultado anterior de '{name}' omitido: ya fue considerado o fue reemplazado por una consulta más reciente.]"
+
+
+def context_budget(model_name):
+    """
+    Return the prompt token budget for ``model_name``.
+
+    Uses ``context_budget_tokens`` from ``MODEL_CONFIGS`` and falls back to
+    ``CONTEXT_BUDGET_TOKENS`` (default 6000).
+    """
+    return MODEL_CONFIGS.get(model_name, {}).get("context_budget_tokens", DEFAULT_CONTEXT_BUDGET_TOKENS)
+
+
+def _text(content):
+    """Flatten message content (string or list of blocks) to text."""
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    return str(content)
+
+
+def estimate_tokens(message):
+    """Rough token count of a message (~4 characters per token, plus tool calls)."""
+    chars = len(_text(message.content))
+    for call in getattr(message, "tool_calls", None) or []:
+        chars += len(call.get("name", "")) + len(str(call.get("args", {})))
+    return math.ceil(chars / 4) + 4
+
+
+def _tool_calls_by_id(messages):
+    """Map each ``tool_call_id`` to its ``(name, args key)``."""
+    calls = {}
+    for msg in messages:
+        if isinstance(msg, AIMessage):
+            for call in msg.tool_calls or []:
+                calls[call.get("id")] = (call.get("name", ""), repr(sorted(call.get("args", {}).items())))
+    return calls
+
+
+def _collapse(message, calls):
+    """Return a stub ``ToolMessage`` answering the same tool call."""
+    name = calls.get(message.tool_call_id, ("herramienta", ""))[0]
+    return ToolMessage(content=COLLAPSED_TOOL_RESULT.format(name=name), tool_call_id=message.tool_call_id)
+
+
+def _previous_turn(messages, end):
+    """Return the start index of the turn that ends at ``end`` (exclusive)."""
+    start = end - 1
+    while start > 0 and not isinstance(messages[start], HumanMessage):
+        start -= 1
+    return start
+
+
+def collapse_superseded_tool_results(messages):
+    """
+    Collapse tool results that no longer add information.
+
+    A result is superseded when it belongs to an earlier user turn, or when
+    the same tool is called again with the same arguments later on.
+
+    Args:
+        messages (list): Conversation without the system prompt.
+
+    Returns:
+        list: Messages with superseded ``ToolMessage`` contents replaced by stubs.
+    """
+    calls = _tool_calls_by_id(messages)
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    latest = {}
+    for i, msg in enumerate(messages):
+        if isinstance(msg, ToolMessage):
+            latest[calls.get(msg.tool_call_id)] = i
+
+    result = []
+    for i, msg in enumerate(messages):
+        if isinstance(msg, ToolMessage):
+            key = calls.get(msg.tool_call_id)
+            if i < last_human or (key is not None and latest.get(key) != i):
+                msg = _collapse(msg, calls)
+        result.append(msg)
+    return result
+
+
+def _collapse_older_rounds(turn, calls):
+    """Collapse tool results of every tool round but the last one in ``turn``."""
+    last_round = max((i for i, m in enumerate(turn) if isinstance(m, AIMessage) and m.tool_calls), default=-1)
+    return [
+        _collapse(msg, calls) if isinstance(msg, ToolMessage) and i < last_round else msg
+        for i, msg in enumerate(turn)
+    ]
+
+
+def build_context(messages, budget, reserved_tokens=0):
+    """
+    Select the messages to send to the model within ``budget`` tokens.
+
+    Args:
+        messages (list): Full conversation from the graph state.
+        budget (int): Prompt token budget for the model (see ``context_budget``).
+        reserved_tokens (int): Tokens already used by the system prompt and
+            node instructions added afterwards.
+
+    Returns:
+        list: Leading SystemMessage (if any), followed by the most recent
+        turns that fit, always including the last user turn.
+    """
+    system = []
+    if messages and isinstance(messages[0], SystemMessage):
+        system, messages = [messages[0]], messages[1:]
+    if not messages:
+        return system
+
+    # Walk back from the end, so the cost depends on what fits, not on the history length
+    last_start = _previous_turn(messages, len(messages))
+    last_turn = collapse_superseded_tool_results(messages[last_start:])
+    available = budget - reserved_tokens - sum(estimate_tokens(m) for m in system)
+    if sum(estimate_tokens(m) for m in last_turn) > available:
+        last_turn = _collapse_older_rounds(last_turn, _tool_calls_by_id(last_turn))
+    available -= sum(estimate_tokens(m) for m in last_turn)
+
+    kept = [last_turn]
+    end = last_start
+    while end > 0:
+        start = _previous_turn(messages, end)
+        turn = messages[start:end]
+        calls = _tool_calls_by_id(turn)
+        turn = [_collapse(m, calls) if isinstance(m, ToolMessage) else m for m in turn]
+        cost = sum(estimate_tokens(m) for m in turn)
+        if cost > available:
+            break
+        kept.append(turn)
+        available -= cost
+        end = start
+
+    return system + [msg for turn in reversed(kept) for msg in turn]
@@ -1,25 +1,28 @@
 """Orchestrator for the Neuquén routes agent."""
-from .nodes import llm_call_node, tool_node, should_continue, reflection_node
-from langgraph.graph import END, START, MessagesState, StateGraph
+from .nodes import llm_call_node, tool_node, should_continue, reflection_node, finalize_node
+from .state import AgentState
+from langgraph.graph import END, START, StateGraph
 
 
 # Build the graph using the modular nodes (following generic-agent pattern)
-builder = StateGraph(MessagesState)
+builder = StateGraph(AgentState)
 builder.add_node("llm_call", llm_call_node)
 builder.add_node("tools", tool_node)
 builder.add_node("reflection", reflection_node)
+builder.add_node("finalize", finalize_node)
 
 builder.add_edge(START, "llm_call")
 builder.add_conditional_edges(
     "llm_call",
     should_continue,
-    {"tools": "tools", "end": END},
+    {"tools": "tools", "finalize": "finalize", "end": END},
 )
 builder.add_edge("tools", "reflection")
 builder.add_conditional_edges(
     "reflection",
     should_continue,
-    {"tools": "tools", "end": END},
+    {"tools": "tools", "finalize": "finalize", "end": END},
 )
+builder.add_edge("finalize", END)
 graph = builder.compile()
 graph.name = "Routes Agent Workflow Graph"
\ No newline at end of file
@@ -1,85 +1,387 @@
 """Node implementations for the Neuquén routes agent's decision-making process."""
-from langchain_core.messages import SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
-from ..tools import buscar_estado_rutas
-from ..prompts import ROUTES_AGENT_PROMPT as system_prompt
-from ..model.llm import ModelFactory
+from ..tools import buscar_estado_rutas, is_degraded_output
+from ..utils.prompt_loader import PROMPT_REGISTRY
+from ..model.llm import LLM_TIMEOUT_SECONDS, ModelFactory
+from ..model.config import MODEL_CONFIGS
+from .context import build_context, context_budget, estimate_tokens
+from .state import RESET, round_signature, tool_call_key
+from ..utils.deadline import DeadlineExceeded, deadline_scope, from_config, timeout_for
+from ..utils.metrics import (
+    CONTEXT_TOKENS,
+    LLM_LATENCY,
+    LOOP_STOPS,
+    TOOL_LATENCY,
+    instrument_node,
+    record_cache,
+    record_llm_usage,
+    timed,
+)
+import asyncio
+import contextvars
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
 
 TOOLS = [buscar_estado_rutas]
 
+# Bounded pool shared by every tool_node execution
+TOOL_MAX_WORKERS = int(os.environ.get("TOOL_MAX_WORKERS", "8"))
+TOOL_TIMEOUT_SECONDS = float(os.environ.get("TOOL_TIMEOUT_SECONDS", "30"))
+TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="agent-rutas-tool"
+)
+# Tool rounds allowed per run before the agent is forced to answer
+MAX_TOOL_ROUNDS = int(os.environ.get("MAX_TOOL_ROUNDS", "3"))
+# LLM calls run on their own pool so a node can stop waiting when the deadline hits
+LLM_MAX_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", "16"))
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="agent-rutas-llm")
+# Time kept back from the deadline to return a partial answer
+DEADLINE_RESERVE_SECONDS = float(os.environ.get("DEADLINE_RESERVE_SECONDS", "0.2"))
+
+LOOP_SKIPPED = "Consulta no ejecutada: ya se alcanzó el límite de consultas para esta pregunta."
+LOOP_PARTIAL = "Esto es lo que obtuve del parte diario sobre tu consulta:\n\n{content}"
+DEADLINE_NO_DATA = "No pude obtener la información a tiempo. Intentá nuevamente en unos segundos."
+DEADLINE_PARTIAL = (
+    "Se agotó el tiempo para elaborar la respuesta completa. "
+    "Esto es lo que obtuve del parte diario:\n\n{content}"
+)
+
 model_core = os.environ.get("MODEL_CORE", "gemini-2.0-flash")
 factory = ModelFactory(model_name=model_core, temperature=0.5)
 llm = factory.create_model()
+provider = MODEL_CONFIGS.get(model_core, {}).get("provider", "unknown")
+AGENT_NAME = "agent_rutas"
+# Static system prompt + tool schema, sent as a cacheable prefix on every call
+_system_prompt = PROMPT_REGISTRY.get("routes_agent", model_core, AGENT_NAME)
+prompt_prefix = factory.create_prompt_cache(_system_prompt.render(), TOOLS)
+# Prompt token budget for the conversation sent on each call
+context_tokens = context_budget(model_core)
+
+
+def get_prompt_prefix():
+    """Return the prompt prefix, rebuilding it if the system prompt was hot-reloaded."""
+    global _system_prompt, prompt_prefix
+    current = PROMPT_REGISTRY.get("routes_agent", model_core, AGENT_NAME)
+    if current is not _system_prompt:
+        _system_prompt = current
+        prompt_prefix = factory.create_prompt_cache(current.render(), TOOLS)
+    return prompt_prefix
+
+
+def select_context(node, messages, instructions=None, prefix=None):
+    """Trim ``messages`` to the model's context budget and build the prompt for ``node``.
+
+    ``prefix`` is the resolved prompt prefix the model was bound with, so the
+    messages match the binding (see ``PlainPrompt.resolve``).
+    """
+    prompt_prefix = prefix or get_prompt_prefix().resolve()
+    reserved = estimate_tokens(prompt_prefix.system_message(instructions))
+    history = build_context(messages, context_tokens, reserved_tokens=reserved)
+    messages_for_llm = prompt_prefix.messages(history, instructions=instructions)
+    CONTEXT_TOKENS.labels(node=node).observe(sum(estimate_tokens(m) for m in messages_for_llm))
+    return messages_for_llm
+
+
+def invoke_llm(llm_with_tools, messages_for_llm):
+    """
+    Invoke the model within the request deadline, recording its latency and token usage.
+
+    Raises:
+        DeadlineExceeded: If the deadline leaves no time for the call or the
+            model does not answer in time.
+    """
+    timeout = timeout_for(cap=LLM_TIMEOUT_SECONDS, reserve=DEADLINE_RESERVE_SECONDS)
+    ctx = contextvars.copy_context()
+    with timed(LLM_LATENCY, provider=provider, model=model_core):
+        future = LLM_EXECUTOR.submit(ctx.run, llm_with_tools.invoke, messages_for_llm)
+        try:
+            output = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"El modelo no respondió en {timeout:.1f}s.")
+    record_llm_usage(provider, model_core, output)
+    return output
+
 
+def partial_answer(messages, template=DEADLINE_PARTIAL):
+    """Final answer when the model cannot be used: the latest tool output of this turn, if there is one."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, ToolMessage) and message.content and message.content != LOOP_SKIPPED:
+            return AIMessage(content=template.format(content=message.content))
+    return AIMessage(content=DEADLINE_NO_DATA)
+
+
+def new_turn_reset(state):
+    """Reset of the per-turn keys when the run starts a user turn, else ``{}``.
+
+    With a checkpointer the state of a thread carries over between turns;
+    without the reset a follow-up question would inherit the previous turn's
+    round count, memo and loop signatures.
+    """
+    if not state["messages"] or not isinstance(state["messages"][-1], HumanMessage):
+        return {}
+    return {"tool_rounds": 0, "tool_memo": RESET, "round_signatures": RESET, "degraded": RESET}
+
+
+@instrument_node("llm_call")
 def llm_call_node(state, *, config: RunnableConfig):
     """Node for calling the LLM with the available tools."""
-    system_msg = SystemMessage(content=system_prompt)
-    tools_by_name = {tool.name: tool for tool in TOOLS}
-    llm_with_tools = llm.bind_tools(TOOLS)
-    
-    # Handle messages to ensure only one SystemMessage at the beginning
-    messages = state["messages"]
-    if messages and isinstance(messages[0], SystemMessage):
-        # Replace the existing SystemMessage with our specialized one
-        messages_for_llm = [system_msg] + messages[1:]
-    else:
-        # No SystemMessage found, add ours at the beginning
-        messages_for_llm = [system_msg] + messages
-    
-    output = llm_with_tools.invoke(messages_for_llm)
-    return {"messages": [output]}
+    update = new_turn_reset(state)
+    prefix = get_prompt_prefix().resolve()
+    llm_with_tools = prefix.bind(llm)
+    # The static prefix replaces any incoming SystemMessage and stays byte-stable;
+    # the history is trimmed to the model's budget
+    messages_for_llm = select_context("llm_call", state["messages"], prefix=prefix)
+    with deadline_scope(from_config(config)):
+        try:
+            output = invoke_llm(llm_with_tools, messages_for_llm)
+        except DeadlineExceeded as e:
+            logger.warning(f"llm_call: {e}")
+            return {**update, "messages": [partial_answer(state["messages"])], "degraded": True}
+    return {**update, "messages": [output]}
+
+
+def _invoke_tool(tool, args, deadline=None):
+    """Run a sync tool recording its latency.
 
+    ``deadline`` bounds the tool's own outbound calls, so a call the node
+    stopped waiting for also gives its pool worker back soon after.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with deadline_scope(deadline):
+            obs = tool.invoke(args)
+        outcome = "ok"
+        return obs
+    finally:
+        TOOL_LATENCY.labels(tool=tool.name, outcome=outcome).observe(time.perf_counter() - start)
 
+
+async def _ainvoke_tools(calls, timeout):
+    """Run async tools concurrently, each bounded by ``timeout`` seconds."""
+
+    async def run(tool, args):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            obs = await asyncio.wait_for(tool.ainvoke(args), timeout)
+            outcome = "ok"
+            return obs
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            TOOL_LATENCY.labels(tool=tool.name, outcome=outcome).observe(
+                time.perf_counter() - start
+            )
+
+    return await asyncio.gather(
+        *(run(tool, args) for tool, args in calls), return_exceptions=True
+    )
+
+
+@instrument_node("tools")
 def tool_node(state, *, config: RunnableConfig):
-    """Node for executing the selected tool(s) and returning their results."""
+    """Node for executing the selected tool(s) concurrently and returning their results.
+
+    Sync tools run on a bounded thread pool and async tools are gathered on
+    an event loop, so a turn with several tool calls costs about as much as
+    its slowest call. Every call is bounded by ``TOOL_TIMEOUT_SECONDS`` (or
+    what remains of the request deadline) and the ``ToolMessage`` order
+    matches ``tool_calls``.
+
+    Calls already answered earlier in the run (same tool and normalized
+    args, see ``tool_call_key``) are served from ``tool_memo`` instead of
+    running again; duplicated calls within a round run once.
+    """
+    tool_calls = state["messages"][-1].tool_calls
+    memo = state.get("tool_memo") or {}
+    keys = [tool_call_key(call["name"], call["args"]) for call in tool_calls]
+    pending = {}
+    for i, key in enumerate(keys):
+        if key not in memo:
+            pending.setdefault(key, i)
+    record_cache("tool_memo", hit=True, count=len(keys) - len(pending))
+    record_cache("tool_memo", hit=False, count=len(pending))
+
+    fresh = {}
+    if pending:
+        with deadline_scope(from_config(config)):
+            outcomes = _run_tools([tool_calls[i] for i in pending.values()])
+        fresh = dict(zip(pending, outcomes))
+    results = [
+        ToolMessage(content=memo[key] if key in memo else fresh[key][0], tool_call_id=tool_call["id"])
+        for tool_call, key in zip(tool_calls, keys)
+    ]
+    return {
+        "messages": results,
+        # Only successful results are reused; errors and timeouts may be retried
+        "tool_memo": {key: content for key, (content, ok) in fresh.items() if ok},
+        "tool_rounds": state.get("tool_rounds", 0) + 1,
+        "round_signatures": [round_signature(tool_calls)],
+        "degraded": any(not ok for _, ok in fresh.values())
+        or any(is_degraded_output(message.content) for message in results),
+    }
+
+
+def _tool_timeout(name, budget):
+    """Content returned for a tool call that did not finish within ``budget``."""
+    return (f"La herramienta '{name}' no respondió a tiempo ({budget:.1f}s).", False)
+
+
+def _run_tools(tool_calls):
+    """Run ``tool_calls`` and return ``(content, ok)`` for each, in order."""
     tools_by_name = {tool.name: tool for tool in TOOLS}
-    results = []
-    for tool_call in state["messages"][-1].tool_calls:
+    try:
+        budget = timeout_for(cap=TOOL_TIMEOUT_SECONDS, reserve=DEADLINE_RESERVE_SECONDS)
+    except DeadlineExceeded:
+        return [(DEADLINE_NO_DATA, False)] * len(tool_calls)
+    contents = [None] * len(tool_calls)
+    futures = {}
+    async_calls = []
+    tool_deadline = time.time() + budget
+    for i, tool_call in enumerate(tool_calls):
         name = tool_call["name"]
         tool = tools_by_name.get(name)
-        if tool:
-            obs = tool.invoke(tool_call["args"])
-            results.append(ToolMessage(content=obs, tool_call_id=tool_call["id"]))
+        if not tool:
+            contents[i] = (f"Tool '{name}' not found.", False)
+        elif getattr(tool, "coroutine", None) is not None:
+            async_calls.append((i, tool, tool_call["args"]))
         else:
-            results.append(
-                ToolMessage(
-                    content=f"Tool '{name}' not found.", tool_call_id=tool_call["id"]
-                )
+            ctx = contextvars.copy_context()
+            futures[i] = TOOL_EXECUTOR.submit(
+                ctx.run, _invoke_tool, tool, tool_call["args"], tool_deadline
             )
-    return {"messages": results}
+
+    async_future = None
+    if async_calls:
+        ctx = contextvars.copy_context()
+        async_future = TOOL_EXECUTOR.submit(
+            ctx.run,
+            asyncio.run,
+            _ainvoke_tools([(tool, args) for _, tool, args in async_calls], budget),
+        )
+
+    deadline = time.monotonic() + budget
+    for i, future in futures.items():
+        name = tool_calls[i]["name"]
+        try:
+            contents[i] = (future.result(timeout=max(0.0, deadline - time.monotonic())), True)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"Tool '{name}' timed out after {budget:.1f}s")
+            contents[i] = _tool_timeout(name, budget)
+        except Exception as e:
+            logger.error(f"Error executing tool '{name}': {e}")
+            contents[i] = (f"Error al ejecutar la herramienta '{name}': {str(e)}", False)
+
+    if async_future is not None:
+        # The async batch enforces its own per-call timeouts; allow a small margin
+        # (a tool blocking the event loop can still overrun them)
+        try:
+            outcomes = async_future.result(timeout=max(0.0, deadline - time.monotonic()) + 1)
+        except FutureTimeoutError:
+            logger.warning(f"Async tools timed out after {budget:.1f}s")
+            outcomes = [asyncio.TimeoutError()] * len(async_calls)
+        for (i, tool, _), outcome in zip(async_calls, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                contents[i] = _tool_timeout(tool.name, budget)
+            elif isinstance(outcome, Exception):
+                logger.error(f"Error executing tool '{tool.name}': {outcome}")
+                contents[i] = (f"Error al ejecutar la herramienta '{tool.name}': {str(outcome)}", False)
+            else:
+                contents[i] = (outcome, True)
+    return contents
+
+
+def max_tool_rounds(config):
+    """Tool rounds allowed per run (``config["configurable"]["max_tool_rounds"]`` or env)."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("max_tool_rounds", MAX_TOOL_ROUNDS)
 
 
 def should_continue(state, *, config: RunnableConfig):
-    """Node to decide whether to continue with tool execution or end the graph."""
+    """Node to decide whether to continue with tool execution or end the graph.
+
+    Tool calls go to ``finalize`` instead of ``tools`` once the run used its
+    ``max_tool_rounds`` or when the requested calls repeat an earlier round
+    (the same query again, or A -> B -> A oscillation).
+    """
     last = state["messages"][-1]
-    if hasattr(last, "tool_calls") and last.tool_calls:
-        return "tools"
-    return "end"
- 
+    if not (hasattr(last, "tool_calls") and last.tool_calls):
+        return "end"
+    if state.get("tool_rounds", 0) >= max_tool_rounds(config):
+        LOOP_STOPS.labels(reason="max_rounds").inc()
+        return "finalize"
+    if round_signature(last.tool_calls) in (state.get("round_signatures") or []):
+        LOOP_STOPS.labels(reason="repeated_calls").inc()
+        return "finalize"
+    return "tools"
+
+
+@instrument_node("reflection")
 def reflection_node(state, *, config: RunnableConfig):
     """Node para reflexionar sobre los resultados de herramientas y decidir si solicitar más datos o finalizar."""
     # Prompt de reflexión: evalúa si la información obtenida es suficiente
-    reflection_prompt = (
-        "Has recibido estos resultados de las herramientas.\n"
-        "1. ¿Es suficiente esta información para responder la pregunta original?\n"
-        "   - Si NO, genera un nuevo tool_call especificando el nombre de la herramienta y sus argumentos.\n"
-        "   - Si SÍ, devuelve la respuesta final sin tool_calls."
+    reflection_prompt = PROMPT_REGISTRY.get("reflection", model_core, AGENT_NAME).render()
+    # Habilitar herramientas para posibles nuevos llamados; el prompt base se
+    # mantiene como prefijo cacheable y la reflexión va después
+    prefix = get_prompt_prefix().resolve()
+    llm_with_tools = prefix.bind(llm)
+    messages_for_llm = select_context(
+        "reflection", state["messages"], instructions=reflection_prompt, prefix=prefix
     )
-    system_msg = SystemMessage(content=reflection_prompt)
-    # Habilitar herramientas para posibles nuevos llamados
-    llm_with_tools = llm.bind_tools(TOOLS)
-    
-    # Handle messages to ensure only one SystemMessage at the beginning
-    messages = state["messages"]
-    if messages and isinstance(messages[0], SystemMessage):
-        # Replace the existing SystemMessage with our specialized one
-        messages_for_llm = [system_msg] + messages[1:]
-    else:
-        # No SystemMessage found, add ours at the beginning
-        messages_for_llm = [system_msg] + messages
-    
+
     # Incluir mensajes previos de herramientas en el input
-    output = llm_with_tools.invoke(messages_for_llm)
+    with deadline_scope(from_config(config)):
+        try:
+            output = invoke_llm(llm_with_tools, messages_for_llm)
+        except DeadlineExceeded as e:
+            # Sin tiempo para reflexionar: devolver lo que ya trajo la herramienta
+            logger.warning(f"reflection: {e}")
+            return {"messages": [partial_answer(state["messages"])], "degraded": True}
     return {"messages": [output]}
+
+
+@instrument_node("finalize")
+def finalize_node(state, *, config: RunnableConfig):
+    """Node que fuerza la respuesta final cuando se agotan las rondas o el modelo repite consultas.
+
+    Las tool_calls pendientes se responden desde ``tool_memo`` (o con un aviso)
+    para que el historial siga siendo válido, y el modelo debe responder sin
+    nuevas consultas; si aun así pide herramientas, se descartan.
+    """
+    memo = state.get("tool_memo") or {}
+    pending = [
+        ToolMessage(
+            content=memo.get(tool_call_key(call["name"], call["args"]), LOOP_SKIPPED),
+            tool_call_id=call["id"],
+        )
+        for call in state["messages"][-1].tool_calls
+    ]
+    messages = list(state["messages"]) + pending
+    finalize_prompt = PROMPT_REGISTRY.get("finalize", model_core, AGENT_NAME).render()
+    prefix = get_prompt_prefix().resolve()
+    llm_with_tools = prefix.bind(llm)
+    messages_for_llm = select_context("finalize", messages, instructions=finalize_prompt, prefix=prefix)
+    with deadline_scope(from_config(config)):
+        try:
+            output = invoke_llm(llm_with_tools, messages_for_llm)
+        except DeadlineExceeded as e:
+            logger.warning(f"finalize: {e}")
+            return {"messages": pending + [partial_answer(messages)], "degraded": True}
+    if getattr(output, "tool_calls", None):
+        if not output.content:
+            return {"messages": pending + [partial_answer(messages, LOOP_PARTIAL)], "degraded": True}
+        output = AIMessage(content=output.content)
+    return {"messages": pending + [output]}
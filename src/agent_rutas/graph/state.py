@@ -0,0 +1,77 @@
+"""Graph state for the routes agent: messages plus per-turn tool bookkeeping."""
+import json
+from typing import Annotated
+
+from langgraph.graph import MessagesState
+
+
+# Update value that empties a per-turn channel (see ``llm_call_node``)
+RESET = "__reset__"
+
+
+def merge_memo(left, right):
+    """Reducer for ``tool_memo``: later results add to (or replace) earlier ones."""
+    if right == RESET:
+        return {}
+    if not right:
+        return left or {}
+    return {**(left or {}), **right}
+
+
+def append_or_reset(left, right):
+    """Reducer for ``round_signatures``: append, or start over on ``RESET``."""
+    if right == RESET:
+        return []
+    return (left or []) + (right or [])
+
+
+def any_or_reset(left, right):
+    """Reducer for ``degraded``: stays true once set within a turn; ``RESET`` clears it."""
+    if right == RESET:
+        return False
+    return bool(left) or bool(right)
+
+
+class AgentState(MessagesState):
+    """
+    ``MessagesState`` plus what the run needs to bound its tool loop.
+
+    Everything but ``messages`` is per user turn: with a checkpointer the
+    state outlives the run, so ``llm_call_node`` resets these keys (``0`` and
+    ``RESET``) when the turn starts with a new ``HumanMessage``.
+
+    Attributes:
+        tool_rounds (int): ``tools`` node executions so far.
+        tool_memo (dict[str, str]): Tool output keyed by ``tool_call_key``,
+            reused when the model repeats a call within the run.
+        round_signatures (list[str]): ``round_signature`` of every executed
+            round, used to detect repeated or oscillating calls.
+        degraded (bool): Whether the answer is partial (deadline or loop
+            fallback) or built on a failed or stale tool result; such
+            answers must not be cached.
+    """
+
+    tool_rounds: int
+    tool_memo: Annotated[dict, merge_memo]
+    round_signatures: Annotated[list, append_or_reset]
+    degraded: Annotated[bool, any_or_reset]
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def tool_call_key(name, args):
+    """Memo key of a tool call: name plus args with case and whitespace normalized."""
+    return f"{name}:{json.dumps(_normalize(args or {}), sort_keys=True, ensure_ascii=False)}"
+
+
+def round_signature(tool_calls):
+    """Order-independent signature of the calls requested in one round."""
+    return "|".join(sorted(tool_call_key(call["name"], call.get("args")) for call in tool_calls))
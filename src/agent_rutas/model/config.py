@@ -10,6 +10,13 @@ The MODEL_CONFIGS dictionary structure:
     - Value: A dictionary containing:
         - provider: The service provider (e.g., "openai", "bedrock")
         - model_id: The official model identifier used by the provider
+        - prompt_cache (optional): Provider prefix caching for the static
+          system prompt and tool schema ("cache_point" for Anthropic cache
+          points, "context" for Gemini context caching)
+        - prompt_cache_min_tokens (optional): Smallest prefix the provider
+          caches; shorter prefixes are sent uncached
+        - context_budget_tokens (optional): Prompt token budget the graph
+          trims the conversation to (defaults to CONTEXT_BUDGET_TOKENS)
 
 Example:
     To get the official model name for "gpt4":
@@ -37,6 +44,8 @@ MODEL_CONFIGS = {
         "provider": "bedrock",
         "model_id": "anthropic.claude-3-5-sonnet-20241022-v2:0",
         "inference_profile_id": "us.anthropic.claude-3-5-sonnet-20241022-v2:0",
+        "prompt_cache": "cache_point",
+        "prompt_cache_min_tokens": 1024,
     },
     # "claude-3-5-sonnet": {
     #     "provider": "bedrock",
@@ -47,6 +56,8 @@ MODEL_CONFIGS = {
         "provider": "bedrock",
         "model_id": "anthropic.claude-3-5-sonnet-20241022-v2:0",
         "inference_profile_id": "us.anthropic.claude-3-5-sonnet-20241022-v2:0",
+        "prompt_cache": "cache_point",
+        "prompt_cache_min_tokens": 1024,
     },
     "claude-3-sonnet": {
         "provider": "bedrock",
@@ -71,40 +82,95 @@ MODEL_CONFIGS = {
     "llama2": {
         "provider": "ollama",
         "model_id": "llama2",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
     "llama31": {
         "provider": "ollama",
         "model_id": "llama3.1",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
     "nemotron": {
         "provider": "ollama",
         "model_id": "nemotron",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
     "deepseek-r1-32b": {
         "provider": "ollama",
         "model_id": "deepseek-r1:32b",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
     "mistral":{
         "provider": "ollama",
         "model_id": "mistral",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
     "granite3.2": {
         "provider": "ollama",
         "model_id": "granite3.2",
-        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate"
+        "endpoint": f"http://{OLLAMA_HOST}:11434/api/generate",
+        "context_budget_tokens": 3000,
     },
         # Google Gemini models
     # These models use Google's Generative AI API and require a GOOGLE_API_KEY
-    "gemini-2.0-flash": {"provider": "google", "model_id": "gemini-2.0-flash"},
-    "gemini-2.5-flash": {"provider": "google", "model_id": "gemini-2.5-flash-preview-04-17"},
-    "gemini-2.5-pro": {"provider": "google", "model_id": "gemini-2.5-pro-preview-03-25"},
-    "gemini-1.5-flash": {"provider": "google", "model_id": "gemini-1.5-flash"},
-    "gemini-1.5-pro": {"provider": "google", "model_id": "gemini-1.5-pro"},
+    "gemini-2.0-flash": {
+        "provider": "google",
+        "model_id": "gemini-2.0-flash",
+        "prompt_cache": "context",
+        "prompt_cache_min_tokens": 4096,
+    },
+    "gemini-2.5-flash": {
+        "provider": "google",
+        "model_id": "gemini-2.5-flash-preview-04-17",
+        "prompt_cache": "context",
+        "prompt_cache_min_tokens": 1024,
+    },
+    "gemini-2.5-pro": {
+        "provider": "google",
+        "model_id": "gemini-2.5-pro-preview-03-25",
+        "prompt_cache": "context",
+        "prompt_cache_min_tokens": 4096,
+    },
+    "gemini-1.5-flash": {
+        "provider": "google",
+        "model_id": "gemini-1.5-flash",
+        "prompt_cache": "context",
+        "prompt_cache_min_tokens": 32768,
+    },
+    "gemini-1.5-pro": {
+        "provider": "google",
+        "model_id": "gemini-1.5-pro",
+        "prompt_cache": "context",
+        "prompt_cache_min_tokens": 32768,
+    },
+    # Fake models
+    # Local scripted models for load testing; no network or API key required.
+    # "script" may point to a JSON file (see model/fake.py), FAKE_LLM_SCRIPT overrides it.
+    "fake": {
+        "provider": "fake",
+        "model_id": "fake-routes",
+        "latency": {"distribution": "lognormal", "median_ms": 400, "sigma": 0.5},
+        "prompt_cache": "cache_point",
+        "prompt_cache_min_tokens": 1024,
+    },
+    "fake-instant": {
+        "provider": "fake",
+        "model_id": "fake-routes",
+        "latency": {"distribution": "constant", "ms": 0},
+        "prompt_cache": "cache_point",
+        "prompt_cache_min_tokens": 1024,
+    },
+}
+
+# Maximum texts per request accepted by each embedding provider
+EMBEDDING_PROVIDER_BATCH_SIZES = {
+    "openai": 2048,
+    "bedrock": 96,
+    "google": 100,
 }
 
 EMBEDDING_CONFIGS = {
@@ -122,13 +188,16 @@ EMBEDDING_CONFIGS = {
         "model_id": "text-embedding-ada-002",
     },
     # Bedrock embeddings
+    # Titan embeds one text per request, Cohere accepts up to 96
     "amazon-titan-embed": {
         "provider": "bedrock",
         "model_id": "amazon.titan-embed-text-v1",
+        "batch_size": 1,
     },
     "cohere-embed": {
         "provider": "bedrock",
         "model_id": "cohere.embed-english-v3",
+        "batch_size": 96,
     },
         # Google embeddings
     "google-embedding": {
@@ -0,0 +1,158 @@
+"""
+Persistent content-hash -> vector cache for embeddings.
+
+Vectors are stored per model in a compact NumPy matrix (``float16`` by
+default) next to a list of SHA-256 keys, so re-embedding a mostly unchanged
+set of texts only costs the new ones.
+
+Layout of ``<cache_dir>/<model>/``:
+    - ``vectors.npy``: ``(n, dim)`` array in the configured dtype.
+    - ``keys.txt``: one hex key per row of ``vectors.npy``.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(model_id, kind, text):
+    """
+    Hash a text for cache lookups.
+
+    Args:
+        model_id (str): Provider model identifier (vectors are model-specific).
+        kind (str): ``"document"`` or ``"query"`` (some providers embed them differently).
+        text (str): Text to embed.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    return hashlib.sha256(f"{model_id}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe on-disk embedding cache for one model.
+
+    Attributes:
+        directory (str): Folder holding this model's ``vectors.npy``/``keys.txt``.
+        dtype (numpy.dtype): Storage dtype (``float16`` or ``float32``).
+    """
+
+    def __init__(self, cache_dir, model_id, dtype="float16"):
+        """
+        Open (or create) the cache for ``model_id`` under ``cache_dir``.
+
+        Args:
+            cache_dir (str): Root directory of the embedding cache.
+            model_id (str): Provider model identifier.
+            dtype (str): ``"float16"`` (compact) or ``"float32"`` (exact).
+        """
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id))
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float16, np.float32):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self._lock = threading.Lock()
+        self._index = {}
+        self._vectors = None
+        self._pending_keys = []
+        self._pending_vectors = []
+        self._load()
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.npy")
+
+    @property
+    def _keys_path(self):
+        return os.path.join(self.directory, "keys.txt")
+
+    def _load(self):
+        """Load the stored matrix and keys, ignoring a missing or corrupt cache."""
+        if not (os.path.exists(self._vectors_path) and os.path.exists(self._keys_path)):
+            return
+        try:
+            vectors = np.load(self._vectors_path, mmap_mode="r")
+            with open(self._keys_path, "r", encoding="ascii") as f:
+                keys = f.read().split()
+            if len(keys) != vectors.shape[0]:
+                raise ValueError("keys/vectors length mismatch")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache at {self.directory}: {e}")
+            return
+        self._vectors = vectors
+        self._index = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self._index) + len(self._pending_keys)
+
+    def get_many(self, keys):
+        """
+        Look up several keys.
+
+        Args:
+            keys (list[str]): Keys from ``content_key``.
+
+        Returns:
+            dict[str, numpy.ndarray]: ``float32`` vectors for the keys found.
+        """
+        found = {}
+        with self._lock:
+            pending = dict(zip(self._pending_keys, self._pending_vectors))
+            for key in keys:
+                if key in pending:
+                    found[key] = pending[key]
+                elif key in self._index:
+                    found[key] = np.asarray(self._vectors[self._index[key]], dtype=np.float32)
+        return found
+
+    def put_many(self, keys, vectors):
+        """
+        Add vectors to the cache (persisted on ``flush``).
+
+        Args:
+            keys (list[str]): Keys from ``content_key``.
+            vectors (list[list[float]]): Matching embedding vectors.
+        """
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                if key in self._index:
+                    continue
+                self._pending_keys.append(key)
+                self._pending_vectors.append(np.asarray(vector, dtype=np.float32))
+
+    def flush(self):
+        """Write pending vectors to disk atomically."""
+        with self._lock:
+            if not self._pending_keys:
+                return
+            new_rows = np.vstack(self._pending_vectors).astype(self.dtype)
+            if self._vectors is not None and len(self._index):
+                if self._vectors.shape[1] != new_rows.shape[1]:
+                    raise ValueError(
+                        f"Embedding dimension changed ({self._vectors.shape[1]} -> {new_rows.shape[1]})"
+                    )
+                matrix = np.vstack([np.asarray(self._vectors, dtype=self.dtype), new_rows])
+            else:
+                matrix = new_rows
+            keys = sorted(self._index, key=self._index.get) + self._pending_keys
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_vectors = f"{self._vectors_path}.{os.getpid()}.tmp"
+            tmp_keys = f"{self._keys_path}.{os.getpid()}.tmp"
+            with open(tmp_vectors, "wb") as f:
+                np.save(f, matrix)
+            with open(tmp_keys, "w", encoding="ascii") as f:
+                f.write("\n".join(keys))
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_keys, self._keys_path)
+
+            self._vectors = matrix
+            self._index = {key: row for row, key in enumerate(keys)}
+            self._pending_keys = []
+            self._pending_vectors = []
@@ -1,12 +1,18 @@
+import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from dotenv import load_dotenv
 from langchain_community.embeddings import BedrockEmbeddings, OpenAIEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from utils.boto_session import get_boto3_client
+from retrying import retry
 
-from .config import EMBEDDING_CONFIGS
+from ..utils.boto_session import get_boto3_client
+from ..utils.metrics import record_cache
+from .config import EMBEDDING_CONFIGS, EMBEDDING_PROVIDER_BATCH_SIZES
+from .embedding_cache import EmbeddingCache, content_key
 
 logging.basicConfig(
     format="%(asctime)s - %(module)s - %(message)s",
@@ -24,6 +30,11 @@ class Embedder:
     and Google Gemini. It automatically handles the configuration and initialization 
     of the appropriate embedding model based on the specified model name.
 
+    Document embedding is split into provider-sized batches that run
+    concurrently (bounded by ``max_concurrency``) with retries. When a cache
+    directory is configured, vectors are reused by content hash, so only
+    texts that changed since the last run reach the provider.
+
     Available Models:
         OpenAI:
             - text-embedding-3-small
@@ -54,6 +65,10 @@ class Embedder:
         >>> embedder = Embedder(model_name="google-embedding")
         >>> embedding = embedder.embb.embed_query(text)
 
+        # Cached, concurrent document embedding
+        >>> embedder = Embedder(cache_dir=".cache/embeddings", max_concurrency=8)
+        >>> vectors = embedder.embed_documents_array(blocks)  # (n, dim) float32
+
     Requirements:
         - For OpenAI models: 
             - OPENAI_API_KEY environment variable must be set
@@ -67,7 +82,12 @@ class Embedder:
     def __init__(
         self,
         model_name="text-embedding-3-small",
-        region_name="us-east-1"
+        region_name="us-east-1",
+        batch_size=None,
+        max_concurrency=4,
+        max_retries=3,
+        cache_dir=None,
+        cache_dtype="float16",
     ):
         """
         Initializes the embedder with the specified model.
@@ -77,6 +97,13 @@ class Embedder:
                             See class docstring for available models.
             region_name (str): AWS region for Bedrock models. 
                              Only required for Bedrock models.
+            batch_size (int): Texts per provider request. Defaults to the
+                             model's ``batch_size`` or the provider limit.
+            max_concurrency (int): Maximum batches in flight at once.
+            max_retries (int): Attempts per batch before giving up.
+            cache_dir (str): Directory of the persistent vector cache.
+                             Defaults to ``EMBEDDING_CACHE_DIR``; no cache if unset.
+            cache_dtype (str): ``"float16"`` (compact) or ``"float32"``.
 
         Raises:
             ValueError: If the specified model name is not supported
@@ -88,7 +115,19 @@ class Embedder:
         self.config = EMBEDDING_CONFIGS.get(model_name)
         if not self.config:
             raise ValueError(f"Unsupported embedding model: {model_name}")
-        
+
+        self.batch_size = batch_size or self.config.get(
+            "batch_size", EMBEDDING_PROVIDER_BATCH_SIZES.get(self.config["provider"], 16)
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        cache_dir = cache_dir or os.getenv("EMBEDDING_CACHE_DIR")
+        self.cache = (
+            EmbeddingCache(cache_dir, self.config["model_id"], dtype=cache_dtype)
+            if cache_dir
+            else None
+        )
+
         self.embb = self._build_embb()
 
     def _build_embb(self):
@@ -139,8 +178,9 @@ class Embedder:
             Exception: If AWS credentials are not properly configured
         """
         try:
-            bedrock_client = boto3.client(
+            bedrock_client = get_boto3_client(
                 service_name="bedrock-runtime",
+                ENV=os.getenv("ENV", "local"),
                 region_name=self.region_name,
             )
         except Exception as e:
@@ -169,6 +209,60 @@ class Embedder:
             google_api_key=os.getenv("GOOGLE_API_KEY")
         )
 
+    def _batches(self, texts):
+        """Split ``texts`` into provider-sized batches."""
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    def _embed_batch(self, batch):
+        """Embed one batch, retrying with exponential backoff."""
+        return retry(
+            stop_max_attempt_number=self.max_retries,
+            wait_exponential_multiplier=500,
+            wait_exponential_max=8000,
+        )(self.embb.embed_documents)(batch)
+
+    async def _aembed_batch(self, batch):
+        """Async variant of ``_embed_batch``."""
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await self.embb.aembed_documents(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Embedding batch failed (attempt {attempt}): {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 8.0)
+
+    def _split_cached(self, texts, kind):
+        """
+        Resolve cached vectors and list the unique texts still to embed.
+
+        Returns:
+            tuple[list[str], dict[str, numpy.ndarray], list[str]]: Key per
+            input text, cached vectors by key and the texts to embed.
+        """
+        keys = [content_key(self.config["model_id"], kind, t) for t in texts]
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        hits = len(texts) - sum(1 for k in keys if k in missing)
+        if self.cache is not None:
+            record_cache("embeddings", True, hits)
+            record_cache("embeddings", False, len(texts) - hits)
+        return keys, found, list(missing.values())
+
+    def _store(self, kind, texts, vectors, found):
+        """Add fresh vectors to ``found`` and persist them in the cache."""
+        new_keys = [content_key(self.config["model_id"], kind, t) for t in texts]
+        for key, vector in zip(new_keys, vectors):
+            found[key] = np.asarray(vector, dtype=np.float32)
+        if self.cache is not None and new_keys:
+            self.cache.put_many(new_keys, vectors)
+            self.cache.flush()
+
     def embed_query(self, text: str) -> list[float]:
         """
         Generates embeddings for a given text.
@@ -183,7 +277,63 @@ class Embedder:
             >>> embedder = Embedder(model_name="text-embedding-3-small")
             >>> embeddings = embedder.embed_query("Hello, world!")
         """
-        return self.embb.embed_query(text)
+        keys, found, missing = self._split_cached([text], "query")
+        if missing:
+            self._store("query", missing, [self.embb.embed_query(text)], found)
+        return found[keys[0]].tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Async variant of ``embed_query``."""
+        keys, found, missing = self._split_cached([text], "query")
+        if missing:
+            self._store("query", missing, [await self.embb.aembed_query(text)], found)
+        return found[keys[0]].tolist()
+
+    def embed_documents_array(self, documents: list[str]) -> np.ndarray:
+        """
+        Generates embeddings for a list of documents as one ``float32`` matrix.
+
+        Cached texts are served from disk; the rest are embedded in batches
+        of ``batch_size`` with up to ``max_concurrency`` batches in flight.
+
+        Args:
+            documents (list[str]): List of texts to generate embeddings for.
+
+        Returns:
+            numpy.ndarray: Array of shape ``(len(documents), dim)``.
+        """
+        keys, found, missing = self._split_cached(documents, "document")
+        if missing:
+            batches = self._batches(missing)
+            if len(batches) == 1 or self.max_concurrency == 1:
+                results = [self._embed_batch(batch) for batch in batches]
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=min(self.max_concurrency, len(batches))
+                ) as executor:
+                    results = list(executor.map(self._embed_batch, batches))
+            vectors = [vector for batch in results for vector in batch]
+            self._store("document", missing, vectors, found)
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([found[key] for key in keys])
+
+    async def aembed_documents_array(self, documents: list[str]) -> np.ndarray:
+        """Async variant of ``embed_documents_array``."""
+        keys, found, missing = self._split_cached(documents, "document")
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def run(batch):
+                async with semaphore:
+                    return await self._aembed_batch(batch)
+
+            results = await asyncio.gather(*(run(b) for b in self._batches(missing)))
+            vectors = [vector for batch in results for vector in batch]
+            self._store("document", missing, vectors, found)
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([found[key] for key in keys])
 
     def embed_documents(self, documents: list[str]) -> list[list[float]]:
         """
@@ -200,4 +350,8 @@ class Embedder:
             >>> docs = ["Hello, world!", "Another document"]
             >>> embeddings = embedder.embed_documents(docs)
         """
-        return self.embb.embed_documents(documents)
+        return self.embed_documents_array(documents).tolist()
+
+    async def aembed_documents(self, documents: list[str]) -> list[list[float]]:
+        """Async variant of ``embed_documents``."""
+        return (await self.aembed_documents_array(documents)).tolist()
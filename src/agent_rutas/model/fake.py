@@ -0,0 +1,269 @@
+"""
+Deterministic local chat model for load testing.
+
+``FakeChatModel`` replays a script of responses, including tool calls to
+``buscar_estado_rutas``, with a configurable latency distribution and token
+counts. It lets the API and the graph be stressed without provider quota or
+network, so our own bottlenecks can be measured separately from the
+providers'.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, PrivateAttr
+
+# Ask the tool with the user's question, then answer from its result
+DEFAULT_SCRIPT = [
+    {
+        "content": "",
+        "tool_calls": [{"name": "buscar_estado_rutas", "args": {"query": "{question}"}}],
+    },
+    {"content": "Según el parte diario de la DPV: {tool_result}"},
+]
+
+
+def load_script(path):
+    """
+    Load a script from a JSON file.
+
+    The file holds a list of steps; each step has ``content`` and optional
+    ``tool_calls`` (``[{"name": ..., "args": {...}}]``). String values may use
+    the ``{question}`` and ``{tool_result}`` placeholders.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        list[dict]: Script steps.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    if not isinstance(script, list) or not script:
+        raise ValueError(f"Fake LLM script must be a non-empty list of steps: {path}")
+    return script
+
+
+def _render(value, variables):
+    """Fill ``{question}``/``{tool_result}`` placeholders inside ``value``."""
+    if isinstance(value, str):
+        for name, replacement in variables.items():
+            value = value.replace("{" + name + "}", replacement)
+        return value
+    if isinstance(value, dict):
+        return {k: _render(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, variables) for v in value]
+    return value
+
+
+def _estimate_tokens(text):
+    """Rough token count (~4 characters per token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _text(content):
+    """Flatten message content (string or list of blocks) to text."""
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    return str(content)
+
+
+def _cached_prefix(messages):
+    """Return the system text up to the last ``cache_control`` block, or ``""``."""
+    if not messages or not isinstance(messages[0], SystemMessage):
+        return ""
+    content = messages[0].content
+    if not isinstance(content, list):
+        return ""
+    prefix = ""
+    text = ""
+    for block in content:
+        text += block.get("text", "") if isinstance(block, dict) else str(block)
+        if isinstance(block, dict) and block.get("cache_control"):
+            prefix = text
+    return prefix
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted chat model with simulated latency and token usage.
+
+    The step replayed is the number of AI turns since the last user message,
+    so a default run asks the tool once and then answers. Latency is sampled
+    from ``latency`` with a seed derived from the conversation, which keeps
+    results reproducible regardless of request interleaving.
+
+    Attributes:
+        model (str): Model identifier reported in metadata.
+        script (list): Steps to replay (see ``load_script``).
+        latency (dict): ``{"distribution": ..., ...}`` where distribution is
+            ``constant`` (``ms``), ``uniform`` (``min_ms``, ``max_ms``),
+            ``normal`` (``mean_ms``, ``std_ms``) or ``lognormal``
+            (``median_ms``, ``sigma``).
+        input_tokens (int): Fixed prompt tokens to report (``None`` estimates).
+        output_tokens (int): Fixed completion tokens to report (``None`` estimates).
+        seed (int): Base seed for latency sampling.
+        max_tool_result_chars (int): Truncation for ``{tool_result}``.
+        prompt_cache (bool): Simulate provider prompt caching: a system
+            prefix marked with ``cache_control`` is reported as
+            ``cache_creation`` tokens the first time and ``cache_read``
+            tokens afterwards, like Anthropic on Bedrock.
+        prompt_cache_min_tokens (int): Smallest prefix that is cached;
+            shorter ones are billed as plain input, as Anthropic does.
+
+    Example:
+        ```python
+        llm = FakeChatModel(latency={"distribution": "constant", "ms": 0})
+        llm.bind_tools(TOOLS).invoke([HumanMessage(content="Ruta P013")])
+        ```
+    """
+
+    model: str = "fake-routes"
+    script: list = Field(default_factory=lambda: list(DEFAULT_SCRIPT))
+    latency: dict = Field(default_factory=lambda: {"distribution": "constant", "ms": 0})
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    seed: int = 0
+    max_tool_result_chars: int = 500
+    prompt_cache: bool = True
+    prompt_cache_min_tokens: int = 1024
+
+    _cached_prefixes: set = PrivateAttr(default_factory=set)
+    _cache_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        """Return the LLM type identifier for LangChain compatibility."""
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        """Tools are described by the script, so binding is a no-op."""
+        return self
+
+    def _sample_latency(self, messages):
+        """Return the simulated latency in seconds for ``messages``."""
+        params = self.latency or {}
+        distribution = params.get("distribution", "constant")
+        key = f"{len(messages)}:{messages[-1].content if messages else ''}"
+        rng = random.Random(self.seed ^ zlib.crc32(str(key).encode("utf-8")))
+        if distribution == "constant":
+            ms = params.get("ms", 0)
+        elif distribution == "uniform":
+            ms = rng.uniform(params.get("min_ms", 0), params.get("max_ms", 0))
+        elif distribution == "normal":
+            ms = rng.gauss(params.get("mean_ms", 0), params.get("std_ms", 0))
+        elif distribution == "lognormal":
+            ms = params.get("median_ms", 0) * math.exp(rng.gauss(0, params.get("sigma", 0.5)))
+        else:
+            raise ValueError(f"Unsupported latency distribution: {distribution}")
+        return max(0.0, ms) / 1000.0
+
+    def _prompt_cache_usage(self, messages):
+        """Return ``input_token_details`` for the cached prefix of ``messages``."""
+        prefix = _cached_prefix(messages) if self.prompt_cache else ""
+        if not prefix:
+            return {}
+        tokens = _estimate_tokens(prefix)
+        if tokens < self.prompt_cache_min_tokens:
+            return {}
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._cache_lock:
+            hit = key in self._cached_prefixes
+            self._cached_prefixes.add(key)
+        return {"cache_read": tokens} if hit else {"cache_creation": tokens}
+
+    def _build_message(self, messages):
+        """Render the scripted step that corresponds to ``messages``."""
+        question = ""
+        turn = 0
+        for msg in reversed(messages):
+            if isinstance(msg, HumanMessage):
+                question = msg.content if isinstance(msg.content, str) else str(msg.content)
+                break
+            if isinstance(msg, AIMessage):
+                turn += 1
+        tool_result = next(
+            (str(m.content) for m in reversed(messages) if isinstance(m, ToolMessage)), ""
+        )
+        variables = {
+            "question": question,
+            "tool_result": tool_result[: self.max_tool_result_chars],
+        }
+        step = self.script[min(turn, len(self.script) - 1)]
+        content = _render(step.get("content", ""), variables)
+        tool_calls = [
+            {
+                "name": call["name"],
+                "args": _render(call.get("args", {}), variables),
+                "id": f"call_fake_{len(messages)}_{i}",
+            }
+            for i, call in enumerate(step.get("tool_calls", []))
+        ]
+
+        prompt_chars = sum(len(_text(m.content)) for m in messages)
+        input_tokens = (
+            self.input_tokens if self.input_tokens is not None else max(1, math.ceil(prompt_chars / 4))
+        )
+        output_tokens = (
+            self.output_tokens if self.output_tokens is not None else _estimate_tokens(content)
+        )
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        cache_details = self._prompt_cache_usage(messages)
+        if cache_details:
+            usage["input_token_details"] = cache_details
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata=usage,
+            response_metadata={"model_name": self.model},
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay = self._sample_latency(messages)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=self._build_message(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay = self._sample_latency(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=self._build_message(messages))])
@@ -6,15 +6,31 @@ from langchain_aws import ChatBedrock
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from ..utils.boto_session import get_boto3_client
+from ..utils.deadline import timeout_for
 from typing import Optional, List
 from langchain.llms.base import LLM
 from pydantic import Field
 import requests
 from .config import MODEL_CONFIGS
+from .fake import FakeChatModel, load_script
+from .prompt_cache import (
+    PROMPT_CACHE_ENABLED,
+    CachePointPrompt,
+    ContextCachePrompt,
+    PlainPrompt,
+    context_cache_supported,
+    prefix_tokens,
+)
 import json
 
 load_dotenv(override=True)
 
+# Tope de cada llamada al proveedor; el nodo lo acota además al deadline de la solicitud
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# Cuánto mantiene Ollama el modelo en memoria tras cada llamada (formato de Ollama: "30m", "-1")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Conexiones HTTP reutilizadas entre llamadas a Ollama
+OLLAMA_SESSION = requests.Session()
 
 
 class CustomOllamaLLM(LLM):
@@ -141,8 +157,10 @@ class CustomOllamaLLM(LLM):
             prompt = enhanced_prompt
 
         # Prepare API request
-        data = {"model": self.model, "prompt": prompt}
-        response = requests.post(self.endpoint, json=data)
+        data = {"model": self.model, "prompt": prompt, "keep_alive": OLLAMA_KEEP_ALIVE}
+        response = OLLAMA_SESSION.post(
+            self.endpoint, json=data, timeout=timeout_for(cap=LLM_TIMEOUT_SECONDS)
+        )
         response.raise_for_status()
 
         # Process response for tool call detection
@@ -189,6 +207,25 @@ class CustomOllamaLLM(LLM):
 
         return parsed_response
 
+    def preload(self):
+        """
+        Load the model into the Ollama server's memory without generating.
+
+        Ollama loads the model when it receives a request with no prompt and
+        keeps it for ``OLLAMA_KEEP_ALIVE``; the connection stays open in
+        ``OLLAMA_SESSION`` for the next call.
+
+        Raises:
+            requests.RequestException: If the server is unreachable or the
+                model is not available.
+        """
+        response = OLLAMA_SESSION.post(
+            self.endpoint,
+            json={"model": self.model, "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=timeout_for(cap=LLM_TIMEOUT_SECONDS),
+        )
+        response.raise_for_status()
+
     def bind_tools(self, tools: list):
         """
         Bind tools to this LLM instance for tool calling support.
@@ -220,6 +257,7 @@ class ModelFactory:
     - Amazon Bedrock models (Claude, Titan, etc.)
     - Google Gemini models (Gemini 2.0 Flash, Gemini 2.5 Pro, etc.)
     - Ollama models (local/self-hosted models)
+    - Fake models (scripted local models for load testing)
 
     The factory uses the MODEL_CONFIGS configuration to determine provider-specific
     settings and translates simplified model names to official provider model IDs.
@@ -318,9 +356,96 @@ class ModelFactory:
             return self._create_google_model()
         elif self._is_ollama_model():
             return self._create_ollama_model()
+        elif self._is_fake_model():
+            return self._create_fake_model()
         else:
             raise ValueError(f"Unsupported model: {self.model_name}")
 
+    def create_prompt_cache(self, static_prompt, tools):
+        """
+        Create the prompt-prefix strategy for this model.
+
+        Uses the ``prompt_cache`` key of the model config: ``"cache_point"``
+        marks the static system prompt as an Anthropic cache point and
+        ``"context"`` uploads it, with the tool schema, as a Gemini context
+        cache. Other models (or ``PROMPT_CACHE=0``) get a plain prefix that is
+        still byte-stable across calls, and so does a prefix estimated below
+        the model's ``prompt_cache_min_tokens`` (the provider would ignore or
+        reject the cache) or a Gemini model whose langchain-google-genai
+        release predates ``cached_content``.
+
+        Args:
+            static_prompt (str): System prompt shared by every call.
+            tools (list): Tools bound to the model.
+
+        Returns:
+            PlainPrompt: Strategy that binds the model and assembles messages.
+
+        Example:
+            ```python
+            prompt = factory.create_prompt_cache(ROUTES_AGENT_PROMPT, TOOLS)
+            output = prompt.bind(llm).invoke(prompt.messages(state["messages"]))
+            ```
+        """
+        config = MODEL_CONFIGS.get(self.model_name, {})
+        mode = config.get("prompt_cache")
+        if not PROMPT_CACHE_ENABLED or not mode:
+            return PlainPrompt(static_prompt, tools)
+        tokens = prefix_tokens(static_prompt, tools)
+        min_tokens = config.get("prompt_cache_min_tokens", 0)
+        if tokens < min_tokens:
+            logging.info(
+                f"Prompt prefix (~{tokens} tokens) is below the {min_tokens}-token cache minimum "
+                f"of {self.model_name}; sending it uncached"
+            )
+            return PlainPrompt(static_prompt, tools)
+        if mode == "cache_point":
+            return CachePointPrompt(static_prompt, tools)
+        if mode == "context":
+            if not context_cache_supported():
+                logging.warning("Gemini context cache needs langchain-google-genai>=2; sending the prefix uncached")
+                return PlainPrompt(static_prompt, tools)
+            return ContextCachePrompt(
+                static_prompt,
+                tools,
+                model_id=MODEL_CONFIGS[self.model_name]["model_id"],
+                api_key=os.getenv("GOOGLE_API_KEY"),
+            )
+        raise ValueError(f"Unsupported prompt_cache mode for {self.model_name}: {mode}")
+
+    def warmup(self, llm):
+        """
+        Open the provider connection of ``llm`` before the first request.
+
+        Uses the cheapest call each provider offers, so no completion tokens
+        are spent: a model lookup for OpenAI, a token count for Gemini and a
+        preload (which also loads the model into memory) for Ollama. Bedrock
+        has no free runtime call; its boto3 client is already created by
+        ``create_model``. Fake models need no warmup.
+
+        Args:
+            llm: Model returned by ``create_model``.
+
+        Returns:
+            str: What was warmed up, for the readiness report.
+
+        Raises:
+            Exception: If the provider cannot be reached.
+        """
+        config = MODEL_CONFIGS.get(self.model_name, {})
+        if self._is_openai_model():
+            llm.root_client.with_options(timeout=LLM_TIMEOUT_SECONDS).models.retrieve(config["model_id"])
+            return "openai connection open"
+        if self._is_google_model():
+            llm.get_num_tokens("ping")
+            return "gemini connection open"
+        if self._is_ollama_model():
+            llm.preload()
+            return f"ollama model loaded (keep_alive {OLLAMA_KEEP_ALIVE})"
+        if self._is_bedrock_model():
+            return "bedrock client created"
+        return "nothing to warm up"
+
     def _is_openai_model(self):
         """
         Check if the configured model is from OpenAI.
@@ -361,6 +486,16 @@ class ModelFactory:
         config = MODEL_CONFIGS.get(self.model_name, {})
         return config.get("provider") == "ollama"
 
+    def _is_fake_model(self):
+        """
+        Check if the configured model is the local fake provider.
+
+        Returns:
+            bool: True if model provider is fake
+        """
+        config = MODEL_CONFIGS.get(self.model_name, {})
+        return config.get("provider") == "fake"
+
     def _create_openai_model(self):
         """
         Create an OpenAI ChatGPT model instance.
@@ -381,6 +516,7 @@ class ModelFactory:
             max_tokens=self.max_tokens,
             verbose=self.verbose,
             api_key=self.openai_api_key,
+            timeout=LLM_TIMEOUT_SECONDS,
         )
 
     def _create_bedrock_model(self):
@@ -469,6 +605,7 @@ class ModelFactory:
             verbose=self.verbose,
             google_api_key=google_api_key,
             max_retries=2,
+            timeout=LLM_TIMEOUT_SECONDS,
         )
 
     def _create_ollama_model(self):
@@ -492,6 +629,31 @@ class ModelFactory:
         config = MODEL_CONFIGS[self.model_name]
         return CustomOllamaLLM(model=config["model_id"], endpoint=config["endpoint"])
 
+    def _create_fake_model(self):
+        """
+        Create a scripted local model for load testing.
+
+        Replays the script from ``FAKE_LLM_SCRIPT`` (or the config's
+        ``script`` path, or the default tool-then-answer script) with the
+        latency distribution and token counts from the model config.
+        ``FAKE_LLM_SEED`` changes the latency sampling seed.
+
+        Returns:
+            FakeChatModel: Configured fake model instance
+        """
+        config = MODEL_CONFIGS[self.model_name]
+        kwargs = {
+            "model": config["model_id"],
+            "seed": int(os.getenv("FAKE_LLM_SEED", config.get("seed", 0))),
+        }
+        script_path = os.getenv("FAKE_LLM_SCRIPT", config.get("script"))
+        if script_path:
+            kwargs["script"] = load_script(script_path)
+        for key in ("latency", "input_tokens", "output_tokens", "prompt_cache_min_tokens"):
+            if key in config:
+                kwargs[key] = config[key]
+        return FakeChatModel(**kwargs)
+
     def _translate_openai_model_name(self):
         """
         Translate simplified model names to official OpenAI model identifiers.
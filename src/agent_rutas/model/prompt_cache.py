@@ -0,0 +1,396 @@
+"""
+Provider-side caching of the static prompt prefix.
+
+The routes agent sends the same system prompt and tool schema on every LLM
+call. Each strategy below arranges that prefix so the provider can reuse it:
+
+- ``CachePointPrompt`` (Anthropic on Bedrock, fake provider): the static
+  prompt is its own system block marked with ``cache_control``. Anthropic
+  caches tools + system up to that point, so node-specific instructions go
+  in a second, uncached block.
+- ``ContextCachePrompt`` (Gemini): the static prompt and tool schema are
+  uploaded as a ``CachedContent`` (kept alive by extending its TTL) and
+  requests reference it by name. Creation and renewal run in a background
+  thread, never on a request; a creation Gemini rejects as invalid (e.g.
+  below its minimum size) disables the cache for good.
+- ``PlainPrompt``: no explicit cache; the static prompt is still sent first
+  and unchanged so providers with automatic prefix caching can hit it.
+
+Strategies are chosen by ``ModelFactory.create_prompt_cache`` from the
+``prompt_cache`` key of the model config. Providers ignore (Anthropic) or
+reject (Gemini) prefixes below a minimum size, so a prefix whose estimate
+(``prefix_tokens``) is under the config's ``prompt_cache_min_tokens`` gets
+a ``PlainPrompt``. ``PROMPT_CACHE=0`` disables them.
+Callers take ``resolve()`` once per LLM call and use that object for both
+``bind`` and ``messages``, so the two always agree.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from importlib import metadata
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "1").lower() in ("1", "true", "yes")
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+# Margen antes del vencimiento para extender la caché, y espera tras una creación fallida
+GEMINI_CACHE_REFRESH_SECONDS = int(os.getenv("GEMINI_CACHE_REFRESH_SECONDS", "300"))
+GEMINI_CACHE_RETRY_SECONDS = int(os.getenv("GEMINI_CACHE_RETRY_SECONDS", "60"))
+
+
+def prefix_tokens(static_prompt, tools):
+    """Rough token count (~4 characters per token) of the static prompt plus the tool schemas."""
+    chars = len(static_prompt)
+    for tool in tools:
+        chars += len(json.dumps(convert_to_openai_tool(tool), ensure_ascii=False))
+    return math.ceil(chars / 4)
+
+
+def context_cache_supported():
+    """
+    Whether the installed langchain-google-genai honours ``cached_content``.
+
+    Older releases ignore the binding, so the request would go out without
+    system prompt or tools.
+    """
+    try:
+        major = int(metadata.version("langchain-google-genai").split(".")[0])
+    except (metadata.PackageNotFoundError, ValueError):
+        return False
+    return major >= 2
+
+
+_GEMINI_TYPES = {
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+
+def _gemini_schema(schema):
+    """Convert a JSON schema (from ``convert_to_openai_tool``) into a Gemini ``Schema``."""
+    from google.ai.generativelanguage_v1beta.types import Schema, Type
+
+    fields = {"type_": getattr(Type, _GEMINI_TYPES.get(schema.get("type"), "STRING"))}
+    if schema.get("description"):
+        fields["description"] = schema["description"]
+    if schema.get("enum"):
+        fields["enum"] = [str(value) for value in schema["enum"]]
+    if "items" in schema:
+        fields["items"] = _gemini_schema(schema["items"])
+    if schema.get("properties"):
+        fields["properties"] = {name: _gemini_schema(value) for name, value in schema["properties"].items()}
+        fields["required"] = list(schema.get("required", []))
+    return Schema(**fields)
+
+
+def gemini_tool(tools):
+    """Build the Gemini ``Tool`` declaring ``tools`` from their argument schemas."""
+    from google.ai.generativelanguage_v1beta.types import FunctionDeclaration, Tool
+
+    declarations = []
+    for tool in tools:
+        function = convert_to_openai_tool(tool)["function"]
+        fields = {"name": function["name"], "description": function.get("description", "")}
+        if function.get("parameters", {}).get("properties"):
+            fields["parameters"] = _gemini_schema(function["parameters"])
+        declarations.append(FunctionDeclaration(**fields))
+    return Tool(function_declarations=declarations)
+
+
+def _with_prefix(system_msg, messages):
+    """Put ``system_msg`` first, replacing any SystemMessage already there."""
+    if messages and isinstance(messages[0], SystemMessage):
+        messages = messages[1:]
+    if system_msg is None:
+        return list(messages)
+    return [system_msg] + list(messages)
+
+
+class PlainPrompt:
+    """
+    Byte-stable prefix without an explicit provider cache.
+
+    Attributes:
+        static_prompt (str): Prompt shared by every call.
+        tools (list): Tools bound to the model.
+    """
+
+    def __init__(self, static_prompt, tools):
+        self.static_prompt = static_prompt
+        self.tools = tools
+
+    def resolve(self):
+        """Return the prefix to use for one call (``bind`` and ``messages`` of the same object)."""
+        return self
+
+    def maintain(self):
+        """Prepare any provider-side cache now (warmup); a plain prefix has none."""
+
+    def bind(self, llm):
+        """Return ``llm`` ready to be invoked with this prefix."""
+        return llm.bind_tools(self.tools)
+
+    def system_message(self, instructions=None):
+        """Build the system message: static prompt first, then ``instructions``."""
+        if not instructions:
+            return SystemMessage(content=self.static_prompt)
+        return SystemMessage(content=f"{self.static_prompt}\n{instructions}")
+
+    def messages(self, history, instructions=None):
+        """
+        Assemble the messages for one call.
+
+        Args:
+            history (list): Conversation messages (a leading SystemMessage is replaced).
+            instructions (str): Node-specific instructions appended after the prefix.
+
+        Returns:
+            list: Messages to send to the model.
+        """
+        return _with_prefix(self.system_message(instructions), history)
+
+
+class CachePointPrompt(PlainPrompt):
+    """Static prompt in its own system block with an Anthropic cache point."""
+
+    def system_message(self, instructions=None):
+        """Build a two-block system message; only the first block is cached."""
+        blocks = [
+            {"type": "text", "text": self.static_prompt, "cache_control": {"type": "ephemeral"}}
+        ]
+        if instructions:
+            blocks.append({"type": "text", "text": instructions})
+        return SystemMessage(content=blocks)
+
+
+class CachedContentPrompt(PlainPrompt):
+    """
+    Prefix held in a Gemini ``CachedContent``, fixed for one call.
+
+    The request carries neither system instruction nor tools (Gemini rejects
+    them alongside ``cached_content``), so node instructions travel as a
+    trailing user message. If Gemini no longer knows the cache (expired or
+    deleted), the call is retried once with the full prefix and
+    ``on_missing`` is told so the cache is recreated.
+
+    Attributes:
+        cache_name (str): ``cachedContents/...`` name.
+    """
+
+    def __init__(self, static_prompt, tools, cache_name, on_missing=None):
+        super().__init__(static_prompt, tools)
+        self.cache_name = cache_name
+        self.on_missing = on_missing
+
+    def bind(self, llm):
+        """Reference the cached prefix, falling back to the full one on NOT_FOUND."""
+        cached = llm.bind(cached_content=self.cache_name)
+        plain = super().bind(llm)
+
+        def invoke(messages, config=None):
+            try:
+                return cached.invoke(messages, config)
+            except Exception as e:
+                if not is_cache_missing(e):
+                    raise
+                logger.warning(f"Gemini context cache {self.cache_name} missing, sending the full prefix: {e}")
+                if self.on_missing is not None:
+                    self.on_missing(self.cache_name)
+                return plain.invoke(_with_prefix(PlainPrompt.system_message(self), messages), config)
+
+        return RunnableLambda(invoke)
+
+    def messages(self, history, instructions=None):
+        """Drop the system prefix (it is cached); instructions go last."""
+        messages = _with_prefix(None, history)
+        if instructions:
+            messages.append(HumanMessage(content=instructions))
+        return messages
+
+
+def is_invalid_argument(error):
+    """Whether Gemini rejected the request itself (retrying it cannot succeed)."""
+    if type(error).__name__ == "InvalidArgument":
+        return True
+    text = str(error).lower()
+    return "invalid_argument" in text or "invalid argument" in text or text.startswith("400 ")
+
+
+def is_cache_missing(error):
+    """Whether ``error`` says the referenced ``CachedContent`` does not exist anymore."""
+    if type(error).__name__ == "NotFound":
+        return True
+    text = str(error).lower()
+    return ("cachedcontent" in text or "cached content" in text or "cached_content" in text) and (
+        "not found" in text or "not_found" in text or "expired" in text or "permission" in text
+    )
+
+
+class ContextCachePrompt(PlainPrompt):
+    """
+    Gemini context cache holding the static prompt and tool schema.
+
+    Each call takes its prefix from ``resolve()``: a ``CachedContentPrompt``
+    while the cache is alive, else a ``PlainPrompt``. ``resolve()`` never
+    talks to Gemini: when the cache is missing or due for renewal it starts
+    one background thread that creates it, extends its TTL
+    ``GEMINI_CACHE_REFRESH_SECONDS`` before it ends (recreating it if that
+    fails) or retries a failed creation after ``GEMINI_CACHE_RETRY_SECONDS``.
+    A creation rejected with ``INVALID_ARGUMENT`` (prefix below the model's
+    minimum, unsupported model) disables the cache permanently.
+
+    Attributes:
+        model_id (str): Gemini model the cache belongs to.
+        api_key (str): Google API key.
+        ttl_seconds (int): Lifetime of the cached content.
+        cache_name (str | None): ``cachedContents/...`` name while alive.
+        expires_at (float): When the cache ends (``clock`` time).
+        disabled (bool): Whether Gemini rejected the cache for good.
+        background (bool): Run maintenance in a thread (``False`` runs it
+            inline, for tests).
+    """
+
+    def __init__(
+        self,
+        static_prompt,
+        tools,
+        model_id,
+        api_key,
+        ttl_seconds=GEMINI_CACHE_TTL_SECONDS,
+        refresh_seconds=GEMINI_CACHE_REFRESH_SECONDS,
+        retry_seconds=GEMINI_CACHE_RETRY_SECONDS,
+        clock=time.time,
+        background=True,
+    ):
+        super().__init__(static_prompt, tools)
+        self.model_id = model_id
+        self.api_key = api_key
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = min(refresh_seconds, ttl_seconds / 2)
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.background = background
+        self.cache_name = None
+        self.expires_at = 0.0
+        self.disabled = False
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _client(self):
+        from google.ai.generativelanguage_v1beta import CacheServiceClient
+
+        return CacheServiceClient(client_options={"api_key": self.api_key})
+
+    def _create_cache(self):
+        """Upload the prefix as a CachedContent and return its name."""
+        from google.ai.generativelanguage_v1beta import CachedContent
+        from google.ai.generativelanguage_v1beta.types import Content, Part
+        from google.protobuf.duration_pb2 import Duration
+
+        model = self.model_id if self.model_id.startswith("models/") else f"models/{self.model_id}"
+        cached = self._client().create_cached_content(
+            cached_content=CachedContent(
+                model=model,
+                system_instruction=Content(parts=[Part(text=self.static_prompt)]),
+                tools=[gemini_tool(self.tools)],
+                ttl=Duration(seconds=self.ttl_seconds),
+            )
+        )
+        logger.info(f"Gemini context cache created: {cached.name}")
+        return cached.name
+
+    def _extend_cache(self, name):
+        """Push the cache's expiry ``ttl_seconds`` ahead; return whether it worked."""
+        try:
+            from google.ai.generativelanguage_v1beta import CachedContent
+            from google.protobuf.duration_pb2 import Duration
+            from google.protobuf.field_mask_pb2 import FieldMask
+
+            self._client().update_cached_content(
+                cached_content=CachedContent(name=name, ttl=Duration(seconds=self.ttl_seconds)),
+                update_mask=FieldMask(paths=["ttl"]),
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Could not extend Gemini context cache {name}: {e}")
+            return False
+
+    def _due(self, now):
+        """Whether the cache needs creating or renewing at ``now``."""
+        if self.disabled:
+            return False
+        if self.cache_name:
+            return now >= self.expires_at - self.refresh_seconds
+        return now >= self._retry_at
+
+    def _maintain(self, now):
+        """Create, extend or recreate the cache as needed (caller holds the lock)."""
+        if self.cache_name and now >= self.expires_at - self.refresh_seconds:
+            if now < self.expires_at and self._extend_cache(self.cache_name):
+                self.expires_at = now + self.ttl_seconds
+            else:
+                self.cache_name = None
+        if self.cache_name is None and not self.disabled and now >= self._retry_at:
+            try:
+                name = self._create_cache()
+            except Exception as e:
+                if is_invalid_argument(e):
+                    self.disabled = True
+                    logger.warning(f"Gemini rejected the context cache, sending the full prefix from now on: {e}")
+                else:
+                    self._retry_at = now + self.retry_seconds
+                    logger.warning(f"Gemini context cache unavailable, sending the full prefix: {e}")
+                return
+            self.cache_name, self.expires_at = name, now + self.ttl_seconds
+
+    def _maintain_and_release(self, now):
+        try:
+            self._maintain(now)
+        finally:
+            self._lock.release()
+
+    def maintain(self):
+        """Create or renew the cache now, waiting for it (warmup)."""
+        with self._lock:
+            self._maintain(self.clock())
+
+    def resolve(self):
+        """Return the prefix for one call (the cache while it is alive)."""
+        now = self.clock()
+        if self._due(now) and self._lock.acquire(blocking=False):
+            if self.background:
+                threading.Thread(
+                    target=self._maintain_and_release, args=(now,), name="gemini-context-cache", daemon=True
+                ).start()
+            else:
+                self._maintain_and_release(now)
+        name, expires_at = self.cache_name, self.expires_at
+        if name and now < expires_at:
+            return CachedContentPrompt(self.static_prompt, self.tools, name, on_missing=self.invalidate)
+        return PlainPrompt(self.static_prompt, self.tools)
+
+    def invalidate(self, name):
+        """Forget cache ``name`` (Gemini reported it missing); the next call recreates it."""
+        with self._lock:
+            if self.cache_name == name:
+                self.cache_name = None
+                self._retry_at = 0.0
+
+    def bind(self, llm):
+        """Bind ``llm`` for the current prefix (prefer ``resolve()`` to keep bind and messages consistent)."""
+        return self.resolve().bind(llm)
+
+    def messages(self, history, instructions=None):
+        """Messages for the current prefix (see ``bind``)."""
+        return self.resolve().messages(history, instructions)
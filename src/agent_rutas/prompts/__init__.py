@@ -0,0 +1,12 @@
+"""
+Prompts del agente de rutas.
+
+Cada cadena tiene su propio paquete (``routes_agent``, ``reflection``,
+``finalize``) con un módulo ``default.py`` y, opcionalmente, variantes por modelo
+(``<model_core>.py``, p.ej. ``gemini-2.0-flash`` -> ``gemini_2_0_flash.py``)
+que ``PromptRegistry`` en ``utils/prompt_loader.py`` resuelve una sola vez.
+"""
+
+from .routes_agent.default import ROUTES_AGENT_PROMPT
+
+__all__ = ["ROUTES_AGENT_PROMPT"]
@@ -0,0 +1,10 @@
+"""
+Instrucciones para el nodo de cierre: se usan cuando se alcanzó el máximo de
+rondas de herramientas o el modelo repite las mismas consultas.
+"""
+
+FINALIZE_PROMPT = (
+    "Ya no hay más consultas disponibles para esta pregunta.\n"
+    "Responde ahora la pregunta original usando solo los resultados de herramientas que ya tienes, "
+    "sin generar tool_calls. Si la información no alcanza, dilo brevemente e indica qué falta."
+)
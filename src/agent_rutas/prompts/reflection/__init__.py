@@ -0,0 +1 @@
+"""Instrucciones del nodo de reflexión."""
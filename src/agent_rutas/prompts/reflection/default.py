@@ -0,0 +1,11 @@
+"""
+Instrucciones para el nodo de reflexión: evalúa si los resultados de las
+herramientas alcanzan para responder o si hace falta otra consulta.
+"""
+
+REFLECTION_PROMPT = (
+    "Has recibido estos resultados de las herramientas.\n"
+    "1. ¿Es suficiente esta información para responder la pregunta original?\n"
+    "   - Si NO, genera un nuevo tool_call especificando el nombre de la herramienta y sus argumentos.\n"
+    "   - Si SÍ, devuelve la respuesta final sin tool_calls."
+)
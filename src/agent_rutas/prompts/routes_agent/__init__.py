@@ -0,0 +1 @@
+"""Prompt principal del agente de rutas (nodo llm_call)."""
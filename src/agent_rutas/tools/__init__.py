@@ -1,3 +1,3 @@
-from .ruta import buscar_estado_rutas
+from .ruta import buscar_estado_rutas, is_degraded_output
 
-__all__ = ["buscar_estado_rutas"]
+__all__ = ["buscar_estado_rutas", "is_degraded_output"]
@@ -0,0 +1,381 @@
+"""Download and parsing of the DPV Neuquén ParteDiario PDF."""
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from ..utils.deadline import timeout_for
+from ..utils.metrics import PDF_FETCH_BYTES, PDF_FETCH_LATENCY, PDF_PARSE_LATENCY, timed
+from .pdf_backends import get_pdf_backend
+
+PARTE_DIARIO_URL = "https://w2.dpvneuquen.gov.ar/ParteDiario.pdf"
+# Tope de la descarga; con un deadline de la solicitud se usa lo que quede
+PDF_FETCH_TIMEOUT_SECONDS = float(os.getenv("PDF_FETCH_TIMEOUT_SECONDS", "15"))
+# rows: segmentar por filas de la tabla (posiciones del PDF); text: regex sobre el texto plano
+PDF_SEGMENTATION = os.getenv("PDF_SEGMENTATION", "rows").lower()
+
+UPDATE_PATTERN = re.compile(
+    r"Información Actualizada a las\s+([\d:]+hs\.)\s+del\s+(\d{2}/\d{2}/\d{4})",
+    re.IGNORECASE,
+)
+ROUTE_CODE_PATTERN = re.compile(r"([PN]\d{3})")
+# A table row opens a route block only when it starts with the code
+ROUTE_ROW_PATTERN = re.compile(r"^([PN]\d{3})\b")
+# Los horarios del parte están en hora de Argentina (UTC-3)
+DPV_TIMEZONE = timezone(timedelta(hours=-3))
+STALE_NOTICE = (
+    "⚠️ La web de la DPV no responde: estos datos son del último parte disponible "
+    "({actualizado}{age}) y pueden no estar vigentes.\n"
+)
+
+
+class SnapshotError(Exception):
+    """The ParteDiario could not be downloaded or read (message is user-facing)."""
+
+
+def download_parte_diario(url=PARTE_DIARIO_URL):
+    """
+    Download the ParteDiario PDF.
+
+    Args:
+        url (str): Location of the PDF.
+
+    Returns:
+        bytes: Raw PDF content.
+
+    Raises:
+        requests.RequestException: If the download fails or times out.
+        DeadlineExceeded: If the request deadline leaves no time to download.
+    """
+    timeout = timeout_for(cap=PDF_FETCH_TIMEOUT_SECONDS)
+    with timed(PDF_FETCH_LATENCY):
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+    PDF_FETCH_BYTES.observe(len(response.content))
+    return response.content
+
+
+def extract_text(content):
+    """
+    Extract the text of every page of the PDF with the configured backend.
+
+    Args:
+        content (bytes): Raw PDF content.
+
+    Returns:
+        str: Concatenated page text, one page per line block.
+    """
+    with timed(PDF_PARSE_LATENCY, stage="extract"):
+        return get_pdf_backend().text(content)
+
+
+def extract_layout(content):
+    """
+    Extract the PDF as text plus, when the backend provides positions, table rows.
+
+    With ``PDF_SEGMENTATION=rows`` the rows are the only extraction pass (the
+    text is rebuilt from them); a backend without positions, or one that
+    finds no rows, falls back to its plain text.
+
+    Args:
+        content (bytes): Raw PDF content.
+
+    Returns:
+        tuple[str, list[list[str]] | None]: Full text and the rows (``None``
+        when segmenting from text).
+    """
+    if PDF_SEGMENTATION == "rows":
+        with timed(PDF_PARSE_LATENCY, stage="extract"):
+            try:
+                rows = get_pdf_backend().rows(content)
+            except NotImplementedError:
+                rows = None
+        if rows:
+            return rows_text(rows), rows
+    return extract_text(content), None
+
+
+def rows_text(rows):
+    """Join table rows into text, one row per line and cells separated by spaces."""
+    return "".join(" ".join(row) + "\n" for row in rows)
+
+
+def _update_info(full_text):
+    """"Última actualización" header line of the snapshot, empty if missing."""
+    update_match = UPDATE_PATTERN.search(full_text)
+    if update_match:
+        return f"Última actualización: {update_match.group(1)} {update_match.group(2)}\n\n"
+    return ""
+
+
+def _segment_rows(rows):
+    """Route codes and blocks from table rows; a row without a code continues the current block."""
+    codes = []
+    blocks = {}
+    current = None
+    for row in rows:
+        line = " ".join(row)
+        match = ROUTE_ROW_PATTERN.match(line)
+        if match:
+            # Como en el texto plano, gana la primera aparición de un código repetido
+            current = match.group(1) if match.group(1) not in blocks else None
+            if current is not None:
+                codes.append(current)
+                blocks[current] = [line]
+        elif current is not None:
+            blocks[current].append(line)
+    return codes, {code: "\n".join(lines) for code, lines in blocks.items()}
+
+
+def _segment_text(full_text):
+    """Route codes and blocks from plain text: each code runs until the next one."""
+    unique_routes = list(dict.fromkeys(ROUTE_CODE_PATTERN.findall(full_text)))
+    route_details = {}
+    for code in unique_routes:
+        pattern = re.compile(
+            re.escape(code) + r"(.*?)(?=[PN]\d{3}|$)", re.DOTALL
+        )
+        m = pattern.search(full_text)
+        if m:
+            route_details[code] = code + m.group(1).strip()
+    return unique_routes, route_details
+
+
+def parse_routes(full_text, rows=None):
+    """
+    Split the PDF into per-route blocks.
+
+    With ``rows`` (from ``extract_layout``) a block starts at each table row
+    whose first cell is a route code and takes the rows below it until the
+    next one, so a code mentioned inside the observations ("desvío por
+    P005") neither cuts the block short nor becomes a route. Without rows,
+    or if they hold no route, the plain text is split at every code.
+
+    Args:
+        full_text (str): Text extracted from the PDF.
+        rows (list[list[str]]): Layout-aware table rows, if available.
+
+    Returns:
+        tuple[str, list[str], dict[str, str]]: The "última actualización"
+        header line (empty if missing), the route codes in order of
+        appearance and the text block of each route keyed by code.
+    """
+    with timed(PDF_PARSE_LATENCY, stage="segment"):
+        update_info = _update_info(full_text)
+        codes, route_details = _segment_rows(rows) if rows else ([], {})
+        if not codes:
+            codes, route_details = _segment_text(full_text)
+    return update_info, codes, route_details
+
+
+# Estados reconocidos, del más específico al más general
+ROUTE_STATUSES = (
+    "TRANSITABLE CON PRECAUCIÓN",
+    "TRANSITABLE CON CADENAS",
+    "TRANSITABLE CON DEMORAS",
+    "INTRANSITABLE",
+    "TRANSITABLE",
+    "CORTE TOTAL",
+    "CORTE PARCIAL",
+    "CORTADA",
+    "CERRADA",
+    "HABILITADA",
+    "PRECAUCIÓN",
+)
+CLOSED_STATUSES = frozenset({"INTRANSITABLE", "CORTE TOTAL", "CORTADA", "CERRADA"})
+# Palabra corta por estado para listados compactos
+SHORT_STATUSES = {
+    "TRANSITABLE CON PRECAUCIÓN": "precaución",
+    "TRANSITABLE CON CADENAS": "cadenas",
+    "TRANSITABLE CON DEMORAS": "demoras",
+    "INTRANSITABLE": "intransitable",
+    "TRANSITABLE": "transitable",
+    "CORTE TOTAL": "cortada",
+    "CORTE PARCIAL": "corte parcial",
+    "CORTADA": "cortada",
+    "CERRADA": "cerrada",
+    "HABILITADA": "habilitada",
+    "PRECAUCIÓN": "precaución",
+}
+STATUS_PATTERN = re.compile(
+    r"(?:Estado:\s*)?\b(" + "|".join(re.escape(s) for s in ROUTE_STATUSES) + r")\b",
+    re.IGNORECASE,
+)
+_TRAMO_LABEL = re.compile(r"^\s*Tramo:\s*", re.IGNORECASE)
+_OBS_LABEL = re.compile(r"^\s*Observaciones:\s*", re.IGNORECASE)
+
+
+class RouteRecord:
+    """
+    One route entry of the ParteDiario.
+
+    Repeated values (status, update timestamp, section names) are interned,
+    so a snapshot holds one copy of each distinct string.
+
+    Attributes:
+        code (str): Route code (e.g. ``"P013"``).
+        tramo (str): Section description.
+        estado (str): Normalized status (one of ``ROUTE_STATUSES``) or ``""``.
+        observaciones (str): Free-text observations.
+        actualizado (str): Snapshot update timestamp (``"08:30hs. 19/10/2026"``).
+    """
+
+    __slots__ = ("code", "tramo", "estado", "observaciones", "actualizado")
+
+    def __init__(self, code, tramo, estado, observaciones, actualizado):
+        self.code = sys.intern(code)
+        self.tramo = sys.intern(tramo)
+        self.estado = sys.intern(estado)
+        self.observaciones = observaciones
+        self.actualizado = sys.intern(actualizado)
+
+    @property
+    def transitable(self):
+        """``False`` for closed routes, ``True`` for open ones, ``None`` if unknown."""
+        if not self.estado:
+            return None
+        return self.estado not in CLOSED_STATUSES
+
+    def render(self):
+        """Render the record as one compact line."""
+        parts = [self.code]
+        if self.tramo:
+            parts.append(self.tramo)
+        parts.append(self.estado or "SIN ESTADO")
+        if self.observaciones:
+            parts.append(self.observaciones)
+        return " | ".join(parts)
+
+    def short(self):
+        """Render code plus a one-word status (for budgeted listings)."""
+        return f"{self.code} {SHORT_STATUSES.get(self.estado, 's/d')}"
+
+    def summary(self):
+        """Render code, section and status only (for listings)."""
+        if self.tramo:
+            return f"{self.code}: {self.tramo} | {self.estado or 'SIN ESTADO'}"
+        return f"{self.code}: {self.estado or 'SIN ESTADO'}"
+
+    def describe(self):
+        """Render every field on its own line (for single-route answers)."""
+        lines = [f"Ruta: {self.code}"]
+        if self.tramo:
+            lines.append(f"Tramo: {self.tramo}")
+        lines.append(f"Estado: {self.estado or 'sin estado informado'}")
+        if self.observaciones:
+            lines.append(f"Observaciones: {self.observaciones}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"RouteRecord({self.code!r}, estado={self.estado!r})"
+
+
+def parse_record(code, block, actualizado=""):
+    """
+    Split a route block into fields.
+
+    Args:
+        code (str): Route code.
+        block (str): Block text starting with the code (from ``parse_routes``).
+        actualizado (str): Snapshot update timestamp.
+
+    Returns:
+        RouteRecord: Parsed record; unknown fields are empty strings.
+    """
+    body = " ".join(block[len(code):].split())
+    match = STATUS_PATTERN.search(body)
+    if match:
+        estado = match.group(1).upper()
+        tramo = body[:match.start()]
+        observaciones = body[match.end():]
+    else:
+        estado, tramo, observaciones = "", body, ""
+    tramo = _TRAMO_LABEL.sub("", tramo).strip(" -|:")
+    observaciones = _OBS_LABEL.sub("", observaciones.strip(" -|:")).strip()
+    return RouteRecord(code, tramo, estado, observaciones, actualizado)
+
+
+class RouteSnapshot:
+    """
+    Parsed ParteDiario: header plus one ``RouteRecord`` per route.
+
+    Attributes:
+        update_info (str): "Última actualización" header line (may be empty).
+        actualizado (str): Update timestamp (may be empty).
+        codes (list[str]): Route codes in order of appearance.
+        records (dict[str, RouteRecord]): Parsed records keyed by code.
+    """
+
+    __slots__ = ("update_info", "actualizado", "codes", "records")
+
+    def __init__(self, update_info, actualizado, codes, records):
+        self.update_info = update_info
+        self.actualizado = actualizado
+        self.codes = codes
+        self.records = records
+
+    def filter(self, predicate):
+        """Return the records, sorted by code, for which ``predicate`` is true."""
+        return [self.records[code] for code in sorted(self.records) if predicate(self.records[code])]
+
+    def texts(self):
+        """Return the rendered text of every record keyed by code."""
+        return {code: record.render() for code, record in self.records.items()}
+
+    def as_stale(self, now=None):
+        """
+        Return a copy whose header warns that the data may be outdated.
+
+        Args:
+            now (datetime): Current time (defaults to now).
+
+        Returns:
+            RouteSnapshot: Same records, ``update_info`` prefixed with the notice.
+        """
+        published = parse_actualizado(self.actualizado)
+        age = ""
+        if published is not None:
+            now = now or datetime.now(DPV_TIMEZONE)
+            age = f", hace {format_age(now - published)}"
+        notice = STALE_NOTICE.format(actualizado=self.actualizado or "sin fecha", age=age)
+        return RouteSnapshot(notice + self.update_info, self.actualizado, self.codes, self.records)
+
+
+def parse_actualizado(actualizado):
+    """Parse an ``actualizado`` value such as ``08:30hs. 19/10/2026``; ``None`` if it does not parse."""
+    try:
+        return datetime.strptime(actualizado, "%H:%Mhs. %d/%m/%Y").replace(tzinfo=DPV_TIMEZONE)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_age(delta):
+    """Human-readable age in Spanish (``25 min``, ``3 h 10 min``, ``2 días``)."""
+    minutes = max(0, int(delta.total_seconds() // 60))
+    if minutes < 60:
+        return f"{minutes} min"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 48:
+        return f"{hours} h {minutes} min" if minutes else f"{hours} h"
+    return f"{hours // 24} días"
+
+
+def parse_snapshot(full_text, rows=None):
+    """
+    Parse the PDF text into a ``RouteSnapshot``.
+
+    Args:
+        full_text (str): Text extracted from the PDF.
+        rows (list[list[str]]): Table rows to segment from (see ``parse_routes``).
+
+    Returns:
+        RouteSnapshot: Structured snapshot.
+    """
+    update_info, codes, details = parse_routes(full_text, rows)
+    update_match = UPDATE_PATTERN.search(full_text)
+    actualizado = f"{update_match.group(1)} {update_match.group(2)}" if update_match else ""
+    with timed(PDF_PARSE_LATENCY, stage="records"):
+        records = {code: parse_record(code, block, actualizado) for code, block in details.items()}
+    return RouteSnapshot(update_info, actualizado, codes, records)
@@ -0,0 +1,240 @@
+"""
+PDF text extraction backends for the ParteDiario.
+
+Every backend exposes the same interface:
+
+- ``pages(content)``: plain text per page.
+- ``text(content)``: all pages joined, split at every route code with
+  ``PDF_SEGMENTATION=text``.
+- ``rows(content)``: layout-aware table rows. Text segments are grouped
+  into rows by their vertical position and ordered left to right, so each
+  route row comes out as ``[code, tramo, estado, ...]`` cells regardless of
+  how the backend orders its plain-text output. ``parse_routes`` segments
+  the routes from these rows by default.
+
+``PDF_BACKEND`` selects the backend: ``pypdfium2``, ``pypdf``, ``pypdf2``,
+``pdfminer`` or ``auto`` (default: the first installed of pypdfium2, PyPDF2
+and pypdf, fastest first on the ParteDiario fixtures). All but PyPDF2 are optional dependencies,
+imported only when their backend is used. Compare them on the fixtures with
+``python -m benchmarks.run --suite pdf``.
+"""
+import logging
+import os
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto").lower()
+# Segments whose baselines differ by less than this (PDF points) share a row
+ROW_TOLERANCE = float(os.getenv("PDF_ROW_TOLERANCE", "2.5"))
+
+
+def group_rows(segments, tolerance=ROW_TOLERANCE):
+    """
+    Group positioned text segments of one page into table rows.
+
+    Args:
+        segments (list[tuple[float, float, str]]): ``(x, y, text)`` with PDF
+            coordinates (``y`` grows upwards).
+        tolerance (float): Maximum baseline difference within a row.
+
+    Returns:
+        list[list[str]]: Rows top to bottom, cells left to right.
+    """
+    rows = []
+    for x, y, text in sorted(segments, key=lambda s: (-s[1], s[0])):
+        text = " ".join(text.split())
+        if not text:
+            continue
+        if rows and abs(rows[-1][0] - y) <= tolerance:
+            rows[-1][1].append((x, text))
+        else:
+            rows.append((y, [(x, text)]))
+    return [[text for _, text in sorted(cells)] for _, cells in rows]
+
+
+class PdfBackend:
+    """
+    Interface of the extraction backends.
+
+    Subclasses implement ``pages`` and ``page_segments``; ``module`` is the
+    import name checked by ``available``.
+    """
+
+    name = ""
+    module = ""
+
+    @classmethod
+    def available(cls):
+        """Return whether the backend's library is installed."""
+        try:
+            __import__(cls.module)
+        except ImportError:
+            return False
+        return True
+
+    def pages(self, content):
+        """Return the plain text of each page."""
+        raise NotImplementedError
+
+    def page_segments(self, content):
+        """Return ``(x, y, text)`` segments for each page."""
+        raise NotImplementedError
+
+    def text(self, content):
+        """Return the text of every page, one page per line block."""
+        return "".join(page + "\n" for page in self.pages(content))
+
+    def rows(self, content):
+        """Return the layout-aware table rows of every page, in page order."""
+        return [row for segments in self.page_segments(content) for row in group_rows(segments)]
+
+
+class _PypdfFamilyBackend(PdfBackend):
+    """Shared code for PyPDF2 and its successor pypdf (same reader API)."""
+
+    def _reader(self, content):
+        return __import__(self.module).PdfReader(BytesIO(content))
+
+    def pages(self, content):
+        return [page.extract_text() for page in self._reader(content).pages]
+
+    def page_segments(self, content):
+        result = []
+        for page in self._reader(content).pages:
+            segments = []
+
+            def visitor(text, cm, tm, font_dict, font_size, segments=segments):
+                # Text matrix translation combined with the current transformation
+                x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                segments.append((x, y, text))
+
+            page.extract_text(visitor_text=visitor)
+            result.append(segments)
+        return result
+
+
+class PyPDF2Backend(_PypdfFamilyBackend):
+    """PyPDF2 (pure Python, the historical default)."""
+
+    name = "pypdf2"
+    module = "PyPDF2"
+
+
+class PypdfBackend(_PypdfFamilyBackend):
+    """pypdf, the maintained successor of PyPDF2 (pure Python)."""
+
+    name = "pypdf"
+    module = "pypdf"
+
+
+class PdfminerBackend(PdfBackend):
+    """pdfminer.six with layout analysis (pure Python, slowest, best layout)."""
+
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def _layout(self, content):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams
+
+        return extract_pages(BytesIO(content), laparams=LAParams())
+
+    def pages(self, content):
+        from pdfminer.layout import LTTextContainer
+
+        return [
+            "".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            for page in self._layout(content)
+        ]
+
+    def page_segments(self, content):
+        from pdfminer.layout import LTTextContainer, LTTextLine
+
+        result = []
+        for page in self._layout(content):
+            segments = []
+            for element in page:
+                if not isinstance(element, LTTextContainer):
+                    continue
+                lines = [element] if isinstance(element, LTTextLine) else list(element)
+                for line in lines:
+                    segments.append((line.x0, line.y0, line.get_text()))
+            result.append(segments)
+        return result
+
+
+class Pypdfium2Backend(PdfBackend):
+    """pypdfium2, bindings to Chrome's PDFium (native, fastest)."""
+
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def _pages(self, content):
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(content)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    yield textpage
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+    def pages(self, content):
+        return [textpage.get_text_range().replace("\r\n", "\n") for textpage in self._pages(content)]
+
+    def page_segments(self, content):
+        result = []
+        for textpage in self._pages(content):
+            segments = []
+            for i in range(textpage.count_rects()):
+                left, bottom, right, top = textpage.get_rect(i)
+                segments.append((left, bottom, textpage.get_text_bounded(left, bottom, right, top)))
+            result.append(segments)
+        return result
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (Pypdfium2Backend, PypdfBackend, PyPDF2Backend, PdfminerBackend)
+}
+# Preference of ``auto``, fastest first
+AUTO_ORDER = ("pypdfium2", "pypdf2", "pypdf")
+
+_instances = {}
+
+
+def available_backends():
+    """Return the names of the installed backends."""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_pdf_backend(name=None):
+    """
+    Return the backend named ``name`` (default ``PDF_BACKEND``).
+
+    Raises:
+        ValueError: If the name is unknown.
+        ImportError: If the requested backend is not installed.
+    """
+    name = (name or PDF_BACKEND).lower()
+    if name not in _instances:
+        if name == "auto":
+            selected = next((n for n in AUTO_ORDER if BACKENDS[n].available()), None)
+            if selected is None:
+                raise ImportError("No PDF backend installed; install pypdfium2, PyPDF2 or pypdf")
+            logger.info(f"Using {selected} PDF backend")
+            _instances[name] = get_pdf_backend(selected)
+        elif name not in BACKENDS:
+            raise ValueError(f"Unsupported PDF_BACKEND: {name}")
+        elif not BACKENDS[name].available():
+            raise ImportError(f"PDF_BACKEND={name} requires the '{BACKENDS[name].module}' package")
+        else:
+            _instances[name] = BACKENDS[name]()
+    return _instances[name]
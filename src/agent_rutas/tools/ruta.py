@@ -1,103 +1,315 @@
 """Tools for route status queries."""
+import os
+
 from langchain_core.tools import tool
-import re
-import requests
-from io import BytesIO
-import PyPDF2
+
+from ..utils.cache import digest, get_cache
+from ..utils.circuit_breaker import CircuitBreaker
+from ..utils.deadline import DeadlineExceeded
+from ..utils.metrics import STALE_SNAPSHOTS
+from .parte_diario import STALE_NOTICE, SnapshotError, extract_layout, parse_snapshot
+from .semantic import SEMANTIC_SEARCH_ENABLED, semantic_search
+from .shared_snapshot import SHARED_SNAPSHOT_ENABLED, SharedSnapshotStore
+from .sources import get_source
+
+# Tope de tamaño de la salida de la herramienta (~4 caracteres por token)
+MAX_OUTPUT_TOKENS = int(os.getenv("ROUTES_TOOL_MAX_TOKENS", "400"))
+MAX_OUTPUT_CHARS = int(os.getenv("ROUTES_TOOL_MAX_CHARS", str(MAX_OUTPUT_TOKENS * 4)))
+
+# TTL de la caché compartida (snapshot parseado y respuestas de la herramienta)
+SNAPSHOT_CACHE_TTL_SECONDS = float(os.getenv("SNAPSHOT_CACHE_TTL_SECONDS", "120"))
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "120"))
+# Último parte bueno: se sirve con aviso mientras la web de la DPV no responde
+LAST_GOOD_TTL_SECONDS = float(os.getenv("LAST_GOOD_SNAPSHOT_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Mensajes de error del parte (la herramienta los devuelve como texto al modelo)
+DOWNLOAD_ERROR = "Error al descargar la información: "
+PDF_ERROR = "Error al leer el PDF: "
+DPV_UNAVAILABLE = "La web de la DPV no responde en este momento. Intentá nuevamente en unos minutos."
+# Comienzo de las salidas que no reflejan el parte vigente
+DEGRADED_PREFIXES = (DOWNLOAD_ERROR, PDF_ERROR, DPV_UNAVAILABLE, STALE_NOTICE[: STALE_NOTICE.index("{")])
+
+# Palabras de la consulta que piden filtrar por estado de transitabilidad
+STATUS_QUERIES = (
+    (("cortada", "cortadas", "cerrada", "cerradas", "intransitable", "intransitables", "corte"),
+     "Rutas cortadas o intransitables:",
+     lambda record: record.transitable is False),
+    (("precaución", "precaucion"),
+     "Rutas transitables con precaución:",
+     lambda record: "PRECAUCIÓN" in record.estado),
+    (("cadenas",),
+     "Rutas con uso obligatorio de cadenas:",
+     lambda record: "CADENAS" in record.estado),
+)
+
+
+def fetch_snapshot():
+    """
+    Fetch the ParteDiario from the configured source (live, record or replay) and parse it.
+
+    Returns:
+        RouteSnapshot: Parsed snapshot.
+
+    Raises:
+        SnapshotError: With the message to return to the model.
+    """
+    try:
+        content = get_source().fetch()
+    except Exception as e:
+        raise SnapshotError(f"{DOWNLOAD_ERROR}{str(e)}") from e
+
+    try:
+        full_text, rows = extract_layout(content)
+    except Exception as e:
+        raise SnapshotError(f"{PDF_ERROR}{str(e)}") from e
+
+    return parse_snapshot(full_text, rows)
+
+
+def refresh_snapshot():
+    """Fetch the ParteDiario and store it as the cached and last good snapshot."""
+    global _last_good
+    snapshot = fetch_snapshot()
+    cache = get_cache()
+    cache.set("snapshot", "parte_diario", snapshot, SNAPSHOT_CACHE_TTL_SECONDS)
+    cache.set("snapshot", "last_good", snapshot, LAST_GOOD_TTL_SECONDS)
+    _last_good = snapshot
+    return snapshot
+
+
+_last_good = None
+
+# Tras fallas seguidas deja de consultar la DPV y prueba en segundo plano
+DPV_BREAKER = CircuitBreaker("dpv", probe=refresh_snapshot)
+
+
+def _serve_stale(error):
+    """Return the last good snapshot marked as outdated, or raise ``error``."""
+    snapshot = _last_good or get_cache().get("snapshot", "last_good")
+    if snapshot is None:
+        raise error
+    STALE_SNAPSHOTS.inc()
+    return snapshot.as_stale()
+
+
+def fetch_fresh_snapshot():
+    """
+    Fetch a fresh snapshot behind the DPV circuit breaker.
+
+    Raises:
+        SnapshotError: If the circuit is open or the fetch fails (never
+            returns a stale snapshot, so the result can be shared).
+    """
+    if not DPV_BREAKER.allow():
+        raise SnapshotError(DPV_UNAVAILABLE)
+    try:
+        snapshot = refresh_snapshot()
+    except SnapshotError as e:
+        # A request running out of time says nothing about the source's health
+        if not isinstance(e.__cause__, DeadlineExceeded):
+            DPV_BREAKER.record_failure()
+        raise
+    DPV_BREAKER.record_success()
+    return snapshot
+
+
+def load_snapshot():
+    """
+    Return the snapshot from the cache backend, fetching it on a miss.
+
+    While the DPV circuit is open (or a fetch fails) the last good snapshot
+    is returned with a staleness notice, without waiting on the source.
+
+    Raises:
+        SnapshotError: If the source fails and there is no previous snapshot.
+    """
+    snapshot = get_cache().get("snapshot", "parte_diario")
+    if snapshot is not None:
+        return snapshot
+    try:
+        return fetch_fresh_snapshot()
+    except SnapshotError as e:
+        return _serve_stale(e)
+
+
+# Con varios workers, un único proceso por host descarga y publica el parte (solo datos frescos)
+SHARED_SNAPSHOT = (
+    SharedSnapshotStore(fetch=fetch_fresh_snapshot, allow=DPV_BREAKER.allow) if SHARED_SNAPSHOT_ENABLED else None
+)
+
+
+def get_snapshot():
+    """
+    Return the current snapshot, from the host-wide shared file when enabled.
+
+    If the shared file cannot be refreshed, its last generation is served
+    marked as stale (the notice is built now, so its age is current).
+    """
+    if SHARED_SNAPSHOT is None:
+        return load_snapshot()
+    try:
+        return SHARED_SNAPSHOT.get()
+    except SnapshotError as e:
+        published = SHARED_SNAPSHOT.latest()
+        if published is None:
+            return _serve_stale(e)
+        STALE_SNAPSHOTS.inc()
+        return published.as_stale()
+
+
+def is_degraded_output(content):
+    """Whether a tool output reports a fetch error or comes from the last good (stale) snapshot."""
+    return isinstance(content, str) and content.startswith(DEGRADED_PREFIXES)
+
+
+def _clip(text, budget=None):
+    """Cut ``text`` to the output budget."""
+    budget = budget or MAX_OUTPUT_CHARS
+    if len(text) <= budget:
+        return text
+    return text[: max(0, budget - 3)] + "..."
+
+
+def _paginate(header, items, cursor=0, footer="", separator="\n"):
+    """
+    Fit as many ``items`` as the output budget allows, starting at ``cursor``.
+
+    When items remain, the footer is replaced by a continuation line with the
+    cursor to use on the next call, so the output never exceeds
+    ``MAX_OUTPUT_CHARS`` however many routes the PDF lists. An item bigger
+    than the whole budget is clipped on its own; the continuation line is
+    added after clipping, so the cursor is never cut off.
+    """
+    cursor = max(0, cursor)
+    continuation = (
+        "\n(... {remaining} más. Para ver el resto, llamá de nuevo con la misma consulta y cursor={next_cursor})"
+    )
+    reserve = max(len(footer), len(continuation) + 8)
+    available = MAX_OUTPUT_CHARS - len(header) - reserve
+    taken = []
+    for item in items[cursor:]:
+        cost = len(item) + len(separator)
+        if cost > available:
+            if taken:
+                break
+            item = _clip(item, max(3, available - len(separator)))
+            cost = len(item) + len(separator)
+        taken.append(item)
+        available -= cost
+    next_cursor = cursor + len(taken)
+    if next_cursor < len(items):
+        tail = continuation.format(remaining=len(items) - next_cursor, next_cursor=next_cursor)
+    else:
+        tail = footer
+    return _clip(header + separator.join(taken), max(3, MAX_OUTPUT_CHARS - len(tail))) + tail
+
+
+def _status_filter(query_lower):
+    """Return ``(title, predicate)`` if the query asks for routes by status."""
+    words = set(query_lower.replace("?", " ").replace("¿", " ").split())
+    for keywords, title, predicate in STATUS_QUERIES:
+        if words.intersection(keywords):
+            return title, predicate
+    return None
+
 
 @tool
-def buscar_estado_rutas(query: str) -> str:
+def buscar_estado_rutas(query: str, cursor: int = 0) -> str:
     """
     Descarga el PDF de la DPV Neuquén, extrae el texto y busca información de rutas.
-    - Si la consulta menciona un código específico (p.ej., 'P005'), devuelve el bloque correspondiente.
+    - Si la consulta menciona un código específico (p.ej., 'P005'), devuelve el detalle de esa ruta (tramo, estado, observaciones).
+    - Si la consulta pide rutas por estado (p.ej., "rutas cortadas", "con precaución", "con cadenas"), devuelve solo esas rutas.
     - Si la consulta contiene términos descriptivos (ej. "neuquén centenario"), intenta identificar el tramo asociado.
+      Si ningún tramo contiene todos los términos y la búsqueda semántica está habilitada, devuelve las rutas más relevantes.
     - Si la consulta es "rutas disponibles", devuelve todas las rutas con sus códigos.
     - En caso de ser una consulta general, lista los códigos disponibles.
     Además, se extrae de la cabecera del PDF la información de la última actualización (hora y fecha)
     y se incluye en la respuesta.
+    Los listados son compactos (código y estado) y se paginan: si la respuesta indica un cursor,
+    volvé a llamar con la misma consulta y ese valor de `cursor` para obtener más rutas.
     """
-    url = "https://w2.dpvneuquen.gov.ar/ParteDiario.pdf"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        return f"Error al descargar la información: {str(e)}"
-
-    f = BytesIO(response.content)
     try:
-        reader = PyPDF2.PdfReader(f)
-    except Exception as e:
-        return f"Error al leer el PDF: {str(e)}"
-
-    full_text = ""
-    for page in reader.pages:
-        full_text += page.extract_text() + "\n"
+        snapshot = get_snapshot()
+    except SnapshotError as e:
+        return str(e)
 
-    update_match = re.search(
-        r"Información Actualizada a las\s+([\d:]+hs\.)\s+del\s+(\d{2}/\d{2}/\d{4})",
-        full_text,
-        re.IGNORECASE,
+    # Misma consulta sobre el mismo parte: respuesta desde la caché compartida
+    cache_key = (
+        digest("buscar_estado_rutas", snapshot.update_info, MAX_OUTPUT_CHARS, cursor, query)
+        if snapshot.actualizado
+        else None
     )
-    if update_match:
-        update_info = f"Última actualización: {update_match.group(1)} {update_match.group(2)}\n\n"
-    else:
-        update_info = ""
+    if cache_key:
+        cached = get_cache().get("tool", cache_key)
+        if cached is not None:
+            return cached
+    result = _answer(snapshot, query, cursor)
+    if cache_key:
+        get_cache().set("tool", cache_key, result, TOOL_CACHE_TTL_SECONDS)
+    return result
 
-    routes = re.findall(r"([PN]\d{3})", full_text)
-    unique_routes = list(dict.fromkeys(routes))
 
-    route_details = {}
-    for code in unique_routes:
-        pattern = re.compile(
-            re.escape(code) + r"(.*?)(?=[PN]\d{3}|$)", re.DOTALL
-        )
-        m = pattern.search(full_text)
-        if m:
-            block = code + m.group(1).strip()
-            route_details[code] = block
+def _answer(snapshot, query, cursor):
+    """Build the tool output for ``query`` from ``snapshot``."""
+    update_info = snapshot.update_info
+    records = snapshot.records
 
     query_lower = query.lower()
     if query_lower == "rutas disponibles":
-        lines = [f"{update_info}Lista de todas las rutas disponibles:"]
-        for code in sorted(unique_routes):
-            desc = route_details[code]
-            short_desc = desc[len(code):].strip()
-            if len(short_desc) > 100:
-                short_desc = short_desc[:100] + "..."
-            lines.append(f"- {code}: {short_desc}")
-        return "\n".join(lines)
-
-    for code in unique_routes:
+        return _paginate(
+            f"{update_info}Lista de todas las rutas disponibles (código y estado):\n",
+            [records[code].short() for code in sorted(records)],
+            cursor,
+            separator="; ",
+        )
+
+    for code in snapshot.codes:
         if code.lower() in query_lower:
-            return f"{update_info}Información para la ruta {code}:\n{route_details.get(code, 'No se encontró el detalle correspondiente.')}"
+            record = records.get(code)
+            detail = record.describe() if record else "No se encontró el detalle correspondiente."
+            return _clip(f"{update_info}Información para la ruta {code}:\n{detail}")
+
+    status_filter = _status_filter(query_lower)
+    if status_filter:
+        title, predicate = status_filter
+        selected = snapshot.filter(predicate)
+        if not selected:
+            return f"{update_info}No hay rutas en ese estado según el parte diario."
+        return _paginate(
+            f"{update_info}{title}\n", [f"- {record.render()}" for record in selected], cursor
+        )
 
     query_words = query_lower.split()
     matching = []
-    for code, block in route_details.items():
-        block_lower = block.lower()
-        if all(w in block_lower for w in query_words):
+    for code, record in records.items():
+        text_lower = record.render().lower()
+        if all(w in text_lower for w in query_words):
             matching.append(code)
 
     if len(matching) == 1:
         code = matching[0]
-        return f"{update_info}Información para la ruta {code}:\n{route_details[code]}"
+        return _clip(f"{update_info}Información para la ruta {code}:\n{records[code].describe()}")
     elif len(matching) > 1:
-        lines = [f"{update_info}Encontré múltiples rutas que podrían corresponder:"]
-        for code in matching:
-            desc = route_details[code]
-            short_desc = desc[len(code):].strip()
-            if len(short_desc) > 80:
-                short_desc = short_desc[:80] + "..."
-            lines.append(f"- {code}: {short_desc}")
-        lines.append("¿Podrías especificar cuál te interesa?")
-        return "\n".join(lines)
-    else:
-        lines = [f"{update_info}Estado actual de las rutas en Neuquén:"]
-        for code in sorted(unique_routes):
-            desc = route_details[code]
-            short_desc = desc[len(code):].strip()
-            if len(short_desc) > 100:
-                short_desc = short_desc[:100] + "..."
-            lines.append(f"- {code}: {short_desc}")
-        lines.append("\n¿Sobre cuál de estos tramos te gustaría información más detallada?")
-        return "\n".join(lines)
+        return _paginate(
+            f"{update_info}Encontré múltiples rutas que podrían corresponder:\n",
+            [f"- {records[code].summary()}" for code in matching],
+            cursor,
+            footer="\n¿Podrías especificar cuál te interesa?",
+        )
+
+    # Sin coincidencias literales: probar búsqueda semántica antes de listar todo
+    semantic_matches = semantic_search(snapshot.texts(), query) if SEMANTIC_SEARCH_ENABLED else None
+    if semantic_matches:
+        return _paginate(
+            f"{update_info}Rutas más relevantes para la consulta:\n",
+            [f"- {records[code].render()}" for code in semantic_matches],
+            cursor,
+        )
+
+    return _paginate(
+        f"{update_info}Estado actual de las rutas en Neuquén (código y estado):\n",
+        [records[code].short() for code in sorted(records)],
+        cursor,
+        footer="\n¿Sobre cuál de estos tramos te gustaría información más detallada?",
+        separator="; ",
+    )
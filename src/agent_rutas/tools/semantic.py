@@ -0,0 +1,142 @@
+"""
+Semantic retrieval over ParteDiario route blocks.
+
+Each route block is embedded once per snapshot with ``Embedder`` and kept in
+a single contiguous, L2-normalized ``float32`` matrix, so a query is one
+matrix-vector product plus a partial sort. Enabled with
+``ROUTES_SEMANTIC_SEARCH=1``.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_SEARCH_ENABLED = os.getenv("ROUTES_SEMANTIC_SEARCH", "0").lower() in ("1", "true", "yes")
+EMBEDDING_MODEL = os.getenv("ROUTES_EMBEDDING_MODEL", "text-embedding-3-small")
+TOP_K = int(os.getenv("ROUTES_SEMANTIC_TOP_K", "3"))
+MIN_SCORE = float(os.getenv("ROUTES_SEMANTIC_MIN_SCORE", "0.2"))
+
+
+class RouteIndex:
+    """
+    Cosine-similarity index over route blocks.
+
+    Attributes:
+        codes (list[str]): Route code of each matrix row.
+        matrix (numpy.ndarray): ``(n, dim)`` normalized ``float32`` vectors.
+        fingerprint (str): Hash of the indexed blocks (identifies the snapshot).
+    """
+
+    def __init__(self, codes, matrix, fingerprint):
+        self.codes = codes
+        self.matrix = np.ascontiguousarray(_normalize(matrix), dtype=np.float32)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, route_texts, embedder):
+        """
+        Embed every route block of a snapshot.
+
+        Args:
+            route_texts (dict[str, str]): Route text keyed by code.
+            embedder (Embedder): Embedder used for blocks and queries.
+
+        Returns:
+            RouteIndex: Index over the snapshot.
+        """
+        codes = list(route_texts)
+        blocks = [route_texts[code] for code in codes]
+        matrix = embedder.embed_documents_array(blocks)
+        return cls(codes, matrix, snapshot_fingerprint(route_texts))
+
+    def search(self, query_vector, k=TOP_K, min_score=MIN_SCORE):
+        """
+        Return the ``k`` routes closest to ``query_vector``.
+
+        Args:
+            query_vector (list[float]): Query embedding.
+            k (int): Maximum number of routes.
+            min_score (float): Minimum cosine similarity to keep a route.
+
+        Returns:
+            list[tuple[str, float]]: ``(code, score)`` sorted by score.
+        """
+        if not self.codes:
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.codes[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def _normalize(matrix):
+    """L2-normalize the rows of ``matrix`` (zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def snapshot_fingerprint(route_texts):
+    """Hash the route texts so an index is rebuilt only when they change."""
+    digest = hashlib.sha256()
+    for code, block in route_texts.items():
+        digest.update(code.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(block.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+_lock = threading.Lock()
+_embedder = None
+_index = None
+
+
+def _get_embedder():
+    """Create the shared ``Embedder`` on first use."""
+    global _embedder
+    if _embedder is None:
+        from ..model.embeddings import Embedder
+
+        _embedder = Embedder(model_name=EMBEDDING_MODEL)
+    return _embedder
+
+
+def get_index(route_texts):
+    """Return the index for this snapshot, building it if the blocks changed."""
+    global _index
+    fingerprint = snapshot_fingerprint(route_texts)
+    with _lock:
+        if _index is None or _index.fingerprint != fingerprint:
+            _index = RouteIndex.build(route_texts, _get_embedder())
+        return _index
+
+
+def semantic_search(route_texts, query, k=TOP_K):
+    """
+    Find the routes most related to ``query``.
+
+    Args:
+        route_texts (dict[str, str]): Route text keyed by code.
+        query (str): User query.
+        k (int): Maximum number of routes.
+
+    Returns:
+        list[str] | None: Matching codes, or ``None`` when semantic search is
+        disabled or unavailable (callers fall back to literal matching).
+    """
+    if not SEMANTIC_SEARCH_ENABLED or not route_texts:
+        return None
+    try:
+        index = get_index(route_texts)
+        query_vector = _get_embedder().embed_query(query)
+        return [code for code, _ in index.search(query_vector, k)]
+    except Exception as e:
+        logger.warning(f"Semantic route search unavailable: {e}")
+        return None
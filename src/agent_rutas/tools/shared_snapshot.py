@@ -0,0 +1,380 @@
+"""
+Host-wide ParteDiario snapshot shared by every API worker.
+
+With several uvicorn/gunicorn workers each one used to download and parse
+the PDF on its own. ``SharedSnapshotStore`` publishes the parsed
+``RouteSnapshot`` once per host into a memory-mapped file:
+
+- One worker is elected refresher by holding an exclusive ``flock`` on
+  ``<path>.lock``; it refreshes the file every ``refresh_seconds`` from a
+  background thread. If it dies, the OS releases the lock and the next
+  worker that notices takes over.
+- The file is written to a temporary name and atomically renamed, so
+  readers always see a complete generation. Readers map it read-only and
+  remap only when the file changes (one ``stat`` per lookup).
+- Only the refresher parses the PDF. Readers decode each record from the
+  mapping on first access and keep it for that generation, so listings
+  and scans do not decode the table again on every request; a new
+  generation starts with an empty cache.
+- Only fresh snapshots are published. When the source fails the file
+  keeps its last generation and callers mark it stale at read time
+  (``latest()``), so the notice and its age stay current.
+
+File layout (little endian)::
+
+    header   magic "ARSNAP01" | format u32 | generation u64 | published_at f64
+             | payload_len u64 | crc32 u32
+    payload  n_codes u32 | flags u8 * n_codes (1 = code has a record)
+             | (offset u32, length u32) * (2 + 4 * n_codes) | UTF-8 strings
+
+Strings are ``update_info``, ``actualizado`` and then code, tramo, estado,
+observaciones for each code. Enabled with ``SHARED_SNAPSHOT=1``.
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+from ..utils.deadline import DeadlineExceeded, timeout_for
+from .parte_diario import RouteRecord, RouteSnapshot
+
+logger = logging.getLogger(__name__)
+
+SHARED_SNAPSHOT_ENABLED = os.getenv("SHARED_SNAPSHOT", "0").lower() in ("1", "true", "yes")
+SHARED_SNAPSHOT_PATH = os.getenv(
+    "SHARED_SNAPSHOT_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "agent-rutas-snapshot.bin"),
+)
+SHARED_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SHARED_SNAPSHOT_REFRESH_SECONDS", "300"))
+# Readers treat an older file as abandoned and try to take over refreshing
+SHARED_SNAPSHOT_MAX_AGE_SECONDS = float(
+    os.getenv("SHARED_SNAPSHOT_MAX_AGE_SECONDS", str(SHARED_SNAPSHOT_REFRESH_SECONDS * 2))
+)
+# How long a reader waits for the refresher to publish (capped by the request deadline)
+SHARED_SNAPSHOT_WAIT_SECONDS = float(os.getenv("SHARED_SNAPSHOT_WAIT_SECONDS", "15"))
+
+MAGIC = b"ARSNAP01"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQdQI")
+FIELDS_PER_CODE = 4
+
+
+class SnapshotFormatError(ValueError):
+    """The shared snapshot file is truncated, corrupt or of another format."""
+
+
+def encode_snapshot(snapshot):
+    """
+    Serialize a ``RouteSnapshot`` into the payload format.
+
+    Args:
+        snapshot (RouteSnapshot): Parsed snapshot.
+
+    Returns:
+        bytes: Payload (without header).
+    """
+    codes = list(snapshot.codes)
+    strings = [snapshot.update_info, snapshot.actualizado]
+    flags = bytearray()
+    for code in codes:
+        record = snapshot.records.get(code)
+        flags.append(1 if record is not None else 0)
+        if record is None:
+            strings.extend((code, "", "", ""))
+        else:
+            strings.extend((code, record.tramo, record.estado, record.observaciones))
+
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = struct.Struct("<" + "II" * len(blobs))
+    table = []
+    position = 0
+    for blob in blobs:
+        table.extend((position, len(blob)))
+        position += len(blob)
+    return b"".join(
+        [struct.pack("<I", len(codes)), bytes(flags), offsets.pack(*table)] + blobs
+    )
+
+
+class _MappedRecords(Mapping):
+    """Read-only ``code -> RouteRecord`` view decoding each record once, on first access."""
+
+    def __init__(self, view, codes, flags, offsets, strings_start, actualizado):
+        self._view = view
+        self._decoded = {}
+        self._codes = [code for code, flag in zip(codes, flags) if flag]
+        self._index = {code: i for i, (code, flag) in enumerate(zip(codes, flags)) if flag}
+        self._offsets = offsets
+        self._strings_start = strings_start
+        self._actualizado = actualizado
+
+    def _string(self, i):
+        offset, length = self._offsets[2 * i], self._offsets[2 * i + 1]
+        start = self._strings_start + offset
+        return str(self._view[start:start + length], "utf-8")
+
+    def __getitem__(self, code):
+        record = self._decoded.get(code)
+        if record is None:
+            # Vive lo mismo que esta generación del archivo
+            base = 2 + FIELDS_PER_CODE * self._index[code]
+            record = RouteRecord(
+                code,
+                self._string(base + 1),
+                self._string(base + 2),
+                self._string(base + 3),
+                self._actualizado,
+            )
+            self._decoded[code] = record
+        return record
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+
+class MappedSnapshot:
+    """
+    One generation of the shared file, mapped read-only.
+
+    Attributes:
+        generation (int): Monotonic generation number.
+        published_at (float): Epoch seconds when it was written.
+        snapshot (RouteSnapshot): Snapshot whose records decode lazily (once) from the mapping.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            if stat.st_size < HEADER.size:
+                raise SnapshotFormatError(f"Shared snapshot too small: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, generation, published_at, payload_len, crc = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"Unknown shared snapshot format in {path}")
+        payload = view[HEADER.size:HEADER.size + payload_len]
+        if len(payload) != payload_len or zlib.crc32(payload) != crc:
+            raise SnapshotFormatError(f"Corrupt shared snapshot: {path}")
+        self.generation = generation
+        self.published_at = published_at
+        self.snapshot = self._decode(view, HEADER.size)
+
+    def _decode(self, view, start):
+        (n_codes,) = struct.unpack_from("<I", view, start)
+        flags = bytes(view[start + 4:start + 4 + n_codes])
+        n_strings = 2 + FIELDS_PER_CODE * n_codes
+        table_start = start + 4 + n_codes
+        offsets = struct.unpack_from("<" + "II" * n_strings, view, table_start)
+        strings_start = table_start + 8 * n_strings
+
+        def string(i):
+            offset, length = offsets[2 * i], offsets[2 * i + 1]
+            return str(view[strings_start + offset:strings_start + offset + length], "utf-8")
+
+        update_info, actualizado = string(0), string(1)
+        codes = [string(2 + FIELDS_PER_CODE * i) for i in range(n_codes)]
+        records = _MappedRecords(view, codes, flags, offsets, strings_start, actualizado)
+        return RouteSnapshot(update_info, actualizado, codes, records)
+
+    @property
+    def age(self):
+        """Seconds since the generation was published."""
+        return time.time() - self.published_at
+
+
+class SharedSnapshotStore:
+    """
+    Publishes and reads the host-wide snapshot file.
+
+    Args:
+        fetch (callable): Returns a fresh ``RouteSnapshot`` (download + parse).
+        path (str): Snapshot file; ``<path>.lock`` is the election lock.
+        refresh_seconds (float): Refresh interval of the elected refresher.
+        max_age_seconds (float): Age after which readers try to take over.
+        wait_seconds (float): Time a reader waits for a new publication
+            before fetching on its own; capped by the current deadline.
+        allow (callable): Whether the source may be tried now (e.g. a
+            circuit breaker's ``allow``); when it says no, readers of an
+            old file skip the wait and call ``fetch`` at once.
+
+    Example:
+        ```python
+        store = SharedSnapshotStore(fetch=fetch_snapshot)
+        snapshot = store.get()
+        ```
+    """
+
+    def __init__(
+        self,
+        fetch,
+        path=SHARED_SNAPSHOT_PATH,
+        refresh_seconds=SHARED_SNAPSHOT_REFRESH_SECONDS,
+        max_age_seconds=SHARED_SNAPSHOT_MAX_AGE_SECONDS,
+        wait_seconds=SHARED_SNAPSHOT_WAIT_SECONDS,
+        allow=None,
+    ):
+        self.fetch = fetch
+        self.allow = allow
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._mapped = None
+        self._lock_file = None
+        self._pid = None
+        self._refresher = None
+        self._last_election = 0.0
+
+    # --- election -----------------------------------------------------
+
+    @property
+    def is_refresher(self):
+        """True if this process holds the refresher lock."""
+        return self._lock_file is not None and self._pid == os.getpid()
+
+    def _try_elect(self):
+        """Try to become the refresher (non-blocking); start the refresh thread if elected."""
+        if self.is_refresher:
+            return True
+        now = time.monotonic()
+        if now - self._last_election < 1.0:
+            return False
+        self._last_election = now
+        lock_file = open(self.path + ".lock", "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file, self._pid = lock_file, os.getpid()
+        logger.info(f"Process {self._pid} elected shared snapshot refresher ({self.path})")
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="agent-rutas-snapshot-refresher", daemon=True
+        )
+        self._refresher.start()
+        return True
+
+    def _refresh_if_older(self, max_age):
+        """Fetch and publish unless a generation younger than ``max_age`` exists."""
+        with self._refresh_lock:
+            current = self._current()
+            if current is None or current.age >= max_age:
+                self.publish(self.fetch())
+                current = self._current()
+            return current
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self._refresh_if_older(self.refresh_seconds)
+            except Exception as e:
+                logger.warning(f"Shared snapshot refresh failed: {e}")
+            time.sleep(max(1.0, self.refresh_seconds / 10))
+
+    # --- writer -------------------------------------------------------
+
+    def publish(self, snapshot):
+        """
+        Write ``snapshot`` as the next generation (atomic rename).
+
+        Returns:
+            int: Generation number written.
+        """
+        with self._publish_lock:
+            current = self._current()
+            generation = (current.generation + 1) if current else 1
+            payload = encode_snapshot(snapshot)
+            header = HEADER.pack(
+                MAGIC, FORMAT_VERSION, generation, time.time(), len(payload), zlib.crc32(payload)
+            )
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".agent-rutas-snapshot.", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            logger.info(f"Published shared snapshot generation {generation} ({len(payload)} bytes)")
+            return generation
+
+    # --- reader -------------------------------------------------------
+
+    def _current(self):
+        """Return the mapping of the current file, remapping if it changed."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            mapped = self._mapped
+            if mapped is None or mapped.identity != (stat.st_ino, stat.st_mtime_ns):
+                try:
+                    mapped = MappedSnapshot(self.path)
+                except (OSError, ValueError, struct.error) as e:
+                    logger.warning(f"Ignoring unreadable shared snapshot: {e}")
+                    return None
+                self._mapped = mapped
+            return mapped
+
+    def latest(self):
+        """Return the last published ``RouteSnapshot`` whatever its age, or ``None``."""
+        current = self._current()
+        return current.snapshot if current is not None else None
+
+    def get(self):
+        """
+        Return the current ``RouteSnapshot``.
+
+        Serves the shared file while it is younger than ``max_age_seconds``.
+        Otherwise the caller tries to become refresher and refresh it; if
+        another process is refreshing, it waits for a new generation (up to
+        ``wait_seconds``, never past the request deadline) and finally
+        fetches on its own without publishing.
+        """
+        current = self._current()
+        self._try_elect()
+        if current is not None and current.age < self.max_age_seconds:
+            return current.snapshot
+
+        if self.is_refresher:
+            return self._refresh_if_older(self.max_age_seconds).snapshot
+
+        try:
+            wait = timeout_for(self.wait_seconds) if self.allow is None or self.allow() else 0.0
+        except DeadlineExceeded:
+            wait = 0.0
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+            current = self._current()
+            if current is not None and current.age < self.max_age_seconds:
+                return current.snapshot
+            if self._try_elect():
+                return self._refresh_if_older(self.max_age_seconds).snapshot
+        logger.warning("Shared snapshot not refreshed in time, fetching locally")
+        return self.fetch()
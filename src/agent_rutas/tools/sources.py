@@ -0,0 +1,214 @@
+"""
+Where ``buscar_estado_rutas`` gets the ParteDiario PDF from.
+
+``PARTE_DIARIO_SOURCE`` selects the source:
+
+- ``live``: download from the DPV site (default).
+- ``record``: download live and archive every fetched PDF in
+  ``PARTE_DIARIO_ARCHIVE`` as ``<UTC timestamp>-<sha256 prefix>.pdf``, plus
+  one line per fetch in ``index.jsonl`` (timestamp, hash, size, URL).
+- ``replay``: serve archived PDFs from ``PARTE_DIARIO_ARCHIVE`` (a directory
+  or a single ``.pdf``) with no network, optionally adding
+  ``PARTE_DIARIO_REPLAY_LATENCY_MS`` per fetch to mimic the real site.
+
+Replayed fetches honour the request deadline like a real download: when the
+simulated latency exceeds the remaining budget they fail with
+``requests.Timeout`` after waiting the budget.
+"""
+import glob
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from ..utils.deadline import timeout_for
+from . import parte_diario
+
+logger = logging.getLogger(__name__)
+
+PARTE_DIARIO_SOURCE = os.getenv("PARTE_DIARIO_SOURCE", "live").lower()
+PARTE_DIARIO_ARCHIVE = os.getenv("PARTE_DIARIO_ARCHIVE", "parte_diario_archive")
+PARTE_DIARIO_REPLAY_LATENCY_MS = float(os.getenv("PARTE_DIARIO_REPLAY_LATENCY_MS", "0"))
+# latest: always the newest archived PDF; cycle: each fetch serves the next one
+PARTE_DIARIO_REPLAY_ORDER = os.getenv("PARTE_DIARIO_REPLAY_ORDER", "latest").lower()
+
+INDEX_FILE = "index.jsonl"
+
+
+class LiveSource:
+    """Download the ParteDiario from the DPV site."""
+
+    name = "live"
+
+    def __init__(self, url=parte_diario.PARTE_DIARIO_URL):
+        self.url = url
+
+    def fetch(self):
+        """Return the PDF bytes."""
+        return parte_diario.download_parte_diario(self.url)
+
+
+class RecordingSource(LiveSource):
+    """
+    Live source that archives every PDF it fetches.
+
+    Identical PDFs are stored once (the file name carries the hash) but
+    every fetch is logged in ``index.jsonl``.
+
+    Args:
+        archive_dir (str): Archive directory (created if missing).
+        url (str): Location of the PDF.
+    """
+
+    name = "record"
+
+    def __init__(self, archive_dir=PARTE_DIARIO_ARCHIVE, url=parte_diario.PARTE_DIARIO_URL):
+        super().__init__(url)
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def fetch(self):
+        content = super().fetch()
+        try:
+            self._archive(content)
+        except OSError as e:
+            logger.warning(f"Could not archive ParteDiario: {e}")
+        return content
+
+    def _archive(self, content):
+        fetched_at = datetime.now(timezone.utc)
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            existing = glob.glob(os.path.join(self.archive_dir, f"*-{sha256[:16]}.pdf"))
+            if existing:
+                file_name = os.path.basename(existing[0])
+            else:
+                file_name = f"{fetched_at.strftime('%Y%m%dT%H%M%SZ')}-{sha256[:16]}.pdf"
+                tmp_path = os.path.join(self.archive_dir, f".{file_name}.tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, os.path.join(self.archive_dir, file_name))
+            entry = {
+                "file": file_name,
+                "fetched_at": fetched_at.isoformat(),
+                "sha256": sha256,
+                "bytes": len(content),
+                "url": self.url,
+            }
+            with open(os.path.join(self.archive_dir, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+class ReplaySource:
+    """
+    Serve archived PDFs with no network.
+
+    Args:
+        path (str): Archive directory or a single PDF file.
+        latency_ms (float): Simulated latency added to each fetch.
+        order (str): ``latest`` or ``cycle`` (see module docstring).
+        contents (list[bytes]): PDFs to serve instead of reading ``path``.
+
+    Raises:
+        FileNotFoundError: If there is nothing to replay.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path=PARTE_DIARIO_ARCHIVE,
+        latency_ms=PARTE_DIARIO_REPLAY_LATENCY_MS,
+        order=PARTE_DIARIO_REPLAY_ORDER,
+        contents=None,
+    ):
+        self.path = path
+        self.latency = latency_ms / 1000
+        if contents is None:
+            contents = [self._read(p) for p in self.archived_files(path)]
+        if not contents:
+            raise FileNotFoundError(f"No archived ParteDiario PDFs to replay in {path}")
+        self._contents = contents
+        self._cycle = itertools.cycle(contents) if order == "cycle" else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def archived_files(path):
+        """
+        Return the archived PDFs under ``path``, oldest first.
+
+        The order comes from ``index.jsonl`` when there is one (by last
+        fetch); PDFs not in the index (e.g. copied by hand) go first, sorted
+        by name.
+        """
+        if os.path.isfile(path):
+            return [path]
+        files = sorted(glob.glob(os.path.join(path, "*.pdf")))
+        index_path = os.path.join(path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return files
+        last_fetch = {}
+        with open(index_path, "r", encoding="utf-8") as f:
+            for position, line in enumerate(f):
+                try:
+                    last_fetch[os.path.join(path, json.loads(line)["file"])] = position
+                except (ValueError, KeyError):
+                    continue
+        return sorted(files, key=lambda file_path: last_fetch.get(file_path, -1))
+
+    @staticmethod
+    def _read(file_path):
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def fetch(self):
+        """Return the next PDF after the simulated latency."""
+        if self.latency:
+            timeout = timeout_for(cap=parte_diario.PDF_FETCH_TIMEOUT_SECONDS)
+            if self.latency > timeout:
+                time.sleep(timeout)
+                raise requests.Timeout(f"Replay latency {self.latency:.3f}s exceeds timeout {timeout:.3f}s")
+            time.sleep(self.latency)
+        if self._cycle is None:
+            return self._contents[-1]
+        with self._lock:
+            return next(self._cycle)
+
+
+def create_source(mode=PARTE_DIARIO_SOURCE, archive=PARTE_DIARIO_ARCHIVE):
+    """Build the source named ``mode`` (``live``, ``record`` or ``replay``)."""
+    if mode == "live":
+        return LiveSource()
+    if mode == "record":
+        return RecordingSource(archive)
+    if mode == "replay":
+        return ReplaySource(archive)
+    raise ValueError(f"Unsupported PARTE_DIARIO_SOURCE: {mode}")
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_source():
+    """Return the process-wide source, creating it on first use."""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                _source = create_source()
+                logger.info(f"Using {_source.name} ParteDiario source")
+    return _source
+
+
+def set_source(source):
+    """Replace the process-wide source (CLI flags, tests, benchmarks)."""
+    global _source
+    _source = source
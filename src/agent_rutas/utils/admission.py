@@ -0,0 +1,325 @@
+"""
+Admission control for the graph runs behind the API.
+
+At most ``ADMISSION_MAX_IN_FLIGHT`` graph runs execute at once; the rest
+wait in a bounded priority queue. Interactive chat is served before A2A
+tasks, and within a class the earliest client deadline goes first. Up to
+``ADMISSION_A2A_RESERVED_SLOTS`` slots go to waiting A2A tasks ahead of
+chat, so a steady chat load cannot starve them.
+
+A request is rejected up front (instead of queueing and timing out later)
+when the observed service time says it cannot finish before its deadline:
+
+    expected finish = now + queue wait (requests ahead / slots * latency) + latency
+
+The latency is an exponentially weighted average of recent graph runs, so
+the controller sheds more aggressively as the LLM slows down. Waiting
+requests whose deadline becomes unreachable are shed when they reach the
+head of the queue, so slots are only spent on work that can still be
+useful to the caller.
+
+The average only moves when a run finishes, so it could stay high after a
+slow spell with nothing left to correct it. To avoid that, the excess over
+``ADMISSION_INITIAL_LATENCY_SECONDS`` halves every
+``ADMISSION_LATENCY_HALF_LIFE_SECONDS`` without a new sample, and an idle
+replica (nothing in flight) always admits a request that is still within
+its deadline.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from .metrics import ADMISSION_EVENTS, ADMISSION_QUEUED
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_INITIAL_LATENCY_SECONDS = float(os.getenv("ADMISSION_INITIAL_LATENCY_SECONDS", "5"))
+ADMISSION_LATENCY_ALPHA = float(os.getenv("ADMISSION_LATENCY_ALPHA", "0.2"))
+ADMISSION_LATENCY_HALF_LIFE_SECONDS = float(os.getenv("ADMISSION_LATENCY_HALF_LIFE_SECONDS", "60"))
+# Slots handed to waiting A2A tasks before chat (at most ADMISSION_MAX_IN_FLIGHT - 1)
+ADMISSION_A2A_RESERVED_SLOTS = int(os.getenv("ADMISSION_A2A_RESERVED_SLOTS", "1"))
+
+# Request classes and their default deadline
+CHAT = "chat"
+A2A = "a2a"
+DEFAULT_DEADLINE_SECONDS = {
+    CHAT: float(os.getenv("ADMISSION_CHAT_DEADLINE_SECONDS", "30")),
+    A2A: float(os.getenv("ADMISSION_A2A_DEADLINE_SECONDS", "300")),
+}
+
+
+class AdmissionRejected(Exception):
+    """
+    The request was not admitted.
+
+    Attributes:
+        reason (str): ``queue_full``, ``deadline`` or ``shed``.
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    def __init__(self, message, reason, retry_after):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("request_class", "deadline", "notify", "granted", "rejected")
+
+    def __init__(self, request_class, deadline, notify):
+        self.request_class = request_class
+        self.deadline = deadline
+        self.notify = notify
+        self.granted = False
+        self.rejected = False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with deadline-ordered priority queues.
+
+    Thread-safe; ``admit`` is used from coroutines (``/api/chat``) and
+    ``admit_sync`` from threads (A2A workers).
+
+    Args:
+        max_in_flight (int): Concurrent graph runs.
+        max_queue (int): Requests allowed to wait for a slot.
+        initial_latency (float): Service time assumed before any run finished.
+        alpha (float): Weight of the latest run in the latency average.
+        half_life (float): Seconds without a finished run after which the
+            excess of the estimate over ``initial_latency`` halves.
+        a2a_reserved (int): Slots given to waiting A2A tasks before chat.
+        clock (callable): Wall-clock time source (deadlines are epoch seconds).
+
+    Example:
+        ```python
+        async with ADMISSION.admit(CHAT, deadline=time.time() + 10):
+            result = await run_in_threadpool(graph.invoke, state)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+        max_queue=ADMISSION_MAX_QUEUE,
+        initial_latency=ADMISSION_INITIAL_LATENCY_SECONDS,
+        alpha=ADMISSION_LATENCY_ALPHA,
+        half_life=ADMISSION_LATENCY_HALF_LIFE_SECONDS,
+        a2a_reserved=ADMISSION_A2A_RESERVED_SLOTS,
+        clock=time.time,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.alpha = alpha
+        self.half_life = half_life
+        self.initial_latency = initial_latency
+        # Chat always keeps at least one slot
+        self.a2a_reserved = max(0, min(a2a_reserved, max_in_flight - 1))
+        self._latency = initial_latency
+        self._clock = clock
+        self._sampled_at = clock()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._class_in_flight = {CHAT: 0, A2A: 0}
+        self._queues = {CHAT: [], A2A: []}
+        self._seq = itertools.count()
+
+    @property
+    def latency(self):
+        """Current estimate of one graph run, in seconds."""
+        return self._estimate(self._clock())
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def queued(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def default_deadline(self, request_class):
+        """Absolute deadline used when the client does not send one."""
+        return self._clock() + DEFAULT_DEADLINE_SECONDS[request_class]
+
+    def _estimate(self, now):
+        """Latency average, decayed toward ``initial_latency`` while no run finishes."""
+        excess = self._latency - self.initial_latency
+        if excess <= 0 or self.half_life <= 0:
+            return self._latency
+        idle = max(0.0, now - self._sampled_at)
+        return self.initial_latency + excess * 0.5 ** (idle / self.half_life)
+
+    def _can_finish(self, deadline, now, latency):
+        """Whether a run started now would end by ``deadline`` (always, if nothing is running)."""
+        if self._in_flight == 0:
+            # Idle: the run itself refreshes an estimate that may be stale
+            return now < deadline
+        return now + latency <= deadline
+
+    def _reject(self, request_class, reason, message):
+        ADMISSION_EVENTS.labels(request_class=request_class, outcome=reason).inc()
+        latency = self._estimate(self._clock())
+        retry_after = max(1, int(latency * (self.queued + 1) / self.max_in_flight))
+        return AdmissionRejected(message, reason, retry_after)
+
+    def _grant(self, waiter):
+        waiter.granted = True
+        self._in_flight += 1
+        self._class_in_flight[waiter.request_class] += 1
+        ADMISSION_EVENTS.labels(request_class=waiter.request_class, outcome="admitted").inc()
+
+    def _expected_wait(self, request_class, deadline, latency):
+        """Seconds until a request queued now gets a slot."""
+        chat_ahead = sum(1 for item in self._queues[CHAT] if request_class == A2A or item[0] <= deadline)
+        if request_class == CHAT:
+            return (chat_ahead + 1) * latency / self.max_in_flight
+        a2a_ahead = sum(1 for item in self._queues[A2A] if item[0] <= deadline)
+        wait = (chat_ahead + a2a_ahead + 1) * latency / self.max_in_flight
+        if self.a2a_reserved:
+            wait = min(wait, (a2a_ahead + 1) * latency / self.a2a_reserved)
+        return wait
+
+    def _enter(self, waiter):
+        """Admit ``waiter`` now (True), queue it (False) or raise ``AdmissionRejected``."""
+        request_class, deadline = waiter.request_class, waiter.deadline
+        with self._lock:
+            now = self._clock()
+            latency = self._estimate(now)
+            if self._in_flight < self.max_in_flight and not self.queued:
+                if not self._can_finish(deadline, now, latency):
+                    raise self._reject(
+                        request_class, "deadline", "El tiempo límite es menor que la latencia actual."
+                    )
+                self._grant(waiter)
+                return True
+            if self.queued >= self.max_queue:
+                raise self._reject(
+                    request_class, "queue_full", "El servicio está saturado, reintentá en unos segundos."
+                )
+            if now + self._expected_wait(request_class, deadline, latency) + latency > deadline:
+                raise self._reject(
+                    request_class, "deadline", "La solicitud no terminaría antes de su tiempo límite."
+                )
+            heapq.heappush(self._queues[request_class], (deadline, next(self._seq), waiter))
+            ADMISSION_QUEUED.set(self.queued)
+            return False
+
+    def _next_class(self):
+        """Queue served next: A2A while it is under its reserved share, else chat first."""
+        if self._queues[A2A] and (
+            not self._queues[CHAT] or self._class_in_flight[A2A] < self.a2a_reserved
+        ):
+            return A2A
+        return CHAT
+
+    def _dispatch(self):
+        """Hand free slots to queued requests (caller holds the lock)."""
+        now = self._clock()
+        latency = self._estimate(now)
+        while self.queued and self._in_flight < self.max_in_flight:
+            waiter = heapq.heappop(self._queues[self._next_class()])[-1]
+            if self._can_finish(waiter.deadline, now, latency):
+                self._grant(waiter)
+            else:
+                waiter.rejected = True
+                ADMISSION_EVENTS.labels(request_class=waiter.request_class, outcome="shed").inc()
+            waiter.notify()
+        ADMISSION_QUEUED.set(self.queued)
+
+    def _release(self, request_class, elapsed=None):
+        with self._lock:
+            self._in_flight -= 1
+            self._class_in_flight[request_class] -= 1
+            if elapsed is not None:
+                now = self._clock()
+                latency = self._estimate(now)
+                self._latency = latency + self.alpha * (elapsed - latency)
+                self._sampled_at = now
+            self._dispatch()
+
+    def _abandon(self, waiter):
+        """Drop a waiter that stopped waiting (timeout or client gone)."""
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+                self._class_in_flight[waiter.request_class] -= 1
+                self._dispatch()
+                return
+            queue = self._queues[waiter.request_class]
+            queue[:] = [item for item in queue if item[-1] is not waiter]
+            heapq.heapify(queue)
+            ADMISSION_QUEUED.set(self.queued)
+
+    def _timed_out(self, waiter):
+        ADMISSION_EVENTS.labels(request_class=waiter.request_class, outcome="timeout").inc()
+        return AdmissionRejected(
+            "La solicitud venció mientras esperaba turno.", "shed", max(1, int(self.latency))
+        )
+
+    def _shed(self):
+        return AdmissionRejected(
+            "La solicitud ya no puede terminar antes de su tiempo límite.", "shed", max(1, int(self.latency))
+        )
+
+    @asynccontextmanager
+    async def admit(self, request_class, deadline=None):
+        """
+        Hold a slot while the block runs (coroutine version).
+
+        Args:
+            request_class (str): ``CHAT`` or ``A2A``.
+            deadline (float): Epoch seconds by which the caller needs the answer.
+
+        Raises:
+            AdmissionRejected: If the request is rejected or shed.
+        """
+        deadline = deadline or self.default_deadline(request_class)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(request_class, deadline, lambda: loop.call_soon_threadsafe(_resolve, future))
+        if not self._enter(waiter):
+            try:
+                await asyncio.wait_for(future, timeout=max(0.0, deadline - self._clock()))
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                raise self._timed_out(waiter)
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            if waiter.rejected:
+                raise self._shed()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(request_class, time.perf_counter() - started)
+
+    @contextmanager
+    def admit_sync(self, request_class, deadline=None):
+        """Hold a slot while the block runs (thread version of ``admit``)."""
+        deadline = deadline or self.default_deadline(request_class)
+        event = threading.Event()
+        waiter = _Waiter(request_class, deadline, event.set)
+        if not self._enter(waiter):
+            if not event.wait(timeout=max(0.0, deadline - self._clock())):
+                self._abandon(waiter)
+                raise self._timed_out(waiter)
+            if waiter.rejected:
+                raise self._shed()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(request_class, time.perf_counter() - started)
+
+
+ADMISSION = AdmissionController()
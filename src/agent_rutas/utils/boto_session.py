@@ -1,9 +1,13 @@
+import hashlib
 import json
 import logging
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
@@ -12,18 +16,36 @@ load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
 
+# Shared client configuration: one large connection pool per client,
+# adaptive client-side rate limiting and bounded timeouts
+BOTO_MAX_POOL_CONNECTIONS = int(os.getenv("BOTO_MAX_POOL_CONNECTIONS", "50"))
+BOTO_MAX_ATTEMPTS = int(os.getenv("BOTO_MAX_ATTEMPTS", "5"))
+BOTO_CONNECT_TIMEOUT = float(os.getenv("BOTO_CONNECT_TIMEOUT", "5"))
+BOTO_READ_TIMEOUT = float(os.getenv("BOTO_READ_TIMEOUT", "120"))
+# Clients are rebuilt this long before their credentials expire
+CREDENTIAL_REFRESH_MARGIN = timedelta(seconds=int(os.getenv("BOTO_CREDENTIAL_REFRESH_MARGIN", "300")))
+EXPIRED_CREDENTIAL_ERRORS = frozenset(
+    {"ExpiredToken", "ExpiredTokenException", "RequestExpired", "UnrecognizedClientException"}
+)
 
-def get_boto3_session(ENV="local"):
+
+def _resolve_env(ENV=None):
+    """Environment to use: ``ENV`` when given, else the ``ENV`` variable (default "production")."""
+    return ENV or os.getenv("ENV", "production")
+
+
+def get_boto3_session(ENV=None):
     """
     Create a boto3 session based on the environment.
 
     Parameters:
-    - ENV (str): Environment identifier ("local" or "production").
+    - ENV (str): Environment identifier ("local" or "production"); defaults
+      to the ``ENV`` variable.
 
     Returns:
     - boto3.Session: Configured boto3 session object.
     """
-    ENV = os.getenv("ENV", "production")
+    ENV = _resolve_env(ENV)
     region = os.getenv("AWS_REGION", "us-east-1")  # Use consistent default
     logger.info(f"Creating boto3 session for environment: {ENV} in region: {region}")
     try:
@@ -64,68 +86,216 @@ def get_boto3_session(ENV="local"):
         raise
 
 
-def get_boto3_client(service_name, ENV="local"):
+def _credential_source(ENV=None):
+    """
+    Identify where the session credentials come from.
+
+    Local sessions are identified by profile; production sessions by access
+    key id plus a hash of the session token, so rotated credentials map to a
+    new registry entry instead of reusing a client with stale ones.
+
+    Parameters:
+    - ENV (str): Environment the session is built for (see ``get_boto3_session``).
+    """
+    if _resolve_env(ENV) == "local":
+        return f"profile:{os.getenv('AWS_PROFILE', 'default')}"
+    token = os.getenv("AWS_SESSION_TOKEN") or ""
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()[:12] if token else "static"
+    return f"env:{os.getenv('AWS_ACCESS_KEY_ID', '')}:{token_hash}"
+
+
+def _credentials_expiring(session):
+    """
+    Return True if the session credentials are gone or about to expire.
+
+    Static credentials never expire. Refreshable ones (assume-role, SSO,
+    IMDS) are refreshed by botocore through ``get_frozen_credentials``; the
+    session is only rebuilt if that refresh fails or leaves them inside the
+    refresh margin.
+    """
+    credentials = session.get_credentials()
+    if credentials is None:
+        return True
+    refresh_needed = getattr(credentials, "refresh_needed", None)
+    if refresh_needed is None:
+        return False
+    try:
+        credentials.get_frozen_credentials()
+    except Exception as e:
+        logger.warning(f"Could not refresh AWS credentials: {e}")
+        return True
+    return refresh_needed(CREDENTIAL_REFRESH_MARGIN.total_seconds())
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of long-lived boto3 sessions and clients.
+
+    Clients are keyed by ``(service, region, credential source)`` (the source
+    depends on the caller's ``ENV``) and shared
+    by every caller, so the connection pool is reused instead of paying for a
+    new session and TLS handshakes on each call. Entries are rebuilt when
+    their credentials are about to expire or after ``invalidate``.
+
+    Example:
+        ```python
+        bedrock = CLIENT_REGISTRY.get_client("bedrock-runtime")
+        ```
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._clients = {}
+
+    @staticmethod
+    def client_config(region):
+        """Return the botocore ``Config`` shared by registry clients."""
+        return Config(
+            region_name=region,
+            max_pool_connections=BOTO_MAX_POOL_CONNECTIONS,
+            retries={"mode": "adaptive", "max_attempts": BOTO_MAX_ATTEMPTS},
+            connect_timeout=BOTO_CONNECT_TIMEOUT,
+            read_timeout=BOTO_READ_TIMEOUT,
+        )
+
+    def _session(self, region, source, ENV):
+        """Return the cached session for ``(region, source)``, creating it if needed."""
+        key = (region, source)
+        session = self._sessions.get(key)
+        if session is None or _credentials_expiring(session):
+            session = get_boto3_session(ENV)
+            self._sessions[key] = session
+            # Clients of a replaced session hold its old credentials
+            for client_key in [k for k in self._clients if k[1:] == key]:
+                del self._clients[client_key]
+        return session
+
+    def get_client(self, service_name, ENV=None, region_name=None):
+        """
+        Return the shared client for ``service_name``.
+
+        Parameters:
+        - service_name (str): Name of the AWS service (e.g., "bedrock-runtime", "ssm").
+        - ENV (str): Environment identifier ("local" or "production"); defaults
+          to the ``ENV`` variable.
+        - region_name (str): Region of the client (defaults to ``AWS_REGION``).
+
+        Returns:
+        - boto3.Client: Long-lived client with the shared configuration.
+        """
+        if not service_name:
+            raise ValueError("service_name is required")
+        region = region_name or os.getenv("AWS_REGION", "us-east-1")
+        ENV = _resolve_env(ENV)
+        source = _credential_source(ENV)
+        key = (service_name, region, source)
+        with self._lock:
+            session = self._session(region, source, ENV)
+            client = self._clients.get(key)
+            if client is None:
+                logger.info(f"Creating boto3 client for service: {service_name} in region: {region}")
+                client = session.client(
+                    service_name, region_name=region, config=self.client_config(region)
+                )
+                self._clients[key] = client
+            return client
+
+    def invalidate(self, service_name=None):
+        """Drop cached clients (all, or those of ``service_name``) and their sessions."""
+        with self._lock:
+            for key in [k for k in self._clients if service_name is None or k[0] == service_name]:
+                del self._clients[key]
+                self._sessions.pop(key[1:], None)
+
+    def clear(self):
+        """Drop every cached session and client."""
+        with self._lock:
+            self._clients.clear()
+            self._sessions.clear()
+
+
+CLIENT_REGISTRY = ClientRegistry()
+
+
+def get_boto3_client(service_name, ENV=None, region_name=None):
     """
-    Create a boto3 client for a specific AWS service.
+    Return a shared boto3 client for a specific AWS service.
+
+    Clients come from ``CLIENT_REGISTRY``: they are created once per
+    service, region and credential source, and reused by every caller.
 
     Parameters:
     - service_name (str): Name of the AWS service for the client (e.g., "s3", "ssm").
-    - ENV (str): Environment identifier ("local" or "production").
+    - ENV (str): Environment identifier ("local" or "production"); defaults to the ``ENV`` variable.
+    - region_name (str): Region of the client (defaults to ``AWS_REGION``).
 
     Returns:
     - boto3.Client: Configured boto3 client object.
     """
-    logging.info(
-        f"Creating boto3 client for service: {service_name} in environment: {ENV}"
-    )
-    if not service_name:
-        raise ValueError("service_name is required")
-
     try:
-        # Create a boto3 session and use it to create the client
-        session = get_boto3_session(ENV)
-        client = session.client(service_name)
-        logging.info(f"Successfully created boto3 client for service: {service_name}")
-        return client
+        return CLIENT_REGISTRY.get_client(service_name, ENV, region_name)
     except Exception as e:
         logger.error(f"Error creating boto3 client for service {service_name}: {e}")
         raise
 
 
-def get_ssm_parameter(parameter_name, ENV="local"):
+def _is_expired_credentials_error(error):
+    """Return True if ``error`` is an AWS error caused by expired credentials."""
+    return (
+        isinstance(error, ClientError)
+        and error.response.get("Error", {}).get("Code") in EXPIRED_CREDENTIAL_ERRORS
+    )
+
+
+def get_ssm_parameter(parameter_name, ENV=None):
     """
     Retrieve a parameter from AWS SSM Parameter Store.
 
     Parameters:
     - parameter_name (str): Name of the parameter to retrieve.
-    - ENV (str): Environment identifier ("local" or "production").
+    - ENV (str): Environment identifier ("local" or "production"); defaults to the ``ENV`` variable.
 
     Returns:
     - str: The value of the SSM parameter, or None if retrieval fails.
     """
     try:
-        ssm = get_boto3_client("ssm", ENV)
-        parameter = ssm.get_parameter(Name=parameter_name, WithDecryption=True)
+        try:
+            parameter = get_boto3_client("ssm", ENV).get_parameter(
+                Name=parameter_name, WithDecryption=True
+            )
+        except ClientError as e:
+            if not _is_expired_credentials_error(e):
+                raise
+            CLIENT_REGISTRY.invalidate("ssm")
+            parameter = get_boto3_client("ssm", ENV).get_parameter(
+                Name=parameter_name, WithDecryption=True
+            )
         return parameter["Parameter"]["Value"]
     except Exception as e:
         logger.error(f"Error getting SSM parameter {parameter_name}: {e}")
         return None
 
 
-def get_secret(secret_name, key_in_secret: Optional[str] = None, ENV="local"):
+def get_secret(secret_name, key_in_secret: Optional[str] = None, ENV=None):
     """
     Retrieve a secret from AWS Secrets Manager.
 
     Parameters:
     - secret_name (str): Name of the secret to retrieve.
-    - ENV (str): Environment identifier ("local" or "production").
+    - ENV (str): Environment identifier ("local" or "production"); defaults to the ``ENV`` variable.
 
     Returns:
     - str: The value of the secret, or None if retrieval fails.
     """
-    secrets = get_boto3_client("secretsmanager", ENV)
     try:
-        response = secrets.get_secret_value(SecretId=secret_name)
+        try:
+            response = get_boto3_client("secretsmanager", ENV).get_secret_value(SecretId=secret_name)
+        except ClientError as e:
+            if not _is_expired_credentials_error(e):
+                raise
+            CLIENT_REGISTRY.invalidate("secretsmanager")
+            response = get_boto3_client("secretsmanager", ENV).get_secret_value(SecretId=secret_name)
         secret = response["SecretString"]
     except ClientError as e:
         logger.error(f"Error getting secret {secret_name}: {e}")
@@ -0,0 +1,271 @@
+"""
+Pluggable cache backends shared by the tools and the API.
+
+Route snapshots, tool results and final answers go through a
+``CacheBackend``. ``InMemoryCache`` keeps them in the process;
+``RedisCache`` shares them across every replica of the fleet. Both store
+the same binary payloads (pickle, zlib-compressed above
+``CACHE_COMPRESS_MIN_BYTES``), expire entries after a TTL and resolve
+multi-key lookups in one round trip.
+
+Keys are version-stamped as ``agent-rutas:<CACHE_KEY_VERSION>:<namespace>.v<n>:<key>``:
+bumping ``CACHE_KEY_VERSION`` (deploy-wide) or a namespace version in
+``NAMESPACE_VERSIONS`` (format change) makes old entries unreachable
+instead of unpickling something stale.
+
+Select the backend with ``CACHE_BACKEND`` (``memory``, ``redis`` or
+``none``) and ``REDIS_URL``. Redis errors are logged and treated as misses,
+so the cache can never fail a request.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_KEY_VERSION = os.getenv("CACHE_KEY_VERSION", "1")
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "1024"))
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+KEY_PREFIX = "agent-rutas"
+
+# Bump a namespace when the cached value format changes
+NAMESPACE_VERSIONS = {
+    "snapshot": 1,
+    "tool": 1,
+    "answer": 1,
+}
+
+_RAW = b"\x00"
+_COMPRESSED = b"\x01"
+
+
+def dumps(value):
+    """Serialize ``value`` to bytes (1-byte flag + pickle, zlib-compressed if large)."""
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) >= CACHE_COMPRESS_MIN_BYTES:
+        return _COMPRESSED + zlib.compress(data, 1)
+    return _RAW + data
+
+
+def loads(payload):
+    """Inverse of ``dumps``."""
+    flag, data = payload[:1], payload[1:]
+    if flag == _COMPRESSED:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+def make_key(namespace, key):
+    """Build the version-stamped key for ``key`` in ``namespace``."""
+    version = NAMESPACE_VERSIONS.get(namespace, 1)
+    return f"{KEY_PREFIX}:{CACHE_KEY_VERSION}:{namespace}.v{version}:{key}"
+
+
+def digest(*parts):
+    """Short stable hash of ``parts`` for use as a cache key."""
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+class CacheBackend:
+    """
+    Interface of the cache backends.
+
+    Subclasses implement ``_get_many``, ``_set_many`` and ``_delete`` over
+    already-built keys and serialized payloads; this class handles keys,
+    serialization and hit/miss metrics.
+    """
+
+    name = "none"
+
+    def get(self, namespace, key, default=None):
+        """Return the cached value for ``key`` or ``default``."""
+        return self.get_many(namespace, [key]).get(key, default)
+
+    def get_many(self, namespace, keys):
+        """
+        Look up several keys in one round trip.
+
+        Returns:
+            dict: Values of the keys that were found.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        payloads = self._get_many([make_key(namespace, k) for k in keys])
+        found = {}
+        for key, payload in zip(keys, payloads):
+            if payload is None:
+                continue
+            try:
+                found[key] = loads(payload)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache entry {namespace}:{key}: {e}")
+        record_cache(namespace, hit=True, count=len(found))
+        record_cache(namespace, hit=False, count=len(keys) - len(found))
+        return found
+
+    def set(self, namespace, key, value, ttl):
+        """Store ``value`` for ``ttl`` seconds."""
+        self.set_many(namespace, {key: value}, ttl)
+
+    def set_many(self, namespace, items, ttl):
+        """Store several values with the same TTL in one round trip."""
+        if not items or not ttl or ttl <= 0:
+            return
+        self._set_many({make_key(namespace, k): dumps(v) for k, v in items.items()}, ttl)
+
+    def delete(self, namespace, key):
+        """Remove ``key``."""
+        self._delete(make_key(namespace, key))
+
+    def _get_many(self, full_keys):
+        return [None] * len(full_keys)
+
+    def _set_many(self, payloads, ttl):
+        pass
+
+    def _delete(self, full_key):
+        pass
+
+
+class NullCache(CacheBackend):
+    """Backend that never stores anything (``CACHE_BACKEND=none``)."""
+
+
+class InMemoryCache(CacheBackend):
+    """
+    Process-local LRU cache with per-entry expiry.
+
+    Values are stored serialized, like in Redis, so callers never share
+    mutable objects through the cache and both backends behave the same.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MEMORY_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _get_many(self, full_keys):
+        now = self._clock()
+        results = []
+        with self._lock:
+            for full_key in full_keys:
+                entry = self._entries.get(full_key)
+                if entry is None or entry[0] <= now:
+                    self._entries.pop(full_key, None)
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(full_key)
+                    results.append(entry[1])
+        return results
+
+    def _set_many(self, payloads, ttl):
+        expires_at = self._clock() + ttl
+        with self._lock:
+            for full_key, payload in payloads.items():
+                self._entries[full_key] = (expires_at, payload)
+                self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, full_key):
+        with self._lock:
+            self._entries.pop(full_key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """
+    Fleet-wide cache on Redis.
+
+    ``get_many`` uses ``MGET`` and ``set_many`` a pipeline of ``SET ... EX``,
+    so a batch costs one round trip. Any Redis error is logged and treated
+    as a miss.
+
+    Args:
+        url (str): Redis URL (``REDIS_URL``).
+        client: Optional ready client (e.g. ``fakeredis.FakeRedis()`` in tests).
+    """
+
+    name = "redis"
+
+    def __init__(self, url=None, client=None, socket_timeout=0.5):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(
+                url or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+                health_check_interval=30,
+            )
+        self.client = client
+
+    def _get_many(self, full_keys):
+        try:
+            return self.client.mget(full_keys)
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return [None] * len(full_keys)
+
+    def _set_many(self, payloads, ttl):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for full_key, payload in payloads.items():
+                pipe.set(full_key, payload, ex=max(1, int(ttl)))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
+    def _delete(self, full_key):
+        try:
+            self.client.delete(full_key)
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def create_cache(backend=CACHE_BACKEND):
+    """Build the backend named ``backend`` (``memory``, ``redis`` or ``none``)."""
+    if backend == "redis":
+        return RedisCache()
+    if backend == "memory":
+        return InMemoryCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unsupported CACHE_BACKEND: {backend}")
+
+
+def get_cache():
+    """Return the process-wide cache backend, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+                logger.info(f"Using {_cache.name} cache backend")
+    return _cache
+
+
+def set_cache(cache):
+    """Replace the process-wide backend (tests, benchmarks)."""
+    global _cache
+    _cache = cache
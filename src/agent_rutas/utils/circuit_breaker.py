@@ -0,0 +1,136 @@
+"""
+Circuit breaker for flaky upstream sources.
+
+After ``failure_threshold`` consecutive failures the circuit opens and
+``allow()`` returns ``False``, so callers skip the upstream call and serve
+their fallback at once instead of paying the failure latency on every
+request. While open, a background thread runs ``probe`` every
+``recovery_interval`` seconds (state ``half_open`` during the probe); the
+first successful probe closes the circuit again. Without a ``probe`` the
+circuit lets one caller through after ``recovery_interval`` instead.
+"""
+import logging
+import os
+import threading
+import time
+
+from .metrics import CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with background recovery probes.
+
+    Args:
+        name (str): Label for logs and the ``agent_rutas_circuit_state`` gauge.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        recovery_interval (float): Seconds between recovery attempts.
+        probe (callable): Optional ``probe()`` run in the background while
+            open; it should raise on failure.
+        clock (callable): Monotonic time source.
+
+    Example:
+        ```python
+        breaker = CircuitBreaker("dpv", probe=refresh)
+        if breaker.allow():
+            try:
+                data = fetch()
+                breaker.record_success()
+            except Exception:
+                breaker.record_failure()
+        ```
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        recovery_interval=CIRCUIT_RECOVERY_SECONDS,
+        probe=None,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_interval = recovery_interval
+        self.probe = probe
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._prober = None
+        self._gauge = CIRCUIT_STATE.labels(circuit=name)
+        self._gauge.set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.warning(f"Circuit '{self.name}': {self._state} -> {state}")
+        self._state = state
+        self._gauge.set(_STATE_VALUES[state])
+
+    def allow(self):
+        """Return whether a caller may call the upstream now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self.probe is not None or self._state == HALF_OPEN:
+                return False
+            # No background probe: let one caller try after the interval
+            if self._clock() - self._opened_at >= self.recovery_interval:
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit and reset the failure count."""
+        with self._lock:
+            self._failures = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        """Count a failure; open the circuit at the threshold (or on a failed trial call)."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self._opened_at = self._clock()
+        self._set_state(OPEN)
+        if self.probe is not None and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(
+                target=self._probe_loop, name=f"circuit-{self.name}-probe", daemon=True
+            )
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.recovery_interval)
+            with self._lock:
+                if self._state == CLOSED:
+                    return
+                self._set_state(HALF_OPEN)
+            try:
+                self.probe()
+            except Exception as e:
+                logger.info(f"Circuit '{self.name}' probe failed: {e}")
+                with self._lock:
+                    self._opened_at = self._clock()
+                    self._set_state(OPEN)
+                continue
+            self.record_success()
+            return
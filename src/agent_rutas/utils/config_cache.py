@@ -0,0 +1,353 @@
+"""
+In-memory TTL cache for SSM parameters and Secrets Manager values.
+
+``get_ssm_parameter`` and ``get_secret`` in ``boto_session`` hit AWS on
+every call. ``ConfigCache`` sits on top of the same shared clients:
+
+- ``warmup`` prefetches in bulk (``GetParameters``, ``GetParametersByPath``,
+  ``BatchGetSecretValue``) the names listed in ``CONFIG_PREFETCH_PARAMETERS``,
+  ``CONFIG_PREFETCH_PATHS`` and ``CONFIG_PREFETCH_SECRETS``.
+- Every key has its own TTL. Reads in the last ``refresh_ahead`` seconds
+  of it return the cached value and refresh it in the background, so hot
+  keys never block on AWS after warmup.
+- If AWS fails, the last known value is returned (stale-on-error) and kept
+  for ``CONFIG_CACHE_RETRY_SECONDS``; after that, reads keep getting it
+  while one background refresh retries, so an outage never makes every
+  read wait for an AWS timeout.
+- Concurrent misses of the same key share a single fetch.
+
+Clients come from ``get_boto3_client``; point ``AWS_ENDPOINT_URL`` (or
+``AWS_ENDPOINT_URL_SSM`` / ``AWS_ENDPOINT_URL_SECRETS_MANAGER``) at a local
+stand-in such as LocalStack or moto server to exercise it without AWS.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .boto_session import get_boto3_client
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CACHE_TTL_SECONDS = float(os.getenv("CONFIG_CACHE_TTL_SECONDS", "300"))
+CONFIG_CACHE_REFRESH_AHEAD_SECONDS = float(os.getenv("CONFIG_CACHE_REFRESH_AHEAD_SECONDS", "60"))
+# Tras una falla de AWS, el valor viejo se sirve este tiempo antes de reintentar
+CONFIG_CACHE_RETRY_SECONDS = float(os.getenv("CONFIG_CACHE_RETRY_SECONDS", "30"))
+# API limits per bulk request
+SSM_BATCH_SIZE = 10
+SECRETS_BATCH_SIZE = 20
+
+
+def _env_list(name):
+    """Split a comma-separated environment variable into a list."""
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+class _Entry:
+    """Cached value with its expiry (``stale`` once a refresh failed)."""
+
+    __slots__ = ("value", "expires_at", "ttl", "refreshing", "stale")
+
+    def __init__(self, value, ttl, now):
+        self.value = value
+        self.ttl = ttl
+        self.expires_at = now + ttl
+        self.refreshing = False
+        self.stale = False
+
+
+class _Flight:
+    """Fetch of one key shared by concurrent misses."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ConfigCache:
+    """
+    TTL cache with bulk prefetch, refresh-ahead and stale-on-error reads.
+
+    Attributes:
+        ttl (float): Default TTL in seconds.
+        refresh_ahead (float): Seconds before expiry when reads trigger a
+            background refresh.
+        retry (float): Seconds a stale value is served before retrying AWS.
+        ENV (str): Environment passed to ``get_boto3_client``.
+
+    Example:
+        ```python
+        CONFIG_CACHE.warmup()
+        api_key = CONFIG_CACHE.get_secret("agent-rutas/keys", "GOOGLE_API_KEY")
+        ```
+    """
+
+    def __init__(
+        self,
+        ttl=CONFIG_CACHE_TTL_SECONDS,
+        refresh_ahead=CONFIG_CACHE_REFRESH_AHEAD_SECONDS,
+        retry=CONFIG_CACHE_RETRY_SECONDS,
+        ENV=None,
+        client_factory=get_boto3_client,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry = retry
+        self.ENV = ENV or os.getenv("ENV", "local")
+        self._client_factory = client_factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-rutas-config")
+
+    def _client(self, service_name):
+        return self._client_factory(service_name, ENV=self.ENV)
+
+    # --- AWS fetchers -------------------------------------------------
+
+    def _fetch_parameter(self, name):
+        response = self._client("ssm").get_parameter(Name=name, WithDecryption=True)
+        return response["Parameter"]["Value"]
+
+    def _fetch_secret(self, name):
+        response = self._client("secretsmanager").get_secret_value(SecretId=name)
+        return response["SecretString"]
+
+    # --- cache core ---------------------------------------------------
+
+    def _store(self, key, value, ttl=None):
+        with self._lock:
+            previous = self._entries.get(key)
+            ttl = ttl or (previous.ttl if previous else self.ttl)
+            self._entries[key] = _Entry(value, ttl, self._clock())
+
+    def _keep_stale(self, key, entry):
+        """Serve ``entry`` for another ``retry`` seconds after a failed refresh."""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry.expires_at = self._clock() + self.retry
+                entry.stale = True
+
+    def _refresh(self, key, fetch):
+        """Fetch ``key`` in the background; keep the old value on failure."""
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            logger.warning(f"Background refresh of {key[1]} failed, keeping cached value: {e}")
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                self._keep_stale(key, entry)
+        finally:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def _get(self, key, fetch, ttl=None):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (now < entry.expires_at or entry.stale):
+                if now >= entry.expires_at:
+                    # AWS was failing: keep serving the old value while one background refresh retries
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        entry.expires_at = now + self.retry
+                        self._executor.submit(self._refresh, key, fetch)
+                elif (
+                    not entry.stale
+                    and now >= entry.expires_at - self.refresh_ahead
+                    and not entry.refreshing
+                ):
+                    entry.refreshing = True
+                    self._executor.submit(self._refresh, key, fetch)
+                record_cache(key[0], hit=True)
+                return entry.value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        record_cache(key[0], hit=False)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._fetch(key, fetch, ttl, entry)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _fetch(self, key, fetch, ttl, entry):
+        """Fetch and store ``key``; fall back to ``entry`` (kept as stale) if AWS fails."""
+        try:
+            value = fetch()
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"Could not refresh {key[1]}, serving stale value: {e}")
+            self._keep_stale(key, entry)
+            return entry.value
+        self._store(key, value, ttl)
+        return value
+
+    # --- public API ---------------------------------------------------
+
+    def get_parameter(self, name, ttl=None):
+        """
+        Return an SSM parameter value (decrypted).
+
+        Args:
+            name (str): Parameter name.
+            ttl (float): TTL for this key (defaults to the cache TTL).
+
+        Returns:
+            str: Parameter value.
+
+        Raises:
+            botocore.exceptions.ClientError: If AWS fails and no value was cached.
+        """
+        return self._get(("ssm", name), lambda: self._fetch_parameter(name), ttl)
+
+    def get_secret(self, name, key_in_secret=None, ttl=None):
+        """
+        Return a Secrets Manager value, or one key of a JSON secret.
+
+        Args:
+            name (str): Secret name or ARN.
+            key_in_secret (str): Optional key to extract from a JSON secret.
+            ttl (float): TTL for this key (defaults to the cache TTL).
+
+        Returns:
+            str: Secret value.
+
+        Raises:
+            botocore.exceptions.ClientError: If AWS fails and no value was cached.
+        """
+        secret = self._get(("secrets", name), lambda: self._fetch_secret(name), ttl)
+        if key_in_secret:
+            return json.loads(secret)[key_in_secret]
+        return secret
+
+    def prefetch_parameters(self, names, ttl=None):
+        """Load ``names`` with ``GetParameters`` (10 per request); return how many were found."""
+        names = list(names)
+        ssm = self._client("ssm")
+        loaded = 0
+        for i in range(0, len(names), SSM_BATCH_SIZE):
+            response = ssm.get_parameters(Names=names[i : i + SSM_BATCH_SIZE], WithDecryption=True)
+            for parameter in response.get("Parameters", []):
+                self._store(("ssm", parameter["Name"]), parameter["Value"], ttl)
+                loaded += 1
+            for missing in response.get("InvalidParameters", []):
+                logger.warning(f"SSM parameter not found during prefetch: {missing}")
+        return loaded
+
+    def prefetch_path(self, path, recursive=True, ttl=None):
+        """Load every parameter under ``path`` with ``GetParametersByPath``; return the count."""
+        paginator = self._client("ssm").get_paginator("get_parameters_by_path")
+        loaded = 0
+        for page in paginator.paginate(Path=path, Recursive=recursive, WithDecryption=True):
+            for parameter in page.get("Parameters", []):
+                self._store(("ssm", parameter["Name"]), parameter["Value"], ttl)
+                loaded += 1
+        return loaded
+
+    def prefetch_secrets(self, names, ttl=None):
+        """
+        Load ``names`` with ``BatchGetSecretValue`` (20 per request).
+
+        Falls back to one ``GetSecretValue`` per secret where the batch API
+        is unavailable (older botocore or stand-ins without it).
+        """
+        names = list(names)
+        secrets = self._client("secretsmanager")
+        if not hasattr(secrets, "batch_get_secret_value"):
+            for name in names:
+                self._store(("secrets", name), self._fetch_secret(name), ttl)
+            return len(names)
+        loaded = 0
+        for i in range(0, len(names), SECRETS_BATCH_SIZE):
+            response = secrets.batch_get_secret_value(SecretIdList=names[i : i + SECRETS_BATCH_SIZE])
+            for secret in response.get("SecretValues", []):
+                value = secret.get("SecretString")
+                if value is None:
+                    continue
+                # Secrets may be requested by name or ARN; cache under both
+                for key in {secret.get("Name"), secret.get("ARN")} - {None}:
+                    self._store(("secrets", key), value, ttl)
+                loaded += 1
+            for error in response.get("Errors", []):
+                logger.warning(f"Secret not loaded during prefetch: {error.get('SecretId')}: {error.get('Message')}")
+        return loaded
+
+    def warmup(self, parameters=None, paths=None, secrets=None):
+        """
+        Prefetch the configured keys; failures are logged, not raised.
+
+        Args:
+            parameters (list[str]): Parameter names (default ``CONFIG_PREFETCH_PARAMETERS``).
+            paths (list[str]): Parameter paths (default ``CONFIG_PREFETCH_PATHS``).
+            secrets (list[str]): Secret names (default ``CONFIG_PREFETCH_SECRETS``).
+
+        Returns:
+            dict: Number of values loaded per kind.
+        """
+        parameters = _env_list("CONFIG_PREFETCH_PARAMETERS") if parameters is None else parameters
+        paths = _env_list("CONFIG_PREFETCH_PATHS") if paths is None else paths
+        secrets = _env_list("CONFIG_PREFETCH_SECRETS") if secrets is None else secrets
+        loaded = {"parameters": 0, "secrets": 0}
+        try:
+            if parameters:
+                loaded["parameters"] += self.prefetch_parameters(parameters)
+            for path in paths:
+                loaded["parameters"] += self.prefetch_path(path)
+            if secrets:
+                loaded["secrets"] += self.prefetch_secrets(secrets)
+        except Exception as e:
+            logger.error(f"Configuration prefetch failed: {e}")
+        if any(loaded.values()):
+            logger.info(f"Configuration cache warmed up: {loaded}")
+        return loaded
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
+
+
+CONFIG_CACHE = ConfigCache()
+
+
+def get_cached_parameter(parameter_name):
+    """
+    Cached counterpart of ``get_ssm_parameter``.
+
+    Returns:
+        str: The parameter value, or None if it cannot be retrieved.
+    """
+    try:
+        return CONFIG_CACHE.get_parameter(parameter_name)
+    except Exception as e:
+        logger.error(f"Error getting SSM parameter {parameter_name}: {e}")
+        return None
+
+
+def get_cached_secret(secret_name, key_in_secret=None):
+    """Cached counterpart of ``get_secret`` (raises like it on AWS errors)."""
+    return CONFIG_CACHE.get_secret(secret_name, key_in_secret)
@@ -0,0 +1,101 @@
+"""
+Per-request deadlines carried through the graph.
+
+The API and the CLI put an absolute deadline (epoch seconds) in the graph
+config as ``config["configurable"]["deadline"]``. Each node enters
+``deadline_scope(from_config(config))``, which also publishes it in a
+context variable, so tools and model clients running below the node (in
+the tool pool, which copies the context) can derive their own timeout with
+``timeout_for`` without threading the value through every signature.
+
+Outbound calls never wait forever: without a deadline ``timeout_for``
+returns its ``cap``.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+# Cap for any outbound call (also used when the request has no deadline)
+OUTBOUND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_TIMEOUT_SECONDS", "30"))
+# Below this remaining budget a call is not even started
+DEADLINE_MIN_SECONDS = float(os.getenv("DEADLINE_MIN_SECONDS", "0.05"))
+
+_current_deadline = contextvars.ContextVar("agent_rutas_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline has passed (or too little of it remains)."""
+
+
+def from_config(config):
+    """Return the deadline stored in a graph ``config``, or ``None``."""
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get("deadline")
+
+
+def deadline_config(deadline, config=None):
+    """
+    Return a graph config carrying ``deadline``.
+
+    Args:
+        deadline (float | None): Absolute deadline in epoch seconds.
+        config (dict): Config to extend (not modified).
+
+    Returns:
+        dict: Config for ``graph.invoke``.
+    """
+    config = dict(config or {})
+    config["configurable"] = {**(config.get("configurable") or {}), "deadline": deadline}
+    return config
+
+
+def current_deadline():
+    """Deadline of the request running in this context, or ``None``."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Make ``deadline`` the current one while the block runs (``None`` keeps the outer one)."""
+    if deadline is None:
+        yield _current_deadline.get()
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining(deadline=None):
+    """Seconds left until ``deadline`` (default: the current one), or ``None`` if unbounded."""
+    deadline = deadline if deadline is not None else _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def timeout_for(cap=OUTBOUND_TIMEOUT_SECONDS, reserve=0.0):
+    """
+    Timeout for an outbound call made under the current deadline.
+
+    Args:
+        cap (float): Upper bound, also used when there is no deadline.
+        reserve (float): Seconds kept back for the work after the call
+            (e.g. writing a partial answer).
+
+    Returns:
+        float: Seconds the call may take.
+
+    Raises:
+        DeadlineExceeded: If less than ``DEADLINE_MIN_SECONDS`` remain.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    left -= reserve
+    if left < DEADLINE_MIN_SECONDS:
+        raise DeadlineExceeded("Se agotó el tiempo disponible para la solicitud.")
+    return min(cap, left)
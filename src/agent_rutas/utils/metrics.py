@@ -0,0 +1,214 @@
+"""
+Prometheus metrics shared by the graph nodes, tools, fetcher and LLM calls.
+
+Every metric is registered on a single module-level ``REGISTRY`` so the API
+can expose all of them from one ``/metrics`` endpoint. Helpers in this module
+only touch pre-created metric objects, keeping the per-call overhead to a
+label lookup and a counter/histogram update.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# Buckets tuned for LLM/tool latencies (tens of ms up to a couple of minutes)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6)
+
+NODE_LATENCY = Histogram(
+    "agent_rutas_node_latency_seconds",
+    "Latency of each graph node execution.",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+TOOL_LATENCY = Histogram(
+    "agent_rutas_tool_latency_seconds",
+    "Latency of each tool invocation.",
+    ["tool", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LLM_LATENCY = Histogram(
+    "agent_rutas_llm_latency_seconds",
+    "Latency of each LLM call by provider and model.",
+    ["provider", "model"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "agent_rutas_llm_tokens_total",
+    "Tokens consumed by LLM calls, split by kind (input/output/cache_read/cache_creation).",
+    ["provider", "model", "kind"],
+    registry=REGISTRY,
+)
+CONTEXT_TOKENS = Histogram(
+    "agent_rutas_context_tokens",
+    "Estimated prompt tokens sent to the LLM after context trimming, by node.",
+    ["node"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+    registry=REGISTRY,
+)
+CACHE_EVENTS = Counter(
+    "agent_rutas_cache_events_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+    registry=REGISTRY,
+)
+IN_FLIGHT = Gauge(
+    "agent_rutas_in_flight_requests",
+    "Requests currently being processed by endpoint.",
+    ["endpoint"],
+    registry=REGISTRY,
+)
+ADMISSION_EVENTS = Counter(
+    "agent_rutas_admission_events_total",
+    "Admission decisions by request class and outcome (admitted, queue_full, deadline, shed, timeout).",
+    ["request_class", "outcome"],
+    registry=REGISTRY,
+)
+ADMISSION_QUEUED = Gauge(
+    "agent_rutas_admission_queued",
+    "Requests waiting for a graph slot.",
+    registry=REGISTRY,
+)
+LOOP_STOPS = Counter(
+    "agent_rutas_loop_stops_total",
+    "Runs forced to a final answer, by reason (max_rounds, repeated_calls).",
+    ["reason"],
+    registry=REGISTRY,
+)
+CIRCUIT_STATE = Gauge(
+    "agent_rutas_circuit_state",
+    "Circuit breaker state (0 closed, 1 open, 2 half-open).",
+    ["circuit"],
+    registry=REGISTRY,
+)
+STALE_SNAPSHOTS = Counter(
+    "agent_rutas_stale_snapshots_total",
+    "Times the last good ParteDiario was served because the source was unavailable.",
+    registry=REGISTRY,
+)
+TASK_QUEUE_DEPTH = Gauge(
+    "agent_rutas_a2a_queue_depth",
+    "A2A tasks waiting in the queue for a worker.",
+    registry=REGISTRY,
+)
+COMPONENT_READY = Gauge(
+    "agent_rutas_component_ready",
+    "Startup warmup state of each component (0 pending, 1 ready, -1 failed).",
+    ["component"],
+    registry=REGISTRY,
+)
+WARMUP_DURATION = Gauge(
+    "agent_rutas_warmup_seconds",
+    "Time the startup warmup of each component took.",
+    ["component"],
+    registry=REGISTRY,
+)
+PDF_FETCH_LATENCY = Histogram(
+    "agent_rutas_pdf_fetch_seconds",
+    "Time spent downloading the ParteDiario PDF.",
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+PDF_FETCH_BYTES = Histogram(
+    "agent_rutas_pdf_fetch_bytes",
+    "Size of the downloaded ParteDiario PDF.",
+    buckets=BYTES_BUCKETS,
+    registry=REGISTRY,
+)
+PDF_PARSE_LATENCY = Histogram(
+    "agent_rutas_pdf_parse_seconds",
+    "Time spent extracting and parsing the ParteDiario PDF, by stage.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """
+    Observe the wall-clock duration of the wrapped block on ``histogram``.
+
+    Args:
+        histogram (Histogram): Metric to observe.
+        **labels: Label values for the metric, if it has labels.
+    """
+    metric = histogram.labels(**labels) if labels else histogram
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+def instrument_node(name):
+    """
+    Decorator recording the latency of a graph node under ``name``.
+
+    The wrapped function keeps its signature, so LangGraph still injects
+    ``config`` into it.
+    """
+    metric = NODE_LATENCY.labels(node=name)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def track_in_flight(endpoint):
+    """Increment the in-flight gauge for ``endpoint`` while the block runs."""
+    gauge = IN_FLIGHT.labels(endpoint=endpoint)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def record_cache(cache, hit, count=1):
+    """Count ``count`` lookups on the cache named ``cache``."""
+    if count:
+        CACHE_EVENTS.labels(cache=cache, result="hit" if hit else "miss").inc(count)
+
+
+def record_llm_usage(provider, model, message):
+    """
+    Add the token usage reported on an AI message to ``LLM_TOKENS``.
+
+    Prompt-cache tokens (``input_token_details.cache_read`` and
+    ``cache_creation``) are counted under their own kinds, and each call that
+    reports them counts as a hit or miss of the ``llm_prompt`` cache.
+    Providers that do not report ``usage_metadata`` are silently ignored.
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens") or 0
+    output_tokens = usage.get("output_tokens") or 0
+    if input_tokens:
+        LLM_TOKENS.labels(provider=provider, model=model, kind="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(provider=provider, model=model, kind="output").inc(output_tokens)
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_creation = details.get("cache_creation") or 0
+    if cache_read:
+        LLM_TOKENS.labels(provider=provider, model=model, kind="cache_read").inc(cache_read)
+    if cache_creation:
+        LLM_TOKENS.labels(provider=provider, model=model, kind="cache_creation").inc(cache_creation)
+    if cache_read or cache_creation:
+        record_cache("llm_prompt", hit=bool(cache_read))
@@ -0,0 +1,170 @@
+"""
+Opt-in per-request profiling.
+
+``profile_run`` wraps a block in a stack-sampling profiler plus
+``tracemalloc`` and writes, for each profiled run:
+
+- ``<label>-<timestamp>.folded``: collapsed stacks ("frame;frame;frame count"),
+  ready for ``flamegraph.pl``, speedscope or inferno. Every thread is
+  sampled and its stacks are rooted at ``[thread name]``, so tool and LLM
+  work running in the executor pools (and the batch workers of
+  ``main.py --batch``) shows up under its own thread instead of as a
+  ``Future.result`` wait; in the API, concurrent requests appear too.
+- ``<label>-<timestamp>.alloc.txt``: top allocation sites at the end of the run.
+
+When profiling is not requested ``maybe_profile`` returns a ``nullcontext``,
+so nothing is imported, started or sampled on the normal path.
+
+``tracemalloc`` is process-wide, so only one profile runs at a time: a run
+requested while another is active is not profiled and its report says so.
+The API accepts ``X-Profile`` only with ``PROFILE_API_ENABLED=1``.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "25"))
+# X-Profile en la API: apagado por defecto (sin auth y el reporte expone rutas del servidor)
+PROFILE_API_ENABLED = os.getenv("PROFILE_API_ENABLED", "0").lower() in ("1", "true", "yes")
+
+PROFILE_BUSY = "another profile is running"
+_active = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """
+    Background thread sampling the call stacks of every other thread.
+
+    Attributes:
+        interval (float): Seconds between samples.
+        samples (Counter): Collapsed stack string (rooted at ``[thread name]``)
+            -> number of samples.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_SECONDS):
+        super().__init__(name="agent-rutas-profiler", daemon=True)
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(f"[{names.get(thread_id, thread_id)}]")
+                # Folded format lists frames root-first separated by ';'
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stop sampling and wait for the thread to finish."""
+        self._stop_event.set()
+        self.join()
+
+
+def _safe_label(label):
+    """Make ``label`` usable as a file name."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", label) or "run"
+
+
+@contextmanager
+def profile_run(label="run", output_dir=None):
+    """
+    Profile the wrapped block and write the results to ``output_dir``.
+
+    Args:
+        label (str): Prefix for the output file names.
+        output_dir (str): Destination directory (defaults to ``PROFILE_DIR``).
+
+    Yields:
+        dict: Filled on exit with the ``folded`` and ``allocations`` paths,
+        or ``{"skipped": PROFILE_BUSY}`` if another profile is active.
+    """
+    if not _active.acquire(blocking=False):
+        logger.warning(f"Profile for {label} skipped: {PROFILE_BUSY}")
+        yield {"skipped": PROFILE_BUSY}
+        return
+    try:
+        with _profile(label, output_dir) as report:
+            yield report
+    finally:
+        _active.release()
+
+
+@contextmanager
+def _profile(label, output_dir):
+    output_dir = output_dir or PROFILE_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(
+        output_dir, f"{_safe_label(label)}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    )
+    report = {}
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    sampler = StackSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        report["folded"] = f"{base}.folded"
+        with open(report["folded"], "w", encoding="utf-8") as f:
+            for stack, count in sampler.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        report["allocations"] = f"{base}.alloc.txt"
+        with open(report["allocations"], "w", encoding="utf-8") as f:
+            f.write(f"# elapsed_seconds={elapsed:.6f} peak_traced_bytes={peak}\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        report["elapsed_seconds"] = elapsed
+        logger.info(
+            "Profile for %s written to %s (%.3fs, %d samples)",
+            label,
+            base,
+            elapsed,
+            sum(sampler.samples.values()),
+        )
+
+
+def public_report(report):
+    """Report with file names only (no server directories), for API responses."""
+    return {
+        key: os.path.basename(value) if key in ("folded", "allocations") else value
+        for key, value in report.items()
+    }
+
+
+def maybe_profile(enabled, label="run", output_dir=None):
+    """Return ``profile_run(...)`` when ``enabled``, otherwise a no-op context."""
+    if not enabled:
+        return nullcontext({})
+    return profile_run(label, output_dir)
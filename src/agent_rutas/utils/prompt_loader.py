@@ -1,50 +1,177 @@
-import importlib
-import logging
-
-
-def load_prompt(chain_name: str, model_core: str, agent_name: str) -> str:
-    """
-    Load the prompt for a given chain name and model core.
-
-    Args:
-        chain_name (str): The name of the chain.
-        model_core (str): The core model to use.
-
-    Returns:
-        str: The loaded prompt.
-
-    Raises:
-        ImportError: If the module cannot be imported.
-        AttributeError: If the prompt attribute cannot be found in the module.
-    """
-    # Build the model name from the chain name and the model core
-    module_name = f"prompts.{chain_name}.{model_core}"
-    try:
-        # Dynamically import the module
-        module = importlib.import_module(module_name)
-        logging.info("Loaded prompt: %s", module_name)
-        # Get the prompt attribute from the module
-        return getattr(module, f"{chain_name.upper()}_PROMPT")
-    except (ModuleNotFoundError, AttributeError) as e:
-        logging.info("Error loading prompt: %s", module_name)
-        logging.info("Attempting to load default prompt (default)")
-        # Get the prompt attribute from the module
-        try:
-            default_module_name = f"prompts.{chain_name}.default"
-            module = importlib.import_module(default_module_name)
-            logging.info("Loaded default prompt: %s", default_module_name)
-            return getattr(module, f"{chain_name.upper()}_PROMPT")
-        except (ModuleNotFoundError, AttributeError) as e:
-            logging.critical("Error loading default prompt: %s", e)
-            # Fallback: try loading from agent_<suffix>.prompts
-            try:
-                # use agent name as suffix
-                pkg = agent_name.split("_")[1]
-                # Load the agent-specific default prompt
-                fallback_module = f"agent_{pkg}.prompts.{chain_name}.default"
-                module = importlib.import_module(fallback_module)
-                logging.info("Loaded agent-specific default prompt: %s", fallback_module)
-                return getattr(module, f"{chain_name.upper()}_PROMPT")
-            except (ModuleNotFoundError, AttributeError) as e2:
-                logging.critical("Error loading agent-specific default prompt: %s", e2)
-                raise RuntimeError("Critical error: Unable to load any prompt")
+import importlib
+import logging
+import os
+import re
+import threading
+from string import Template
+
+# Re-read prompt modules whose file changed (development only; costs one stat per lookup)
+PROMPT_HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "0").lower() in ("1", "true", "yes")
+
+
+def _module_suffix(model_core: str) -> str:
+    """Turn a model alias into a module name ("gemini-2.0-flash" -> "gemini_2_0_flash")."""
+    return re.sub(r"\W", "_", model_core)
+
+
+class PromptTemplate:
+    """
+    Precompiled prompt.
+
+    Prompts are plain text; ``$variable`` placeholders (``string.Template``
+    syntax, so literal braces are safe) are found once at load time. A prompt
+    without placeholders renders to the very same string object every time,
+    which keeps it byte-stable for provider prompt caching.
+
+    Attributes:
+        text (str): Raw prompt text.
+        module_name (str): Module the prompt was loaded from.
+        variables (frozenset[str]): Placeholder names.
+    """
+
+    __slots__ = ("text", "module_name", "variables", "_template")
+
+    def __init__(self, text: str, module_name: str = ""):
+        self.text = text
+        self.module_name = module_name
+        self._template = Template(text)
+        self.variables = frozenset(
+            m.group("named") or m.group("braced")
+            for m in self._template.pattern.finditer(text)
+            if m.group("named") or m.group("braced")
+        )
+
+    def render(self, **variables) -> str:
+        """Fill the placeholders (``KeyError`` if one is missing)."""
+        if not self.variables:
+            return self.text
+        return self._template.substitute(variables)
+
+    def __str__(self):
+        return self.text
+
+
+class PromptRegistry:
+    """
+    Memoized prompt resolution.
+
+    ``get(chain_name, model_core, agent_name)`` looks for, in order:
+
+    1. ``prompts.<chain>.<model_core>`` (project-level override)
+    2. ``agent_<suffix>.prompts.<chain>.<model_core>``
+    3. ``prompts.<chain>.default``
+    4. ``agent_<suffix>.prompts.<chain>.default``
+
+    where ``<model_core>`` has non-identifier characters replaced by ``_``.
+    The first hit is compiled into a ``PromptTemplate`` and cached, so only
+    the first lookup of a key imports modules or logs. With ``hot_reload``
+    the resolved module is reloaded when its file's mtime changes.
+
+    Example:
+        ```python
+        prompt = PROMPT_REGISTRY.get("routes_agent", "gemini-2.0-flash", "agent_rutas")
+        system_prompt = prompt.render()
+        ```
+    """
+
+    def __init__(self, hot_reload: bool = PROMPT_HOT_RELOAD):
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    @staticmethod
+    def candidates(chain_name: str, model_core: str, agent_name: str):
+        """Return the module names tried for a prompt, in order."""
+        packages = ["prompts"]
+        if agent_name and "_" in agent_name:
+            packages.append(f"agent_{agent_name.split('_')[1]}.prompts")
+        variants = [_module_suffix(model_core)] if model_core else []
+        variants.append("default")
+        return [f"{package}.{chain_name}.{variant}" for variant in variants for package in packages]
+
+    def _resolve(self, chain_name: str, model_core: str, agent_name: str):
+        attribute = f"{chain_name.upper()}_PROMPT"
+        for module_name in self.candidates(chain_name, model_core, agent_name):
+            try:
+                module = importlib.import_module(module_name)
+            except ModuleNotFoundError:
+                continue
+            text = getattr(module, attribute, None)
+            if text is None:
+                continue
+            logging.info("Loaded prompt: %s", module_name)
+            return module, PromptTemplate(text, module_name), self._mtime(module)
+        logging.critical("Unable to load prompt %s for %s (%s)", chain_name, model_core, agent_name)
+        raise RuntimeError("Critical error: Unable to load any prompt")
+
+    @staticmethod
+    def _mtime(module):
+        path = getattr(module, "__file__", None)
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+
+    def get(self, chain_name: str, model_core: str = None, agent_name: str = "agent_rutas") -> PromptTemplate:
+        """
+        Return the compiled prompt for ``(chain_name, model_core, agent_name)``.
+
+        Args:
+            chain_name (str): Prompt chain (e.g. ``"routes_agent"``, ``"reflection"``).
+            model_core (str): Model alias, for per-model variants.
+            agent_name (str): Agent package name (e.g. ``"agent_rutas"``).
+
+        Returns:
+            PromptTemplate: Cached compiled prompt.
+
+        Raises:
+            RuntimeError: If no candidate module defines the prompt.
+        """
+        key = (chain_name, model_core, agent_name)
+        entry = self._cache.get(key)
+        if entry is not None and not self.hot_reload:
+            return entry[1]
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = self._resolve(chain_name, model_core, agent_name)
+                self._cache[key] = entry
+            elif self.hot_reload:
+                module, _, mtime = entry
+                current = self._mtime(module)
+                if current != mtime:
+                    module = importlib.reload(module)
+                    text = getattr(module, f"{chain_name.upper()}_PROMPT")
+                    logging.info("Reloaded prompt: %s", module.__name__)
+                    entry = (module, PromptTemplate(text, module.__name__), current)
+                    self._cache[key] = entry
+            return entry[1]
+
+    def clear(self):
+        """Forget every resolved prompt."""
+        with self._lock:
+            self._cache.clear()
+
+
+PROMPT_REGISTRY = PromptRegistry()
+
+
+def load_prompt(chain_name: str, model_core: str, agent_name: str) -> str:
+    """
+    Load the prompt for a given chain name and model core.
+
+    Resolution is memoized by ``PROMPT_REGISTRY``; see ``PromptRegistry``
+    for the lookup order.
+
+    Args:
+        chain_name (str): The name of the chain.
+        model_core (str): The core model to use.
+        agent_name (str): The agent package name (e.g. "agent_rutas").
+
+    Returns:
+        str: The loaded prompt.
+
+    Raises:
+        RuntimeError: If no prompt module can be found for the chain.
+    """
+    return PROMPT_REGISTRY.get(chain_name, model_core, agent_name).text
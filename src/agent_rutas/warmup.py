@@ -0,0 +1,193 @@
+"""
+Startup warmup and per-component readiness.
+
+Everything a replica would otherwise do on its first request runs at
+startup instead, each step in its own thread (a step waits for the one it
+depends on):
+
+- ``snapshot``: download and parse the ParteDiario (also loads the PDF backend).
+- ``semantic_index``: embed the route blocks (only with ``ROUTES_SEMANTIC_SEARCH``).
+- ``llm``: open the provider connection; Ollama models are loaded into memory.
+- ``prompt_prefix``: build the prompt prefix (creates the Gemini context cache).
+
+``/ready`` reports the state of each step and answers 200 once all of them
+finished. A failed step (e.g. the DPV site is down) does not keep the
+replica out of rotation, since requests already fail fast behind the
+circuit breaker, unless ``WARMUP_STRICT`` is set. ``/health`` stays a
+liveness check.
+"""
+import logging
+import os
+import threading
+import time
+
+from .utils.deadline import deadline_scope
+from .utils.metrics import COMPONENT_READY, WARMUP_DURATION
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+# Failed steps keep /ready at 503 only in strict mode
+WARMUP_STRICT = os.getenv("WARMUP_STRICT", "0").lower() in ("1", "true", "yes")
+# Time budget of each step (downloads and provider calls honour it as a deadline)
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "60"))
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+SKIPPED = "skipped"
+_GAUGE_VALUES = {PENDING: 0, RUNNING: 0, READY: 1, SKIPPED: 1, FAILED: -1}
+
+
+class WarmupSkipped(Exception):
+    """Raised by a step that does not apply to this configuration."""
+
+
+class Warmup:
+    """
+    Runs the warmup steps and tracks their readiness.
+
+    Args:
+        strict (bool): Whether a failed step makes the replica not ready.
+        timeout (float): Deadline, in seconds, of each step.
+    """
+
+    def __init__(self, strict=WARMUP_STRICT, timeout=WARMUP_TIMEOUT_SECONDS):
+        self.strict = strict
+        self.timeout = timeout
+        self._steps = {}
+        self._components = {}
+        self._done = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def add(self, name, func, after=None):
+        """
+        Register a step.
+
+        Args:
+            name (str): Component name reported by ``/ready``.
+            func (callable): Does the warmup; returns a short detail string.
+                Raises ``WarmupSkipped`` when it does not apply.
+            after (str): Step that must finish (in any state) first.
+        """
+        self._steps[name] = (func, after)
+        self._components[name] = {"status": PENDING}
+        self._done[name] = threading.Event()
+        COMPONENT_READY.labels(component=name).set(0)
+
+    def start(self):
+        """Run every step in a background thread; returns at once."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for name in self._steps:
+            threading.Thread(target=self._run_step, args=(name,), name=f"warmup-{name}", daemon=True).start()
+
+    def run(self):
+        """Run every step and wait for all of them (CLI, tests)."""
+        self.start()
+        self.wait()
+        return self.report()
+
+    def wait(self, timeout=None):
+        """Wait until every step finished; return whether they did."""
+        deadline = None if timeout is None else time.time() + timeout
+        for event in self._done.values():
+            left = None if deadline is None else max(0.0, deadline - time.time())
+            if not event.wait(left):
+                return False
+        return True
+
+    def _run_step(self, name):
+        func, after = self._steps[name]
+        if after in self._done:
+            self._done[after].wait()
+        self._set(name, status=RUNNING)
+        started = time.time()
+        try:
+            with deadline_scope(started + self.timeout):
+                detail = func()
+            status, detail = READY, detail or ""
+        except WarmupSkipped as e:
+            status, detail = SKIPPED, str(e)
+        except Exception as e:
+            logger.warning(f"Warmup of {name} failed: {e}")
+            status, detail = FAILED, f"{type(e).__name__}: {e}"
+        duration = time.time() - started
+        WARMUP_DURATION.labels(component=name).set(duration)
+        self._set(name, status=status, detail=detail, duration_ms=round(duration * 1000, 1))
+        logger.info(f"Warmup of {name}: {status} in {duration:.2f}s {detail}")
+        self._done[name].set()
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._components[name] = fields
+        COMPONENT_READY.labels(component=name).set(_GAUGE_VALUES[fields["status"]])
+
+    def ready(self):
+        """Whether every step finished (and, in strict mode, none failed)."""
+        with self._lock:
+            statuses = [component["status"] for component in self._components.values()]
+        if any(status in (PENDING, RUNNING) for status in statuses):
+            return False
+        return not (self.strict and FAILED in statuses)
+
+    def report(self):
+        """Readiness plus the state, detail and duration of each component."""
+        ready = self.ready()
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {"ready": ready, "components": components}
+
+
+def warm_snapshot():
+    """Fetch and parse the ParteDiario into the caches the tool reads."""
+    from .tools.pdf_backends import get_pdf_backend
+    from .tools.ruta import get_snapshot
+
+    backend = get_pdf_backend()
+    snapshot = get_snapshot()
+    return f"{len(snapshot.records)} rutas, actualizado {snapshot.actualizado or 'sin fecha'} ({backend.name})"
+
+
+def warm_semantic_index():
+    """Embed the route blocks of the current snapshot."""
+    from .tools.ruta import get_snapshot
+    from .tools.semantic import SEMANTIC_SEARCH_ENABLED, get_index
+
+    if not SEMANTIC_SEARCH_ENABLED:
+        raise WarmupSkipped("ROUTES_SEMANTIC_SEARCH desactivado")
+    index = get_index(get_snapshot().texts())
+    return f"{len(index.codes)} rutas indexadas"
+
+
+def warm_llm():
+    """Open the provider connection of the agent's model."""
+    from .graph.nodes import factory, llm, model_core
+
+    return f"{model_core}: {factory.warmup(llm)}"
+
+
+def warm_prompt_prefix():
+    """Resolve the prompt prefix (creates the Gemini context cache)."""
+    from .graph.nodes import get_prompt_prefix
+
+    prefix = get_prompt_prefix()
+    prefix.maintain()
+    return type(prefix.resolve()).__name__
+
+
+def create_warmup(strict=WARMUP_STRICT, timeout=WARMUP_TIMEOUT_SECONDS):
+    """Build the warmup with the agent's steps."""
+    warmup = Warmup(strict=strict, timeout=timeout)
+    warmup.add("snapshot", warm_snapshot)
+    warmup.add("semantic_index", warm_semantic_index, after="snapshot")
+    warmup.add("llm", warm_llm)
+    warmup.add("prompt_prefix", warm_prompt_prefix, after="llm")
+    return warmup
+
+
+WARMUP = create_warmup()
@@ -0,0 +1,73 @@
+"""
+Shared test setup.
+
+Tests run offline: the graph is pinned to the local ``fake-instant`` model
+before anything imports it, and the ParteDiario is replayed from synthetic
+PDFs built by ``benchmarks.fixtures`` (``ReplaySource``).
+"""
+import os
+import sys
+
+import dotenv
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT_DIR, "src"), ROOT_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# A developer .env must not redirect the tests to a real provider
+dotenv.load_dotenv = lambda *args, **kwargs: False
+os.environ["MODEL_CORE"] = "fake-instant"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["PARTE_DIARIO_SOURCE"] = "live"
+os.environ["SHARED_SNAPSHOT"] = "0"
+os.environ["ROUTES_SEMANTIC_SEARCH"] = "0"
+os.environ["PROFILE_API_ENABLED"] = "0"
+os.environ["WARMUP_ENABLED"] = "0"
+
+
+def make_pdf(n_routes=20, seed=0):
+    """Synthetic ParteDiario PDF and its route codes."""
+    from benchmarks.fixtures import build_pdf, synthetic_route_lines
+
+    lines, codes = synthetic_route_lines(n_routes, seed=seed)
+    return build_pdf(lines), codes
+
+
+@pytest.fixture
+def cache():
+    """Fresh in-memory cache backend for the test."""
+    from agent_rutas.utils.cache import InMemoryCache, get_cache, set_cache
+
+    previous = get_cache()
+    backend = InMemoryCache()
+    set_cache(backend)
+    yield backend
+    set_cache(previous)
+
+
+@pytest.fixture
+def replay(cache):
+    """
+    Serve synthetic ParteDiario PDFs to the tool.
+
+    Returns a function ``(n_routes=20, latency_ms=0, contents=None) ->
+    (source, codes)`` that installs a ``ReplaySource``.
+    """
+    from agent_rutas.tools import ruta, sources
+    from agent_rutas.tools.sources import ReplaySource, set_source
+
+    previous = sources._source
+
+    def install(n_routes=20, latency_ms=0, contents=None):
+        content, codes = make_pdf(n_routes)
+        source = ReplaySource(contents=contents or [content], latency_ms=latency_ms, order="cycle")
+        set_source(source)
+        return source, codes
+
+    ruta._last_good = None
+    yield install
+    ruta._last_good = None
+    ruta.DPV_BREAKER.record_success()
+    set_source(previous)
@@ -0,0 +1,244 @@
+"""A2A task stores and worker pool: transitions, eviction and task leases."""
+import threading
+import time
+
+import pytest
+
+from agent_rutas.a2a import (
+    InMemoryTaskStore,
+    QueueFullError,
+    SQLiteTaskStore,
+    TaskState,
+    TaskWorkerPool,
+    new_task,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def message(text="¿Está cortada la P013?"):
+    return {"role": "user", "parts": [{"text": text}]}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(clock=time.time, **kwargs):
+        if request.param == "memory":
+            return InMemoryTaskStore(clock=clock, **kwargs)
+        return SQLiteTaskStore(str(tmp_path / "tasks.db"), clock=clock, **kwargs)
+
+    return make
+
+
+def test_transitions_follow_allowed_states(make_store):
+    store = make_store()
+    task, created = store.create(new_task("t1", message()))
+    assert created and task["status"]["state"] == TaskState.SUBMITTED
+    assert store.create(new_task("t1", message("otra")))[1] is False
+
+    assert store.transition("t1", TaskState.WORKING, allowed_from={TaskState.SUBMITTED})
+    assert store.transition("t1", TaskState.WORKING, allowed_from={TaskState.SUBMITTED}) is None
+    done = store.transition("t1", TaskState.COMPLETED, answer="Transitable", allowed_from={TaskState.WORKING})
+    assert done["messages"][-1] == {"role": "agent", "parts": [{"text": "Transitable"}]}
+    assert store.transition("t1", TaskState.CANCELED, allowed_from=TaskState.PENDING) is None
+    assert store.get("t1")["status"]["state"] == TaskState.COMPLETED
+    assert store.transition("missing", TaskState.WORKING) is None
+
+
+def test_stores_evict_finished_tasks_first(make_store):
+    store = make_store(max_tasks=2)
+    store.create(new_task("a", message()))
+    store.create(new_task("b", message()))
+    store.transition("b", TaskState.COMPLETED, answer="ok")
+    store.create(new_task("c", message()))
+    assert store.get("a") is not None and store.get("b") is None
+
+
+def test_live_leases_are_not_adopted(make_store):
+    clock = Clock()
+    store = make_store(clock)
+    store.create(new_task("t1", message()), owner="a", lease=60)
+    assert store.expired() == []
+    assert store.adopt("t1", "b", lease=60) is None
+
+    clock.now += 50
+    assert store.renew("a", lease=60) == 1
+    clock.now += 50
+    assert store.expired() == []
+
+
+def test_expired_leases_move_to_the_new_owner(make_store):
+    clock = Clock()
+    store = make_store(clock)
+    store.create(new_task("t1", message()), owner="a", lease=60)
+    store.transition("t1", TaskState.WORKING, allowed_from={TaskState.SUBMITTED}, owner="a")
+
+    clock.now += 61
+    assert store.expired() == ["t1"]
+    adopted = store.adopt("t1", "b", lease=60)
+    assert adopted["status"]["state"] == TaskState.SUBMITTED
+    assert store.adopt("t1", "c", lease=60) is None
+    # The old owner lost the task: its result is not recorded
+    assert store.transition("t1", TaskState.COMPLETED, answer="x", owner="a") is None
+    assert store.transition("t1", TaskState.WORKING, allowed_from={TaskState.SUBMITTED}, owner="b")
+
+
+def test_tasks_without_lease_are_recovered(make_store):
+    store = make_store()
+    store.create(new_task("t1", message()))
+    assert store.expired() == ["t1"]
+
+
+def test_pools_sharing_a_database_run_each_task_once(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    runs = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def handler(task):
+        with lock:
+            runs.append(task["id"])
+        release.wait(5)
+        return "ok"
+
+    first = TaskWorkerPool(SQLiteTaskStore(path), handler, workers=1, lease=30)
+    second = TaskWorkerPool(SQLiteTaskStore(path), handler, workers=2, lease=30)
+    first.start()
+    for i in range(3):
+        first.submit(new_task(f"t{i}", message()))
+    second.start()
+    assert second.recover() == 0
+    release.set()
+
+    store = SQLiteTaskStore(path)
+    for _ in range(100):
+        if all(store.get(f"t{i}")["status"]["state"] == TaskState.COMPLETED for i in range(3)):
+            break
+        time.sleep(0.05)
+    first.stop()
+    second.stop()
+    assert sorted(runs) == ["t0", "t1", "t2"]
+
+
+def test_pool_adopts_the_tasks_of_a_dead_pool(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    clock = Clock()
+    dead = SQLiteTaskStore(path, clock=clock)
+    dead.create(new_task("t1", message()), owner="dead-pool", lease=30)
+
+    pool = TaskWorkerPool(SQLiteTaskStore(path, clock=clock), lambda task: "ok", workers=1, lease=30)
+    assert pool.recover() == 0
+    clock.now += 31
+    pool.start()
+    for _ in range(100):
+        if pool.get("t1")["status"]["state"] == TaskState.COMPLETED:
+            break
+        time.sleep(0.05)
+    pool.stop()
+    assert pool.get("t1")["status"]["state"] == TaskState.COMPLETED
+
+
+def test_canceled_queued_task_never_runs():
+    runs = []
+    pool = TaskWorkerPool(InMemoryTaskStore(), lambda task: runs.append(task["id"]) or "ok", workers=1)
+    pool.submit(new_task("t1", message()))
+    assert pool.cancel("t1")["status"]["state"] == TaskState.CANCELED
+    pool.start()
+    time.sleep(0.2)
+    pool.stop()
+    assert runs == []
+
+
+def test_full_queue_rejects_without_storing_so_a_retry_is_enqueued(make_store):
+    release = threading.Event()
+    pool = TaskWorkerPool(make_store(), lambda task: release.wait(5) and "ok", workers=1, max_queue=1)
+    pool.submit(new_task("t1", message()))
+    with pytest.raises(QueueFullError):
+        pool.submit(new_task("t2", message()))
+    assert pool.get("t2") is None
+
+    pool.start()
+    release.set()
+    deadline = time.time() + 5
+    while pool.get("t1")["status"]["state"] != TaskState.COMPLETED and time.time() < deadline:
+        time.sleep(0.01)
+    assert pool.submit(new_task("t2", message()))["status"]["state"] == TaskState.SUBMITTED
+    while pool.get("t2")["status"]["state"] != TaskState.COMPLETED and time.time() < deadline:
+        time.sleep(0.01)
+    pool.stop()
+    assert pool.get("t2")["status"]["state"] == TaskState.COMPLETED
+
+
+def test_task_that_loses_its_queue_slot_is_not_stored():
+    store = InMemoryTaskStore()
+    pool = TaskWorkerPool(store, lambda task: "ok", workers=1, max_queue=1)
+    create = store.create
+
+    def create_then_fill(task, **kwargs):
+        result = create(task, **kwargs)
+        pool._queue.put_nowait(None)
+        return result
+
+    store.create = create_then_fill
+    with pytest.raises(QueueFullError):
+        pool.submit(new_task("t1", message()))
+    assert pool.get("t1") is None
+
+
+@pytest.mark.parametrize(
+    "body, request_id",
+    [
+        ([{"id": "t1"}], None),
+        ({"message": message()}, None),
+        ({"id": "t1", "message": "¿Está cortada la P013?"}, "t1"),
+        ({"id": "t1", "message": {"parts": []}}, "t1"),
+        ({"id": "t1", "message": message(), "metadata": {"deadline_ms": "pronto"}}, "t1"),
+    ],
+)
+def test_tasks_send_rejects_invalid_params(body, request_id):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    response = TestClient(api.app).post("/tasks/send", json=body)
+    assert response.status_code == 400
+    assert response.json()["id"] == request_id
+    assert response.json()["error"]["code"] == -32602
+
+
+def test_tasks_send_rejects_a_body_that_is_not_json():
+    from fastapi.testclient import TestClient
+
+    import api
+
+    response = TestClient(api.app).post("/tasks/send", content=b"{no es json")
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == -32700
+
+
+def test_sqlite_store_migrates_databases_without_leases(tmp_path):
+    import json
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tasks (id TEXT PRIMARY KEY, state TEXT NOT NULL, body TEXT NOT NULL,"
+        " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute(
+        "INSERT INTO tasks (id, state, body) VALUES (?, ?, ?)",
+        ("t1", TaskState.WORKING, json.dumps(new_task("t1", message()))),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTaskStore(path)
+    assert store.expired() == ["t1"]
+    assert store.adopt("t1", "pool", lease=30)["status"]["state"] == TaskState.SUBMITTED
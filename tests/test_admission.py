@@ -0,0 +1,111 @@
+"""Admission controller: deadline rejection, priority, A2A share and latency recovery."""
+import threading
+import time
+
+import pytest
+
+from agent_rutas.utils.admission import A2A, CHAT, AdmissionController, AdmissionRejected, _Waiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def waiter(request_class, deadline, served):
+    return _Waiter(request_class, deadline, lambda: served.append(request_class))
+
+
+def test_idle_replica_admits_despite_a_slow_estimate():
+    clock = Clock()
+    controller = AdmissionController(max_in_flight=2, initial_latency=60, clock=clock)
+    with controller.admit_sync(CHAT, deadline=clock.now + 5):
+        # With a run in flight the stale estimate applies again
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.admit_sync(CHAT, deadline=clock.now + 5):
+                pass
+    assert rejected.value.reason == "deadline"
+    assert controller.in_flight == 0
+
+
+def test_expired_deadline_is_rejected_even_when_idle():
+    clock = Clock()
+    controller = AdmissionController(clock=clock)
+    with pytest.raises(AdmissionRejected):
+        with controller.admit_sync(CHAT, deadline=clock.now - 1):
+            pass
+
+
+def test_latency_estimate_decays_without_samples():
+    clock = Clock()
+    controller = AdmissionController(initial_latency=5, alpha=1.0, half_life=60, clock=clock)
+    controller._enter(_Waiter(CHAT, clock.now + 600, lambda: None))
+    controller._release(CHAT, elapsed=125)
+    assert controller.latency == pytest.approx(125)
+    clock.now += 60
+    assert controller.latency == pytest.approx(65)
+    clock.now += 600
+    assert controller.latency == pytest.approx(5, abs=0.2)
+
+
+def test_chat_goes_first_and_earliest_deadline_within_a_class():
+    clock = Clock()
+    controller = AdmissionController(max_in_flight=1, a2a_reserved=1, initial_latency=1, clock=clock)
+    order = []
+    assert controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    for name, request_class, deadline in (("late", CHAT, 90), ("a2a", A2A, 50), ("early", CHAT, 20)):
+        assert not controller._enter(_Waiter(request_class, clock.now + deadline, lambda n=name: order.append(n)))
+    for _ in range(3):
+        controller._release(CHAT)
+    assert order == ["early", "late", "a2a"]
+
+
+def test_a2a_gets_its_reserved_share_under_chat_load():
+    clock = Clock()
+    controller = AdmissionController(max_in_flight=2, a2a_reserved=1, initial_latency=1, clock=clock)
+    served = []
+    controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    controller._enter(waiter(A2A, clock.now + 100, served))
+    for _ in range(5):
+        controller._enter(waiter(CHAT, clock.now + 100, served))
+    controller._release(CHAT)
+    assert served == [A2A]
+    controller._release(CHAT)
+    assert served == [A2A, CHAT]
+
+
+def test_queue_full_and_unreachable_deadline():
+    clock = Clock()
+    controller = AdmissionController(max_in_flight=1, max_queue=1, initial_latency=10, clock=clock)
+    controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller._enter(_Waiter(CHAT, clock.now + 15, lambda: None))
+    assert rejected.value.reason == "deadline"
+    controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller._enter(_Waiter(CHAT, clock.now + 100, lambda: None))
+    assert rejected.value.reason == "queue_full" and rejected.value.retry_after >= 1
+
+
+def test_waiting_thread_is_admitted_when_a_slot_frees():
+    controller = AdmissionController(max_in_flight=1, initial_latency=0.01)
+    release = threading.Event()
+    entered = threading.Event()
+
+    def hold():
+        with controller.admit_sync(CHAT, deadline=time.time() + 5):
+            entered.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(5)
+    threading.Timer(0.1, release.set).start()
+    with controller.admit_sync(A2A, deadline=time.time() + 5):
+        assert controller.in_flight == 1
+    holder.join(5)
+    assert controller.in_flight == 0 and controller.queued == 0
@@ -0,0 +1,83 @@
+"""CLI batch mode: malformed lines, lazy submission and result records."""
+import io
+import json
+import threading
+
+import main
+
+
+def test_malformed_lines_become_error_items():
+    stream = io.StringIO(
+        "¿Está cortada la P013?\n"
+        "\n"
+        '{"id": "a", "question": "¿Y la P005?"}\n'
+        '{"id": "b", "question": \n'
+        '{"id": "c"}\n'
+        '{"question": "rutas disponibles"}\n'
+    )
+    items = list(main.read_questions(stream))
+    assert [item["id"] for item in items] == [0, "a", 2, "c", 4]
+    assert items[0]["question"] == "¿Está cortada la P013?"
+    assert "JSON inválido" in items[2]["error"] and "Línea 4" in items[2]["error"]
+    assert "question" in items[3]["error"] and "question" not in items[3]
+    assert items[4]["question"] == "rutas disponibles"
+
+
+def test_questions_that_are_not_text_become_error_items():
+    stream = io.StringIO(
+        '{"id": "a", "question": null}\n'
+        '{"id": "b", "question": 13}\n'
+        '{"id": "c", "question": "  "}\n'
+        '{"id": "d", "question": "¿Está cortada la P013?"}\n'
+    )
+    items = list(main.read_questions(stream))
+    assert [item["id"] for item in items] == ["a", "b", "c", "d"]
+    assert items[0]["error"] == "Línea 1: 'question' debe ser texto"
+    assert all("question" not in item and "debe ser texto" in item["error"] for item in items[:3])
+    assert items[3]["question"] == "¿Está cortada la P013?"
+
+
+def test_batch_continues_past_bad_lines(replay, tmp_path, capsys):
+    _, codes = replay(20)
+    source = tmp_path / "preguntas.jsonl"
+    source.write_text(
+        f'{{"id": "ok", "question": "estado de la {codes[0]}"}}\n'
+        "{roto\n"
+        '{"id": "sin-pregunta"}\n',
+        encoding="utf-8",
+    )
+    output = tmp_path / "resultados.jsonl"
+    failed = main.run_batch(str(source), str(output), parallel=2, timeout=30)
+    records = {r["id"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert failed == 2
+    assert records["ok"]["answer"] and records["ok"]["degraded"] is False
+    assert set(records[1]) == {"id", "error"}
+    assert "question" in records["sin-pregunta"]["error"]
+    assert "3 preguntas" in capsys.readouterr().err
+
+
+def test_questions_are_submitted_as_workers_free_up(tmp_path, monkeypatch):
+    parallel = 2
+    lock = threading.Lock()
+    state = {"read": 0, "answered": 0, "max_ahead": 0}
+
+    def questions(stream):
+        for i in range(50):
+            with lock:
+                state["read"] += 1
+                state["max_ahead"] = max(state["max_ahead"], state["read"] - state["answered"])
+            yield {"index": i, "id": i, "question": f"pregunta {i}"}
+
+    def answer(item, timeout):
+        with lock:
+            state["answered"] += 1
+        return {"id": item["id"], "answer": "ok"}
+
+    monkeypatch.setattr(main, "read_questions", questions)
+    monkeypatch.setattr(main, "answer_question", answer)
+    source = tmp_path / "vacio.txt"
+    source.write_text("", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    assert main.run_batch(str(source), str(output), parallel=parallel, timeout=0) == 0
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 50
+    assert state["max_ahead"] <= 2 * parallel + 1
@@ -0,0 +1,125 @@
+"""boto3 client registry: reuse per service/region/credentials, invalidation and refresh."""
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from botocore.credentials import RefreshableCredentials
+from botocore.stub import Stubber
+
+from agent_rutas.utils import boto_session
+from agent_rutas.utils.boto_session import ClientRegistry, get_ssm_parameter
+
+
+class FakeSessions:
+    """``get_boto3_session`` replacement: static-key sessions, one per call, recorded with their ENV."""
+
+    def __init__(self):
+        self.envs = []
+        self.credentials = None
+        self.stub = None
+
+    def __call__(self, ENV=None):
+        self.envs.append(ENV)
+        session = boto3.Session(aws_access_key_id=f"AKIA{ENV}", aws_secret_access_key="secret", region_name="us-east-1")
+        if self.credentials is not None:
+            session.get_credentials = lambda: self.credentials
+        if self.stub is not None:
+            create = session.client
+
+            def client(*args, **kwargs):
+                new = create(*args, **kwargs)
+                self.stub(new)
+                return new
+
+            session.client = client
+        return session
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    fake = FakeSessions()
+    monkeypatch.setattr(boto_session, "get_boto3_session", fake)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIATEST")
+    monkeypatch.delenv("AWS_SESSION_TOKEN", raising=False)
+    return fake
+
+
+def test_clients_are_shared_per_service_and_region(sessions):
+    registry = ClientRegistry()
+    ssm = registry.get_client("ssm", ENV="production")
+    assert registry.get_client("ssm", ENV="production") is ssm
+    assert registry.get_client("ssm", ENV="production", region_name="sa-east-1") is not ssm
+    assert registry.get_client("secretsmanager", ENV="production") is not ssm
+    assert registry.get_client("ssm", ENV="production", region_name="sa-east-1").meta.region_name == "sa-east-1"
+
+
+def test_environment_selects_the_session(sessions):
+    registry = ClientRegistry()
+    local = registry.get_client("ssm", ENV="local")
+    production = registry.get_client("ssm", ENV="production")
+    assert local is not production
+    assert sessions.envs == ["local", "production"]
+
+
+def test_rotated_session_token_gets_a_new_client(sessions, monkeypatch):
+    registry = ClientRegistry()
+    first = registry.get_client("ssm", ENV="production")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "rotated")
+    assert registry.get_client("ssm", ENV="production") is not first
+
+
+def test_invalidate_rebuilds_the_session_of_that_service(sessions):
+    registry = ClientRegistry()
+    ssm = registry.get_client("ssm", ENV="production")
+    other_region = registry.get_client("secretsmanager", ENV="production", region_name="sa-east-1")
+    registry.invalidate("ssm")
+    assert registry.get_client("ssm", ENV="production") is not ssm
+    assert len(sessions.envs) == 3
+    # Otra región usa otra sesión, que sigue vigente
+    assert registry.get_client("secretsmanager", ENV="production", region_name="sa-east-1") is other_region
+
+
+def test_expiring_credentials_rebuild_the_session(sessions):
+    def failed_refresh():
+        raise RuntimeError("sts unavailable")
+
+    sessions.credentials = RefreshableCredentials.create_from_metadata(
+        metadata={
+            "access_key": "AKIA",
+            "secret_key": "secret",
+            "token": "token",
+            "expiry_time": (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat(),
+        },
+        refresh_using=failed_refresh,
+        method="test",
+    )
+    registry = ClientRegistry()
+    first = registry.get_client("ssm", ENV="production")
+    assert registry.get_client("ssm", ENV="production") is not first
+    assert len(sessions.envs) == 2
+
+
+def test_static_credentials_are_kept(sessions):
+    registry = ClientRegistry()
+    registry.get_client("ssm", ENV="production")
+    registry.get_client("ssm", ENV="production")
+    assert len(sessions.envs) == 1
+
+
+def test_ssm_retries_once_with_a_new_client_on_expired_token(sessions, monkeypatch):
+    monkeypatch.setattr(boto_session, "CLIENT_REGISTRY", ClientRegistry())
+    responses = [
+        lambda stubber: stubber.add_client_error("get_parameter", service_error_code="ExpiredToken"),
+        lambda stubber: stubber.add_response(
+            "get_parameter", {"Parameter": {"Name": "/rutas/key", "Value": "valor"}}
+        ),
+    ]
+
+    def stub(client):
+        stubber = Stubber(client)
+        responses.pop(0)(stubber)
+        stubber.activate()
+
+    sessions.stub = stub
+    assert get_ssm_parameter("/rutas/key", ENV="production") == "valor"
+    assert not responses
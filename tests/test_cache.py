@@ -0,0 +1,96 @@
+"""Cache backends: serialization, TTL, LRU eviction, key versions and Redis failures."""
+import pytest
+
+from agent_rutas.utils import cache as cache_module
+from agent_rutas.utils.cache import InMemoryCache, NullCache, RedisCache, create_cache, dumps, loads, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenRedis:
+    """Client whose every call fails, like an unreachable server."""
+
+    def mget(self, keys):
+        raise ConnectionError("redis caído")
+
+    def pipeline(self, transaction=False):
+        raise ConnectionError("redis caído")
+
+    def delete(self, key):
+        raise ConnectionError("redis caído")
+
+
+def test_payloads_round_trip_and_compress_large_values():
+    small, large = {"a": 1}, "x" * 10_000
+    assert loads(dumps(small)) == small
+    assert dumps(large)[:1] == b"\x01" and len(dumps(large)) < 1000
+    assert loads(dumps(large)) == large
+
+
+def test_memory_entries_expire_after_their_ttl():
+    clock = Clock()
+    backend = InMemoryCache(clock=clock)
+    backend.set("tool", "k", "v", ttl=10)
+    assert backend.get("tool", "k") == "v"
+    clock.now = 10
+    assert backend.get("tool", "k") is None
+
+
+def test_memory_evicts_least_recently_used():
+    backend = InMemoryCache(max_entries=2)
+    backend.set("tool", "a", 1, ttl=60)
+    backend.set("tool", "b", 2, ttl=60)
+    backend.get("tool", "a")
+    backend.set("tool", "c", 3, ttl=60)
+    assert backend.get_many("tool", ["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+def test_memory_returns_copies_not_shared_objects():
+    backend = InMemoryCache()
+    value = {"routes": ["P001"]}
+    backend.set("answer", "k", value, ttl=60)
+    value["routes"].append("P002")
+    assert backend.get("answer", "k") == {"routes": ["P001"]}
+
+
+def test_set_many_and_non_positive_ttl():
+    backend = InMemoryCache()
+    backend.set_many("tool", {"a": 1, "b": 2}, ttl=60)
+    backend.set("tool", "c", 3, ttl=0)
+    assert backend.get_many("tool", ["a", "b", "c"]) == {"a": 1, "b": 2}
+    backend.delete("tool", "a")
+    assert backend.get("tool", "a", default="miss") == "miss"
+
+
+def test_namespace_version_bump_hides_old_entries(monkeypatch):
+    backend = InMemoryCache()
+    backend.set("snapshot", "k", "old", ttl=60)
+    monkeypatch.setitem(cache_module.NAMESPACE_VERSIONS, "snapshot", 99)
+    assert make_key("snapshot", "k").endswith("snapshot.v99:k")
+    assert backend.get("snapshot", "k") is None
+
+
+def test_null_cache_never_stores():
+    backend = NullCache()
+    backend.set("tool", "k", "v", ttl=60)
+    assert backend.get("tool", "k") is None
+
+
+def test_redis_errors_are_misses():
+    backend = RedisCache(client=BrokenRedis())
+    backend.set("tool", "k", "v", ttl=60)
+    backend.delete("tool", "k")
+    assert backend.get_many("tool", ["k", "j"]) == {}
+
+
+def test_create_cache_rejects_unknown_backends():
+    assert isinstance(create_cache("memory"), InMemoryCache)
+    assert isinstance(create_cache("none"), NullCache)
+    with pytest.raises(ValueError):
+        create_cache("memcached")
@@ -0,0 +1,98 @@
+"""Circuit breaker states and serving the last good ParteDiario while the DPV is down."""
+import threading
+import time
+
+import pytest
+
+from agent_rutas.tools import ruta
+from agent_rutas.tools.parte_diario import SnapshotError
+from agent_rutas.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test-open", failure_threshold=3, clock=Clock())
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+
+def test_without_probe_one_caller_tries_after_the_interval():
+    clock = Clock()
+    breaker = CircuitBreaker("test-half-open", failure_threshold=1, recovery_interval=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 9
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    # A failed trial call opens the circuit again at once
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_background_probe_closes_the_circuit():
+    attempts = []
+    recovered = threading.Event()
+
+    def probe():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RuntimeError("sigue caída")
+        recovered.set()
+
+    breaker = CircuitBreaker("test-probe", failure_threshold=1, recovery_interval=0.05, probe=probe)
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert recovered.wait(2)
+    for _ in range(50):
+        if breaker.state == CLOSED:
+            break
+        time.sleep(0.01)
+    assert breaker.state == CLOSED and len(attempts) == 2
+
+
+def test_failed_fetch_serves_the_last_good_snapshot(replay, cache):
+    _, codes = replay(20)
+    fresh = ruta.load_snapshot()
+    cache.delete("snapshot", "parte_diario")
+    replay(contents=[b"no es un PDF"])
+    stale = ruta.load_snapshot()
+    assert list(stale.records) == list(fresh.records)
+    assert stale.update_info.startswith("⚠️ La web de la DPV no responde")
+
+
+def test_open_circuit_skips_the_source(replay, cache, monkeypatch):
+    source, _ = replay(20)
+    ruta.load_snapshot()
+    cache.delete("snapshot", "parte_diario")
+    calls = []
+    monkeypatch.setattr(source, "fetch", lambda: calls.append(1) or b"no es un PDF")
+    breaker = CircuitBreaker("test-dpv", failure_threshold=1)
+    monkeypatch.setattr(ruta, "DPV_BREAKER", breaker)
+    ruta.load_snapshot()
+    assert breaker.state == OPEN and len(calls) == 1
+    assert "último parte disponible" in ruta.load_snapshot().update_info
+    assert len(calls) == 1
+
+
+def test_no_previous_snapshot_raises(replay):
+    replay(contents=[b"no es un PDF"])
+    with pytest.raises(SnapshotError):
+        ruta.load_snapshot()
@@ -0,0 +1,114 @@
+"""ConfigCache: single-flight misses and stale values during an AWS outage."""
+import threading
+import time
+
+import pytest
+
+from agent_rutas.utils.config_cache import ConfigCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Fetcher:
+    """Counts calls; fails while ``down`` and can block until released."""
+
+    def __init__(self, value="v1"):
+        self.value = value
+        self.calls = 0
+        self.down = False
+        self.gate = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.down:
+            raise RuntimeError("AWS no responde")
+        return self.value
+
+
+def _drain(config):
+    """Wait for the background refreshes already submitted."""
+    config._executor.shutdown(wait=True)
+
+
+def test_concurrent_misses_share_one_fetch():
+    config = ConfigCache(ttl=60, refresh_ahead=0, client_factory=None)
+    fetch = Fetcher()
+    fetch.gate = threading.Event()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(config._get(("ssm", "p"), fetch)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    fetch.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["v1"] * 8
+    assert fetch.calls == 1
+
+
+def test_failed_miss_raises_and_clears_the_flight():
+    config = ConfigCache(ttl=60, client_factory=None)
+    fetch = Fetcher()
+    fetch.down = True
+    with pytest.raises(RuntimeError):
+        config._get(("ssm", "p"), fetch)
+    assert config._inflight == {}
+
+
+def test_outage_after_expiry_serves_stale_without_blocking():
+    clock = Clock()
+    config = ConfigCache(ttl=60, refresh_ahead=0, retry=10, client_factory=None, clock=clock)
+    fetch = Fetcher()
+    assert config._get(("ssm", "p"), fetch) == "v1"
+
+    fetch.down = True
+    clock.now += 61
+    # First read after expiry tries AWS once and keeps the old value
+    assert config._get(("ssm", "p"), fetch) == "v1"
+    assert fetch.calls == 2
+    entry = config._entries[("ssm", "p")]
+    assert entry.stale and entry.expires_at == clock.now + 10
+
+    # Within the retry window reads are plain hits
+    for _ in range(5):
+        assert config._get(("ssm", "p"), fetch) == "v1"
+    assert fetch.calls == 2
+
+    # After it, the stale value is returned at once and one background refresh retries
+    clock.now += 11
+    fetch.gate = threading.Event()
+    assert config._get(("ssm", "p"), fetch) == "v1"
+    assert config._get(("ssm", "p"), fetch) == "v1"
+    fetch.gate.set()
+    _drain(config)
+    assert fetch.calls == 3
+    assert config._entries[("ssm", "p")].stale
+
+
+def test_recovery_restores_the_normal_ttl():
+    clock = Clock()
+    config = ConfigCache(ttl=60, refresh_ahead=0, retry=10, client_factory=None, clock=clock)
+    fetch = Fetcher()
+    config._get(("ssm", "p"), fetch)
+    fetch.down = True
+    clock.now += 61
+    config._get(("ssm", "p"), fetch)
+
+    fetch.down, fetch.value = False, "v2"
+    clock.now += 11
+    assert config._get(("ssm", "p"), fetch) == "v1"
+    _drain(config)
+    entry = config._entries[("ssm", "p")]
+    assert entry.value == "v2" and not entry.stale
+    assert entry.expires_at == clock.now + 60
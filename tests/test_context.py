@@ -0,0 +1,73 @@
+"""Context trimming in ``graph.context``."""
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent_rutas.graph.context import (
+    build_context,
+    collapse_superseded_tool_results,
+    estimate_tokens,
+)
+
+
+def tool_round(i, query, result):
+    call = {"name": "buscar_estado_rutas", "args": {"query": query}, "id": f"c{i}", "type": "tool_call"}
+    return [AIMessage(content="", tool_calls=[call]), ToolMessage(content=result, tool_call_id=f"c{i}")]
+
+
+def turn(i, question, result="x" * 400, answer="respuesta"):
+    return [HumanMessage(content=question)] + tool_round(i, question, result) + [AIMessage(content=answer)]
+
+
+def tokens(messages):
+    return sum(estimate_tokens(m) for m in messages)
+
+
+def test_repeated_call_keeps_only_latest_result():
+    messages = [HumanMessage(content="q")] + tool_round(1, "P001", "viejo") + tool_round(2, "P001", "nuevo")
+    contents = [m.content for m in collapse_superseded_tool_results(messages) if isinstance(m, ToolMessage)]
+    assert "omitido" in contents[0]
+    assert contents[1] == "nuevo"
+
+
+def test_earlier_turn_results_are_collapsed_but_keep_their_ids():
+    messages = turn(1, "ruta P001") + turn(2, "ruta P002", result="actual")
+    result = build_context(messages, budget=10_000)
+    tool_messages = [m for m in result if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == ["c1", "c2"]
+    assert "omitido" in tool_messages[0].content
+    assert tool_messages[1].content == "actual"
+
+
+def test_oldest_turns_are_dropped_to_fit_the_budget():
+    system = SystemMessage(content="sistema")
+    messages = [system]
+    for i in range(20):
+        messages += turn(i, f"pregunta {i}", answer="r" * 200)
+    budget = 400
+    result = build_context(messages, budget)
+    assert result[0] is system
+    assert tokens(result) <= budget
+    assert result[-4].content == "pregunta 19"
+    # Whole turns only: every kept turn starts with its question
+    assert isinstance(result[1], HumanMessage)
+
+
+def test_last_turn_is_always_kept():
+    messages = turn(1, "vieja") + turn(2, "última", result="y" * 8000)
+    result = build_context(messages, budget=100)
+    assert result[0].content == "última"
+    assert result[2].content == "y" * 8000
+
+
+def test_oversized_last_turn_collapses_older_rounds():
+    messages = [HumanMessage(content="q")] + tool_round(1, "a", "x" * 4000) + tool_round(2, "b", "z" * 400)
+    result = build_context(messages, budget=600)
+    tool_messages = [m for m in result if isinstance(m, ToolMessage)]
+    assert "omitido" in tool_messages[0].content
+    assert tool_messages[1].content == "z" * 400
+
+
+def test_reserved_tokens_reduce_the_room():
+    messages = []
+    for i in range(5):
+        messages += turn(i, f"p{i}", answer="r" * 400)
+    assert len(build_context(messages, 2000, reserved_tokens=1500)) < len(build_context(messages, 2000))
@@ -0,0 +1,66 @@
+"""Degraded answers (stale data, fetch errors, deadline fallbacks) are flagged and never cached."""
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent_rutas.graph import graph
+from agent_rutas.tools import ruta
+from agent_rutas.tools.ruta import is_degraded_output
+from agent_rutas.utils.deadline import deadline_config
+
+
+def ask(question, deadline=None):
+    return graph.invoke({"messages": [HumanMessage(content=question)]}, config=deadline_config(deadline))
+
+
+@pytest.fixture
+def api(cache, monkeypatch):
+    import api as api_module
+
+    monkeypatch.setattr(api_module, "ANSWER_CACHE_TTL_SECONDS", 60)
+    return api_module
+
+
+def test_fresh_answer_is_not_degraded(replay):
+    _, codes = replay(20)
+    result = ask(f"estado de la {codes[0]}")
+    assert not result.get("degraded")
+
+
+def test_fetch_error_marks_the_run(replay):
+    replay(contents=[b"esto no es un PDF"])
+    result = ask("estado de la P001")
+    assert result["degraded"]
+    assert any(is_degraded_output(m.content) for m in result["messages"])
+
+
+def test_stale_snapshot_marks_the_run(replay, cache):
+    _, codes = replay(20)
+    ask(f"estado de la {codes[0]}")
+    cache.clear()
+    replay(contents=[b"esto no es un PDF"])
+    assert ruta._last_good is not None
+    result = ask(f"estado de la {codes[1]}")
+    assert result["degraded"]
+    assert any("último parte disponible" in str(m.content) for m in result["messages"])
+
+
+def test_deadline_fallback_marks_the_run(replay):
+    replay(20)
+    result = ask("estado de la P001", deadline=time.time() - 1)
+    assert result["degraded"]
+
+
+def test_degraded_answers_are_not_cached(api):
+    api.store_answer("¿P001?", "Se agotó el tiempo...", degraded=True)
+    assert api.get_cached_answer("¿P001?") is None
+    api.store_answer("¿P001?", "Transitable", degraded=False)
+    assert api.get_cached_answer("¿P001?") == "Transitable"
+
+
+def test_answer_task_skips_the_cache_for_degraded_runs(api, monkeypatch):
+    monkeypatch.setattr(api, "run_graph", lambda question, deadline=None: ("parcial", True))
+    task = {"messages": [{"role": "user", "parts": [{"text": "¿Está cortada la P013?"}]}]}
+    assert api.answer_task(task) == "parcial"
+    assert api.get_cached_answer("¿Está cortada la P013?") is None
@@ -0,0 +1,83 @@
+"""Embedder batching, vector cache and Bedrock client region."""
+import asyncio
+
+import numpy as np
+import pytest
+
+from agent_rutas.model.embeddings import Embedder
+from agent_rutas.utils.boto_session import CLIENT_REGISTRY
+
+
+class CountingEmbeddings:
+    """Deterministic provider double that records the batches it receives."""
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, batch):
+        self.batches.append(list(batch))
+        return [[float(len(text)), 1.0] for text in batch]
+
+    async def aembed_documents(self, batch):
+        return self.embed_documents(batch)
+
+    def embed_query(self, text):
+        return [float(len(text)), 0.0]
+
+
+@pytest.fixture
+def embedder(monkeypatch, tmp_path):
+    monkeypatch.setattr(Embedder, "_build_embb", lambda self: CountingEmbeddings())
+
+    def build(**kwargs):
+        kwargs.setdefault("cache_dir", str(tmp_path))
+        return Embedder(model_name="text-embedding-3-small", **kwargs)
+
+    return build
+
+
+def test_documents_are_batched_and_kept_in_order(embedder):
+    e = embedder(batch_size=2, max_concurrency=3)
+    matrix = e.embed_documents_array(["a", "bb", "ccc", "dddd", "eeeee"])
+    assert matrix.dtype == np.float32
+    assert matrix[:, 0].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(len(b) for b in e.embb.batches) == [1, 2, 2]
+
+
+def test_cached_vectors_skip_the_provider(embedder):
+    embedder().embed_documents(["uno", "dos"])
+    e = embedder()
+    result = e.embed_documents(["dos", "tres", "uno", "tres"])
+    # Only the new text reaches the provider, once
+    assert e.embb.batches == [["tres"]]
+    assert [row[0] for row in result] == [3, 4, 3, 4]
+
+
+def test_async_variant_matches_sync(embedder):
+    e = embedder(cache_dir=None, batch_size=1)
+    docs = ["x", "yy", "zzz"]
+    assert asyncio.run(e.aembed_documents(docs)) == e.embed_documents(docs)
+
+
+@pytest.fixture
+def aws_env(monkeypatch):
+    monkeypatch.setenv("ENV", "production")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIATEST")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    CLIENT_REGISTRY.clear()
+    yield
+    CLIENT_REGISTRY.clear()
+
+
+def test_registry_honours_explicit_region(aws_env):
+    default = CLIENT_REGISTRY.get_client("bedrock-runtime", "production")
+    other = CLIENT_REGISTRY.get_client("bedrock-runtime", "production", region_name="eu-west-1")
+    assert default.meta.region_name == "us-east-1"
+    assert other.meta.region_name == "eu-west-1"
+    assert CLIENT_REGISTRY.get_client("bedrock-runtime", "production", region_name="eu-west-1") is other
+
+
+def test_bedrock_embedder_uses_its_region(aws_env):
+    e = Embedder(model_name="amazon-titan-embed", region_name="sa-east-1")
+    assert e.embb.client.meta.region_name == "sa-east-1"
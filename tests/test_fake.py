@@ -0,0 +1,92 @@
+"""Scripted fake provider: tool-call script, placeholders, latency and token usage."""
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent_rutas.model.fake import FakeChatModel, load_script
+from agent_rutas.model.llm import ModelFactory
+
+
+def test_default_script_calls_the_tool_then_answers():
+    llm = FakeChatModel()
+    first = llm.invoke([HumanMessage(content="estado de la P013")])
+    assert first.content == ""
+    assert first.tool_calls[0]["name"] == "buscar_estado_rutas"
+    assert first.tool_calls[0]["args"] == {"query": "estado de la P013"}
+
+    history = [
+        HumanMessage(content="estado de la P013"),
+        first,
+        ToolMessage(content="P013 TRANSITABLE", tool_call_id=first.tool_calls[0]["id"]),
+    ]
+    second = llm.invoke(history)
+    assert second.content == "Según el parte diario de la DPV: P013 TRANSITABLE"
+    assert not second.tool_calls
+
+
+def test_script_step_restarts_on_each_user_turn():
+    llm = FakeChatModel()
+    history = [HumanMessage(content="a"), AIMessage(content="respuesta"), HumanMessage(content="b")]
+    assert llm.invoke(history).tool_calls[0]["args"] == {"query": "b"}
+
+
+def test_tool_result_is_truncated():
+    llm = FakeChatModel(script=[{"content": "{tool_result}"}], max_tool_result_chars=5)
+    message = llm.invoke([HumanMessage(content="q"), ToolMessage(content="0123456789", tool_call_id="t")])
+    assert message.content == "01234"
+
+
+def test_load_script_reads_steps_and_rejects_empty(tmp_path):
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps([{"content": "Hola {question}"}]), encoding="utf-8")
+    assert load_script(str(path)) == [{"content": "Hola {question}"}]
+    path.write_text("[]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_script(str(path))
+
+
+def test_latency_is_reproducible_per_conversation():
+    llm = FakeChatModel(latency={"distribution": "uniform", "min_ms": 10, "max_ms": 50}, seed=3)
+    messages = [HumanMessage(content="ruta P040")]
+    delay = llm._sample_latency(messages)
+    assert 0.01 <= delay <= 0.05
+    assert llm._sample_latency(messages) == delay
+    assert FakeChatModel(latency={"distribution": "normal", "mean_ms": -100})._sample_latency(messages) == 0.0
+    with pytest.raises(ValueError):
+        FakeChatModel(latency={"distribution": "pareto"})._sample_latency(messages)
+
+
+def test_constant_latency_is_slept_sync_and_async():
+    llm = FakeChatModel(latency={"distribution": "constant", "ms": 50})
+    start = time.perf_counter()
+    llm.invoke([HumanMessage(content="q")])
+    assert time.perf_counter() - start >= 0.05
+    start = time.perf_counter()
+    asyncio.run(llm.ainvoke([HumanMessage(content="q")]))
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_token_usage_and_prompt_cache():
+    llm = FakeChatModel(input_tokens=100, output_tokens=7, prompt_cache_min_tokens=100)
+    small = SystemMessage(content=[{"type": "text", "text": "x" * 396, "cache_control": {"type": "ephemeral"}}])
+    assert "input_token_details" not in llm.invoke([small, HumanMessage(content="q")]).usage_metadata
+    system = SystemMessage(content=[{"type": "text", "text": "x" * 400, "cache_control": {"type": "ephemeral"}}])
+    first = llm.invoke([system, HumanMessage(content="q")])
+    assert first.usage_metadata["input_tokens"] == 100
+    assert first.usage_metadata["output_tokens"] == 7
+    assert first.usage_metadata["input_token_details"] == {"cache_creation": 100}
+    second = llm.invoke([system, HumanMessage(content="otra")])
+    assert second.usage_metadata["input_token_details"] == {"cache_read": 100}
+
+
+def test_factory_builds_the_fake_model_from_config(tmp_path, monkeypatch):
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps([{"content": "fijo"}]), encoding="utf-8")
+    monkeypatch.setenv("FAKE_LLM_SCRIPT", str(path))
+    llm = ModelFactory(model_name="fake-instant").create_model()
+    assert isinstance(llm, FakeChatModel)
+    assert llm.latency == {"distribution": "constant", "ms": 0}
+    assert llm.invoke([HumanMessage(content="q")]).content == "fijo"
@@ -0,0 +1,72 @@
+"""Prometheus helpers in ``utils.metrics``."""
+from types import SimpleNamespace
+
+import pytest
+
+from agent_rutas.utils.metrics import (
+    IN_FLIGHT,
+    REGISTRY,
+    instrument_node,
+    record_cache,
+    record_llm_usage,
+    timed,
+    track_in_flight,
+    NODE_LATENCY,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_timed_observes_even_on_error():
+    before = sample("agent_rutas_node_latency_seconds_count", node="test-timed")
+    with pytest.raises(ValueError):
+        with timed(NODE_LATENCY, node="test-timed"):
+            raise ValueError
+    assert sample("agent_rutas_node_latency_seconds_count", node="test-timed") == before + 1
+
+
+def test_instrument_node_keeps_signature():
+    @instrument_node("test-node")
+    def node(state, config=None):
+        return config
+
+    before = sample("agent_rutas_node_latency_seconds_count", node="test-node")
+    assert node({}, config={"k": 1}) == {"k": 1}
+    assert node.__name__ == "node"
+    assert sample("agent_rutas_node_latency_seconds_count", node="test-node") == before + 1
+
+
+def test_track_in_flight_restores_gauge():
+    gauge = IN_FLIGHT.labels(endpoint="test")
+    with track_in_flight("test"):
+        assert gauge._value.get() == 1
+    assert gauge._value.get() == 0
+
+
+def test_record_llm_usage_counts_cache_tokens():
+    message = SimpleNamespace(usage_metadata={
+        "input_tokens": 10,
+        "output_tokens": 4,
+        "input_token_details": {"cache_read": 6},
+    })
+    labels = {"provider": "test", "model": "m"}
+    hits = sample("agent_rutas_cache_events_total", cache="llm_prompt", result="hit")
+    record_llm_usage("test", "m", message)
+    assert sample("agent_rutas_llm_tokens_total", kind="input", **labels) == 10
+    assert sample("agent_rutas_llm_tokens_total", kind="output", **labels) == 4
+    assert sample("agent_rutas_llm_tokens_total", kind="cache_read", **labels) == 6
+    assert sample("agent_rutas_cache_events_total", cache="llm_prompt", result="hit") == hits + 1
+
+
+def test_record_llm_usage_ignores_missing_usage():
+    record_llm_usage("test", "none", SimpleNamespace())
+    assert sample("agent_rutas_llm_tokens_total", provider="test", model="none", kind="input") == 0
+
+
+def test_record_cache_skips_zero_counts():
+    before = sample("agent_rutas_cache_events_total", cache="test", result="miss")
+    record_cache("test", hit=False, count=0)
+    record_cache("test", hit=False, count=2)
+    assert sample("agent_rutas_cache_events_total", cache="test", result="miss") == before + 2
@@ -0,0 +1,122 @@
+"""ParteDiario parsing: route segmentation, record fields and stale snapshots."""
+from datetime import datetime
+
+import pytest
+
+from agent_rutas.tools import parte_diario
+from agent_rutas.tools.parte_diario import (
+    DPV_TIMEZONE,
+    STALE_NOTICE,
+    extract_layout,
+    parse_record,
+    parse_snapshot,
+    rows_text,
+)
+from agent_rutas.tools.pdf_backends import available_backends, get_pdf_backend
+from benchmarks.fixtures import build_pdf, synthetic_route_lines
+
+HEADER = ["PARTE DIARIO DE RUTAS", "Información Actualizada a las 08:30hs. del 19/10/2026"]
+QUOTED_CODE = HEADER + [
+    "P001 Tramo: Zapala - Las Lajas",
+    "Estado: TRANSITABLE",
+    "Observaciones: desvío por P005 en km 12, calzada con hielo",
+    "P007 Tramo: Chos Malal - Andacollo",
+    "Estado: CORTADA",
+]
+
+
+def rendered(snapshot):
+    return {code: record.render() for code, record in snapshot.records.items()}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_rows_match_text_on_fixtures(backend):
+    lines, codes = synthetic_route_lines(150)
+    content = build_pdf(lines)
+    pdf = get_pdf_backend(backend)
+    rows = pdf.rows(content)
+    by_rows = parse_snapshot(rows_text(rows), rows)
+    assert list(by_rows.records) == codes
+    assert by_rows.actualizado == "08:30hs. 19/10/2026"
+    assert rendered(by_rows) == rendered(parse_snapshot(pdf.text(content)))
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_code_quoted_in_observations_is_not_a_route(backend):
+    content = build_pdf(QUOTED_CODE)
+    rows = get_pdf_backend(backend).rows(content)
+    snapshot = parse_snapshot(rows_text(rows), rows)
+    assert list(snapshot.records) == ["P001", "P007"]
+    assert snapshot.records["P001"].observaciones == "desvío por P005 en km 12, calzada con hielo"
+    assert snapshot.records["P007"].estado == "CORTADA"
+
+
+def test_text_segmentation_without_rows():
+    # Sin filas se mantiene el corte por código del texto plano
+    snapshot = parse_snapshot("\n".join(QUOTED_CODE))
+    assert list(snapshot.records) == ["P001", "P005", "P007"]
+
+
+def test_rows_without_routes_fall_back_to_text():
+    snapshot = parse_snapshot("P001 Tramo: A - B Estado: TRANSITABLE", rows=[["Ruta", "Tramo", "Estado"]])
+    assert list(snapshot.records) == ["P001"]
+
+
+def test_extract_layout_honours_segmentation_mode(monkeypatch):
+    content = build_pdf(QUOTED_CODE)
+    full_text, rows = extract_layout(content)
+    assert rows and full_text == rows_text(rows)
+    monkeypatch.setattr(parte_diario, "PDF_SEGMENTATION", "text")
+    full_text, rows = extract_layout(content)
+    assert rows is None and "P005" in full_text
+
+
+def test_fetch_snapshot_segments_from_rows(replay):
+    from agent_rutas.tools import ruta
+
+    replay(contents=[build_pdf(QUOTED_CODE)])
+    assert list(ruta.fetch_snapshot().records) == ["P001", "P007"]
+
+
+@pytest.mark.parametrize(
+    "body, estado, transitable",
+    [
+        ("Tramo: Zapala - Las Lajas Estado: Transitable con precaución Observaciones: hielo", "TRANSITABLE CON PRECAUCIÓN", True),
+        ("Tramo: A - B Estado: TRANSITABLE CON CADENAS", "TRANSITABLE CON CADENAS", True),
+        ("Tramo: A - B estado: intransitable Observaciones: nieve", "INTRANSITABLE", False),
+        ("Tramo: A - B CORTE TOTAL por derrumbe", "CORTE TOTAL", False),
+        ("Tramo: A - B Estado: Corte parcial", "CORTE PARCIAL", True),
+        ("Tramo: A - B Estado: transitable", "TRANSITABLE", True),
+        ("Tramo: A - B sin datos", "", None),
+    ],
+)
+def test_parse_record_status_variants(body, estado, transitable):
+    record = parse_record("P013", f"P013 {body}", actualizado="08:30hs. 19/10/2026")
+    assert record.estado == estado
+    assert record.transitable is transitable
+    assert record.tramo.startswith("A - B") or record.tramo == "Zapala - Las Lajas"
+
+
+def test_parse_record_fields_and_interning():
+    record = parse_record("P013", "P013\nTramo:  Zapala -\nLas Lajas Estado: TRANSITABLE Observaciones: calzada  húmeda")
+    assert (record.tramo, record.estado, record.observaciones) == ("Zapala - Las Lajas", "TRANSITABLE", "calzada húmeda")
+    assert record.render() == "P013 | Zapala - Las Lajas | TRANSITABLE | calzada húmeda"
+    assert record.short() == "P013 transitable"
+    other = parse_record("P014", "P014 Tramo: X - Y Estado: transitable")
+    assert other.estado is record.estado
+    assert not hasattr(record, "__dict__")
+
+
+def test_as_stale_prefixes_notice_with_age():
+    snapshot = parse_snapshot("\n".join(QUOTED_CODE))
+    now = datetime(2026, 10, 19, 11, 40, tzinfo=DPV_TIMEZONE)
+    stale = snapshot.as_stale(now=now)
+    assert stale.update_info.startswith(STALE_NOTICE.format(actualizado="08:30hs. 19/10/2026", age=", hace 3 h 10 min"))
+    assert stale.update_info.endswith(snapshot.update_info)
+    assert stale.records is snapshot.records
+    assert not snapshot.update_info.startswith("⚠️")
+
+
+def test_as_stale_without_date():
+    snapshot = parse_snapshot("P001 Tramo: A - B Estado: CORTADA")
+    assert snapshot.as_stale().update_info == STALE_NOTICE.format(actualizado="sin fecha", age="")
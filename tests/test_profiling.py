@@ -0,0 +1,85 @@
+"""Opt-in profiling: one active profile at a time, reports without server paths."""
+import os
+import threading
+import time
+
+from agent_rutas.utils import profiling
+from agent_rutas.utils.profiling import PROFILE_BUSY, maybe_profile, profile_run, public_report
+
+
+def test_profile_writes_reports(tmp_path):
+    with profile_run("unit", output_dir=str(tmp_path)) as report:
+        sum(range(10000))
+    assert os.path.exists(report["folded"])
+    assert os.path.exists(report["allocations"])
+
+
+def test_overlapping_profile_is_skipped(tmp_path):
+    inside = threading.Event()
+    release = threading.Event()
+    reports = {}
+
+    def first():
+        with profile_run("first", output_dir=str(tmp_path)) as report:
+            inside.set()
+            release.wait(5)
+        reports["first"] = report
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    inside.wait(5)
+    with profile_run("second", output_dir=str(tmp_path)) as report:
+        pass
+    release.set()
+    thread.join()
+    assert report == {"skipped": PROFILE_BUSY}
+    assert "allocations" in reports["first"]
+    # The lock is free again once the first profile ended
+    with profile_run("third", output_dir=str(tmp_path)) as report:
+        pass
+    assert "folded" in report
+
+
+def test_maybe_profile_disabled_is_noop():
+    with maybe_profile(False) as report:
+        pass
+    assert report == {}
+    assert not profiling._active.locked()
+
+
+def test_public_report_hides_directories():
+    report = public_report({"folded": "/srv/profiles/a.folded", "allocations": "/srv/b.txt", "elapsed_seconds": 1})
+    assert report == {"folded": "a.folded", "allocations": "b.txt", "elapsed_seconds": 1}
+
+
+def test_api_ignores_profile_header_by_default(replay):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    replay()
+    assert api.PROFILE_API_ENABLED is False
+    with TestClient(api.app) as client:
+        response = client.post(
+            "/api/chat",
+            json={"input_question": "estado de la P001", "user_id": "u"},
+            headers={"X-Profile": "1"},
+        )
+    assert response.status_code == 200
+    assert "profile" not in response.json()["metadata"]
+
+
+def test_profile_samples_worker_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def busy():
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            sum(range(1000))
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="unit-worker") as pool:
+        with profile_run("threads", output_dir=str(tmp_path)) as report:
+            pool.submit(busy).result()
+    with open(report["folded"], encoding="utf-8") as f:
+        stacks = [line.rsplit(" ", 1)[0] for line in f]
+    assert any(stack.startswith("[unit-worker") and "busy (" in stack for stack in stacks)
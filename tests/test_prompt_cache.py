@@ -0,0 +1,257 @@
+"""Prompt prefix strategies, in particular the Gemini context cache lifecycle."""
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agent_rutas.model.llm import ModelFactory
+from agent_rutas.model.prompt_cache import (
+    CachedContentPrompt,
+    CachePointPrompt,
+    ContextCachePrompt,
+    PlainPrompt,
+    context_cache_supported,
+    gemini_tool,
+    is_cache_missing,
+    is_invalid_argument,
+    prefix_tokens,
+)
+from agent_rutas.tools import buscar_estado_rutas
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGemini(ContextCachePrompt):
+    """ContextCachePrompt with the Gemini API replaced by counters."""
+
+    def __init__(self, clock, fail_create=0, fail_extend=False, create_error=None, background=False):
+        super().__init__("SYSTEM", [], "gemini-test", "key", ttl_seconds=3600, refresh_seconds=300,
+                         retry_seconds=60, clock=clock, background=background)
+        self.created = 0
+        self.extended = 0
+        self.fail_create = fail_create
+        self.fail_extend = fail_extend
+        self.create_error = create_error or RuntimeError("503 unavailable")
+
+    def _create_cache(self):
+        self.created += 1
+        if self.fail_create:
+            self.fail_create -= 1
+            raise self.create_error
+        return f"cachedContents/{self.created}"
+
+    def _extend_cache(self, name):
+        self.extended += 1
+        return not self.fail_extend
+
+
+class NotFound(Exception):
+    pass
+
+
+class FakeLLM:
+    """Records how it was bound; the cached binding can be made to fail."""
+
+    def __init__(self, cached_error=None):
+        self.cached_error = cached_error
+        self.calls = []
+
+    def bind(self, **kwargs):
+        return FakeBound(self, kwargs)
+
+    def bind_tools(self, tools):
+        return FakeBound(self, {"tools": tools})
+
+
+class FakeBound:
+    def __init__(self, llm, kwargs):
+        self.llm = llm
+        self.kwargs = kwargs
+
+    def invoke(self, messages, config=None):
+        self.llm.calls.append((self.kwargs, messages))
+        if "cached_content" in self.kwargs and self.llm.cached_error:
+            raise self.llm.cached_error
+        return AIMessage(content="ok")
+
+
+def test_plain_prompt_replaces_incoming_system_message():
+    prompt = PlainPrompt("SYSTEM", [])
+    messages = prompt.messages([SystemMessage(content="old"), HumanMessage(content="hola")], "extra")
+    assert messages[0].content == "SYSTEM\nextra"
+    assert [m.content for m in messages[1:]] == ["hola"]
+
+
+def test_cache_point_marks_only_static_block():
+    blocks = CachePointPrompt("SYSTEM", []).system_message("extra").content
+    assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in blocks[1]
+
+
+def test_cache_is_extended_before_it_expires():
+    clock = Clock()
+    prompt = FakeGemini(clock)
+    assert prompt.resolve().cache_name == "cachedContents/1"
+    clock.now += 3600 - 200  # inside the refresh margin
+    assert prompt.resolve().cache_name == "cachedContents/1"
+    assert prompt.extended == 1
+    clock.now += 3000  # past the original expiry, still within the extended one
+    assert isinstance(prompt.resolve(), CachedContentPrompt)
+    assert prompt.created == 1
+
+
+def test_cache_is_recreated_when_extension_fails():
+    clock = Clock()
+    prompt = FakeGemini(clock, fail_extend=True)
+    prompt.resolve()
+    clock.now += 3500
+    assert prompt.resolve().cache_name == "cachedContents/2"
+
+
+def test_expired_cache_is_never_referenced():
+    clock = Clock()
+    prompt = FakeGemini(clock)
+    prompt.resolve()
+    clock.now += 4000
+    prompt._lock.acquire()  # another thread is refreshing
+    try:
+        assert type(prompt.resolve()) is PlainPrompt
+    finally:
+        prompt._lock.release()
+
+
+def test_failed_creation_is_retried_after_backoff():
+    clock = Clock()
+    prompt = FakeGemini(clock, fail_create=1)
+    assert type(prompt.resolve()) is PlainPrompt
+    clock.now += 30
+    assert type(prompt.resolve()) is PlainPrompt
+    assert prompt.created == 1
+    clock.now += 31
+    assert isinstance(prompt.resolve(), CachedContentPrompt)
+    assert prompt.created == 2
+
+
+def test_resolved_prefix_keeps_bind_and_messages_consistent():
+    clock = Clock()
+    prompt = FakeGemini(clock, fail_create=1)
+    resolved = prompt.resolve()
+    clock.now += 61
+    prompt.resolve()  # cache created meanwhile by another call
+    llm = FakeLLM()
+    resolved.bind(llm).invoke(resolved.messages([HumanMessage(content="hola")]))
+    kwargs, messages = llm.calls[0]
+    assert "tools" in kwargs
+    assert isinstance(messages[0], SystemMessage)
+
+
+def test_missing_cache_falls_back_to_full_prefix_and_is_recreated():
+    clock = Clock()
+    prompt = FakeGemini(clock)
+    resolved = prompt.resolve()
+    llm = FakeLLM(cached_error=NotFound("CachedContent not found"))
+    output = resolved.bind(llm).invoke(resolved.messages([HumanMessage(content="hola")], "extra"))
+    assert output.content == "ok"
+    kwargs, messages = llm.calls[-1]
+    assert "tools" in kwargs
+    assert messages[0].content == "SYSTEM"
+    assert prompt.cache_name is None
+    assert prompt.resolve().cache_name == "cachedContents/2"
+
+
+def test_other_errors_are_not_swallowed():
+    prompt = FakeGemini(Clock())
+    resolved = prompt.resolve()
+    llm = FakeLLM(cached_error=ValueError("quota"))
+    with pytest.raises(ValueError):
+        resolved.bind(llm).invoke([HumanMessage(content="hola")])
+
+
+def test_is_cache_missing():
+    assert is_cache_missing(NotFound("x"))
+    assert is_cache_missing(Exception("400 CachedContent not found (or permission denied)"))
+    assert not is_cache_missing(Exception("429 quota exceeded"))
+
+
+def test_concurrent_resolve_creates_one_cache():
+    prompt = FakeGemini(Clock())
+    threads = [threading.Thread(target=prompt.resolve) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert prompt.created == 1
+
+
+class InvalidArgument(Exception):
+    pass
+
+
+def test_invalid_argument_disables_the_cache_for_good():
+    clock = Clock()
+    prompt = FakeGemini(clock, fail_create=1, create_error=InvalidArgument("400 Cached content is too small"))
+    assert type(prompt.resolve()) is PlainPrompt
+    clock.now += 10_000
+    assert type(prompt.resolve()) is PlainPrompt
+    assert prompt.created == 1
+    assert prompt.disabled
+
+
+def test_is_invalid_argument():
+    assert is_invalid_argument(InvalidArgument("x"))
+    assert is_invalid_argument(Exception("400 Request contains an invalid argument."))
+    assert not is_invalid_argument(Exception("503 Service unavailable"))
+
+
+def test_resolve_never_waits_for_gemini():
+    release = threading.Event()
+
+    class SlowGemini(FakeGemini):
+        def _create_cache(self):
+            release.wait(5)
+            return super()._create_cache()
+
+    prompt = SlowGemini(Clock(), background=True)
+    start = time.perf_counter()
+    assert type(prompt.resolve()) is PlainPrompt
+    assert time.perf_counter() - start < 1
+    release.set()
+    for _ in range(100):
+        if prompt.cache_name:
+            break
+        time.sleep(0.01)
+    assert isinstance(prompt.resolve(), CachedContentPrompt)
+    assert prompt.created == 1
+
+
+def test_maintain_creates_the_cache_synchronously():
+    prompt = FakeGemini(Clock(), background=True)
+    prompt.maintain()
+    assert prompt.cache_name == "cachedContents/1"
+
+
+def test_small_prefix_is_not_cached():
+    tokens = prefix_tokens("SYSTEM " * 10, [buscar_estado_rutas])
+    assert 0 < tokens < 1024
+    for model in ("fake-instant", "claude-3-5-sonnet-v2", "gemini-2.0-flash"):
+        assert type(ModelFactory(model_name=model).create_prompt_cache("SYSTEM", [buscar_estado_rutas])) is PlainPrompt
+    assert isinstance(ModelFactory(model_name="fake-instant").create_prompt_cache("x" * 8000, []), CachePointPrompt)
+
+
+def test_large_prefix_gets_the_gemini_context_cache():
+    prompt = ModelFactory(model_name="gemini-2.5-flash").create_prompt_cache("x" * 8000, [buscar_estado_rutas])
+    assert isinstance(prompt, ContextCachePrompt) is context_cache_supported()
+
+
+def test_gemini_tool_declares_the_tool_arguments():
+    declaration = gemini_tool([buscar_estado_rutas]).function_declarations[0]
+    assert declaration.name == "buscar_estado_rutas"
+    assert "query" in declaration.parameters.properties
+    assert "query" in declaration.parameters.required
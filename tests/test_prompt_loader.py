@@ -0,0 +1,86 @@
+"""PromptRegistry: lookup order, memoization, templates and hot reload."""
+import importlib
+import os
+import sys
+import uuid
+
+import pytest
+
+from agent_rutas.prompts import ROUTES_AGENT_PROMPT
+from agent_rutas.utils.prompt_loader import PromptRegistry, PromptTemplate, load_prompt
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """Write prompt modules of a throwaway ``agent_<name>`` package; returns ``(agent_name, write)``."""
+    name = "t" + uuid.uuid4().hex[:8]
+    package = tmp_path / f"agent_{name}"
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def write(chain, variant, text, mtime_ns=None):
+        directory = package / "prompts" / chain
+        directory.mkdir(parents=True, exist_ok=True)
+        for init in (package, package / "prompts", directory):
+            (init / "__init__.py").touch()
+        path = directory / f"{variant}.py"
+        path.write_text(f"{chain.upper()}_PROMPT = {text!r}\n", encoding="utf-8")
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        importlib.invalidate_caches()
+        return path
+
+    yield f"agent_{name}", write
+    for module in [m for m in sys.modules if m.startswith(f"agent_{name}")]:
+        del sys.modules[module]
+
+
+def test_model_variant_wins_over_default(agent):
+    agent_name, write = agent
+    write("demo", "default", "por defecto")
+    write("demo", "gemini_2_0_flash", "para gemini")
+    registry = PromptRegistry(hot_reload=False)
+    assert registry.get("demo", "gemini-2.0-flash", agent_name).text == "para gemini"
+    assert registry.get("demo", "gpt-4", agent_name).text == "por defecto"
+
+
+def test_lookups_are_memoized(agent, monkeypatch):
+    agent_name, write = agent
+    write("demo", "default", "hola")
+    registry = PromptRegistry(hot_reload=False)
+    first = registry.get("demo", "fake-instant", agent_name)
+    imports = []
+    monkeypatch.setattr(importlib, "import_module", lambda name: imports.append(name))
+    assert registry.get("demo", "fake-instant", agent_name) is first
+    assert imports == []
+
+
+def test_missing_prompt_raises(agent):
+    agent_name, _ = agent
+    with pytest.raises(RuntimeError):
+        PromptRegistry().get("inexistente", "fake-instant", agent_name)
+
+
+def test_hot_reload_follows_the_file_mtime(agent):
+    agent_name, write = agent
+    write("demo", "default", "versión 1", mtime_ns=1_000_000_000_000_000_000)
+    registry = PromptRegistry(hot_reload=True)
+    frozen = PromptRegistry(hot_reload=False)
+    assert registry.get("demo", None, agent_name).text == "versión 1"
+    assert frozen.get("demo", None, agent_name).text == "versión 1"
+    write("demo", "default", "versión 2", mtime_ns=1_000_000_100_000_000_000)
+    assert registry.get("demo", None, agent_name).text == "versión 2"
+    assert frozen.get("demo", None, agent_name).text == "versión 1"
+
+
+def test_template_placeholders():
+    static = PromptTemplate("Sin variables {ni llaves}")
+    assert static.render() is static.text
+    template = PromptTemplate("Ruta $code: ${estado}.")
+    assert template.variables == {"code", "estado"}
+    assert template.render(code="P013", estado="cortada") == "Ruta P013: cortada."
+    with pytest.raises(KeyError):
+        template.render(code="P013")
+
+
+def test_load_prompt_resolves_the_agent_prompt():
+    assert load_prompt("routes_agent", "fake-instant", "agent_rutas") == ROUTES_AGENT_PROMPT
@@ -0,0 +1,87 @@
+"""``buscar_estado_rutas`` on a replayed ParteDiario: lookups, budget and cursor pagination."""
+import re
+
+from agent_rutas.tools import ruta
+from agent_rutas.tools.ruta import MAX_OUTPUT_CHARS, _paginate, buscar_estado_rutas
+
+
+def ask(query, cursor=0):
+    return buscar_estado_rutas.invoke({"query": query, "cursor": cursor})
+
+
+def test_route_detail(replay):
+    _, codes = replay(20)
+    output = ask(f"estado de la {codes[3]}")
+    assert f"Información para la ruta {codes[3]}" in output
+    assert "Estado" in output or "estado" in output
+
+
+def test_listing_pages_cover_every_route_once(replay):
+    _, codes = replay(400)
+    seen = []
+    cursor = 0
+    for _ in range(100):
+        output = ask("rutas disponibles", cursor)
+        assert len(output) <= MAX_OUTPUT_CHARS
+        seen += re.findall(r"\b[PN]\d{3}\b", output.split("(código y estado):\n", 1)[1].split("\n(...")[0])
+        match = re.search(r"cursor=(\d+)", output)
+        if not match:
+            break
+        assert int(match.group(1)) > cursor
+        cursor = int(match.group(1))
+    assert sorted(seen) == sorted(codes)
+
+
+def test_cursor_past_the_end_returns_header_only(replay):
+    replay(20)
+    output = ask("rutas disponibles", cursor=10_000)
+    assert "cursor=" not in output
+
+
+def test_paginate_single_oversized_item_is_clipped():
+    output = _paginate("H:", ["x" * (MAX_OUTPUT_CHARS * 2), "y"])
+    assert len(output) <= MAX_OUTPUT_CHARS
+    assert output.startswith("H:x")
+
+
+def test_paginate_oversized_item_keeps_the_continuation():
+    output = _paginate("H:", ["x" * (MAX_OUTPUT_CHARS * 2), "y", "z"])
+    assert len(output) <= MAX_OUTPUT_CHARS
+    assert output.startswith("H:xxx")
+    assert output.endswith("(... 2 más. Para ver el resto, llamá de nuevo con la misma consulta y cursor=1)")
+    assert "x..." in output
+    assert _paginate("H:", ["x" * (MAX_OUTPUT_CHARS * 2), "y", "z"], cursor=1).startswith("H:y\nz")
+
+
+def test_paginate_fits_everything_uses_footer():
+    assert _paginate("H:", ["a", "b"], footer="\nfin") == "H:a\nb\nfin"
+
+
+def test_answers_are_cached_per_snapshot(replay, monkeypatch):
+    _, codes = replay(20)
+    first = ask(f"ruta {codes[0]}")
+    calls = []
+    original = ruta._answer
+    monkeypatch.setattr(ruta, "_answer", lambda *args: calls.append(args) or original(*args))
+    assert ask(f"ruta {codes[0]}") == first
+    assert ask("rutas disponibles") != first
+    assert len(calls) == 1
+
+
+def test_semantic_results_page_with_the_cursor(replay, monkeypatch):
+    _, codes = replay(400)
+    monkeypatch.setattr(ruta, "SEMANTIC_SEARCH_ENABLED", True)
+    monkeypatch.setattr(ruta, "semantic_search", lambda texts, query: list(texts))
+    seen = []
+    cursor = 0
+    for _ in range(100):
+        output = ask("zzz sin coincidencias literales", cursor)
+        assert output.count("Rutas más relevantes") == 1
+        assert len(output) <= MAX_OUTPUT_CHARS
+        seen += re.findall(r"^- ([PN]\d{3})\b", output, re.MULTILINE)
+        match = re.search(r"cursor=(\d+)", output)
+        if not match:
+            break
+        assert int(match.group(1)) > cursor
+        cursor = int(match.group(1))
+    assert sorted(seen) == sorted(codes)
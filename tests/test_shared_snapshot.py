@@ -0,0 +1,135 @@
+"""Host-wide snapshot file: encoding, refresher election and deadline-bounded waits."""
+import fcntl
+import time
+
+from agent_rutas.tools import ruta
+from agent_rutas.tools.parte_diario import STALE_NOTICE, RouteRecord, RouteSnapshot, SnapshotError
+from agent_rutas.tools.shared_snapshot import MappedSnapshot, SharedSnapshotStore
+from agent_rutas.utils.deadline import deadline_scope
+
+
+def make_snapshot(n=5, estado="HABILITADA"):
+    codes = [f"P{i:03d}" for i in range(n)]
+    records = {
+        code: RouteRecord(code, f"Tramo {code} – Neuquén", estado, "ripio", "08:30hs. 19/10/2026")
+        for code in codes
+    }
+    return RouteSnapshot("Última actualización: 08:30hs. 19/10/2026\n", "08:30hs. 19/10/2026", codes, records)
+
+
+class Fetcher:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.snapshot
+
+
+def make_store(path, fetch, **kwargs):
+    kwargs.setdefault("refresh_seconds", 3600)
+    kwargs.setdefault("max_age_seconds", 3600)
+    return SharedSnapshotStore(fetch=fetch, path=str(path), **kwargs)
+
+
+def test_round_trip_decodes_each_record_once_per_generation(tmp_path):
+    original = make_snapshot(4)
+    store = make_store(tmp_path / "snap.bin", Fetcher(original))
+    assert store.publish(original) == 1
+    mapped = store.latest()
+    assert mapped.update_info == original.update_info
+    assert mapped.codes == original.codes
+    assert mapped.texts() == original.texts()
+    assert mapped.records["P002"] is mapped.records["P002"]
+    assert store.latest().records["P002"] is mapped.records["P002"]
+
+    time.sleep(0.01)
+    store.publish(make_snapshot(4, estado="CORTADA"))
+    assert store.latest().records["P002"].estado == "CORTADA"
+    assert MappedSnapshot(store.path).generation == 2
+
+
+def test_one_process_is_elected_and_the_others_read_its_file(tmp_path):
+    path = tmp_path / "snap.bin"
+    first_fetch, second_fetch = Fetcher(make_snapshot(3)), Fetcher(make_snapshot(3))
+    first = make_store(path, first_fetch)
+    second = make_store(path, second_fetch)
+
+    assert first.get().codes == ["P000", "P001", "P002"]
+    assert first.is_refresher and first_fetch.calls == 1
+
+    snapshot = second.get()
+    assert not second.is_refresher
+    assert snapshot.codes == ["P000", "P001", "P002"]
+    assert second_fetch.calls == 0
+
+
+def test_wait_for_the_refresher_honours_the_deadline(tmp_path):
+    path = tmp_path / "snap.bin"
+    # Another process holds the election lock but never publishes
+    holder = open(str(path) + ".lock", "a+")
+    fcntl.flock(holder.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        fetch = Fetcher(make_snapshot(2))
+        store = make_store(path, fetch, wait_seconds=15)
+        started = time.monotonic()
+        with deadline_scope(time.time() + 0.5):
+            snapshot = store.get()
+        assert time.monotonic() - started < 2
+        assert fetch.calls == 1 and snapshot.codes == ["P000", "P001"]
+    finally:
+        holder.close()
+
+
+def test_expired_deadline_skips_the_wait(tmp_path):
+    path = tmp_path / "snap.bin"
+    holder = open(str(path) + ".lock", "a+")
+    fcntl.flock(holder.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        fetch = Fetcher(make_snapshot(2))
+        store = make_store(path, fetch, wait_seconds=15)
+        started = time.monotonic()
+        with deadline_scope(time.time() - 1):
+            store.get()
+        assert time.monotonic() - started < 0.5
+        assert fetch.calls == 1
+    finally:
+        holder.close()
+
+
+def test_breaker_open_skips_the_wait(tmp_path):
+    path = tmp_path / "snap.bin"
+    holder = open(str(path) + ".lock", "a+")
+    fcntl.flock(holder.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        fetch = Fetcher(make_snapshot(2))
+        store = make_store(path, fetch, wait_seconds=15, allow=lambda: False)
+        started = time.monotonic()
+        store.get()
+        assert time.monotonic() - started < 0.5
+        assert fetch.calls == 1
+    finally:
+        holder.close()
+
+
+def test_failed_refresh_serves_the_file_as_stale_without_publishing_it(tmp_path, monkeypatch):
+    path = tmp_path / "snap.bin"
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise SnapshotError("DPV caída")
+
+    store = make_store(path, failing, max_age_seconds=0.05)
+    store.publish(make_snapshot(3))
+    monkeypatch.setattr(ruta, "SHARED_SNAPSHOT", store)
+    time.sleep(0.1)
+
+    snapshot = ruta.get_snapshot()
+    assert calls
+    assert snapshot.update_info.startswith(STALE_NOTICE.split("(")[0])
+    assert snapshot.codes == ["P000", "P001", "P002"]
+    # The file still holds the fresh generation, without the notice
+    assert MappedSnapshot(store.path).generation == 1
+    assert not store.latest().update_info.startswith("⚠️")
@@ -0,0 +1,69 @@
+"""ParteDiario sources: recording to the archive and replaying it offline."""
+import json
+import os
+import time
+
+import pytest
+import requests
+
+from agent_rutas.tools import parte_diario
+from agent_rutas.tools.sources import RecordingSource, ReplaySource, create_source
+from agent_rutas.utils.deadline import deadline_scope
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Serve ``RecordingSource`` downloads from a list instead of the DPV site."""
+    queue = []
+    monkeypatch.setattr(parte_diario, "download_parte_diario", lambda url: queue.pop(0))
+    return queue
+
+
+def test_record_stores_each_pdf_once_and_logs_every_fetch(tmp_path, downloads):
+    downloads.extend([b"%PDF-a", b"%PDF-b", b"%PDF-a"])
+    source = RecordingSource(str(tmp_path))
+    assert [source.fetch() for _ in range(3)] == [b"%PDF-a", b"%PDF-b", b"%PDF-a"]
+    assert len(list(tmp_path.glob("*.pdf"))) == 2
+    with open(tmp_path / "index.jsonl", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["bytes"] for entry in entries] == [6, 6, 6]
+    assert entries[0]["file"] == entries[2]["file"]
+
+
+def test_replay_serves_the_latest_fetch(tmp_path, downloads):
+    downloads.extend([b"%PDF-a", b"%PDF-b", b"%PDF-a"])
+    recorder = RecordingSource(str(tmp_path))
+    for _ in range(3):
+        recorder.fetch()
+    # Un PDF copiado a mano, fuera del índice, queda primero
+    (tmp_path / "manual.pdf").write_bytes(b"%PDF-manual")
+    files = ReplaySource.archived_files(str(tmp_path))
+    assert os.path.basename(files[0]) == "manual.pdf"
+    assert ReplaySource(str(tmp_path)).fetch() == b"%PDF-a"
+
+
+def test_replay_cycle_and_single_file(tmp_path):
+    source = ReplaySource(contents=[b"1", b"2"], order="cycle")
+    assert [source.fetch() for _ in range(3)] == [b"1", b"2", b"1"]
+    pdf = tmp_path / "parte.pdf"
+    pdf.write_bytes(b"%PDF-single")
+    assert ReplaySource(str(pdf)).fetch() == b"%PDF-single"
+
+
+def test_replay_without_pdfs_fails(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReplaySource(str(tmp_path))
+
+
+def test_replay_latency_honours_the_deadline():
+    source = ReplaySource(contents=[b"%PDF"], latency_ms=2000)
+    start = time.monotonic()
+    with deadline_scope(time.time() + 0.5):
+        with pytest.raises(requests.Timeout):
+            source.fetch()
+    assert time.monotonic() - start < 1.5
+
+
+def test_create_source_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        create_source("ftp")
@@ -0,0 +1,82 @@
+"""Per-turn state: reducers, loop detection and resets across turns of one thread."""
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from agent_rutas.graph import nodes
+from agent_rutas.graph.graph import builder
+from agent_rutas.graph.state import RESET, any_or_reset, append_or_reset, merge_memo, round_signature, tool_call_key
+from agent_rutas.utils.deadline import deadline_config
+
+
+def test_reducers_accumulate_and_reset():
+    assert merge_memo({"a": 1}, {"b": 2}) == {"a": 1, "b": 2}
+    assert merge_memo({"a": 1}, {}) == {"a": 1}
+    assert merge_memo({"a": 1}, RESET) == {}
+    assert append_or_reset(["x"], ["y"]) == ["x", "y"]
+    assert append_or_reset(["x"], RESET) == []
+    assert any_or_reset(True, False) is True
+    assert any_or_reset(True, RESET) is False
+
+
+def test_call_keys_ignore_case_whitespace_and_order():
+    assert tool_call_key("buscar", {"query": "Ruta  P001"}) == tool_call_key("buscar", {"query": "ruta p001"})
+    first = [{"name": "a", "args": {"q": 1}}, {"name": "b", "args": {}}]
+    assert round_signature(first) == round_signature(list(reversed(first)))
+
+
+def call(query, call_id="c1"):
+    return AIMessage(content="", tool_calls=[{"name": "buscar_estado_rutas", "args": {"query": query}, "id": call_id}])
+
+
+def test_repeated_round_goes_to_finalize():
+    state = {
+        "messages": [HumanMessage(content="P001"), call("P001")],
+        "tool_rounds": 1,
+        "round_signatures": [round_signature(call("P001").tool_calls)],
+    }
+    assert nodes.should_continue(state, config={}) == "finalize"
+    state["round_signatures"] = []
+    assert nodes.should_continue(state, config={}) == "tools"
+    state["tool_rounds"] = nodes.MAX_TOOL_ROUNDS
+    assert nodes.should_continue(state, config={}) == "finalize"
+
+
+def test_new_turn_reset_only_on_human_messages():
+    assert nodes.new_turn_reset({"messages": [HumanMessage(content="hola")]})["tool_rounds"] == 0
+    assert nodes.new_turn_reset({"messages": [HumanMessage(content="hola"), ToolMessage(content="x", tool_call_id="1")]}) == {}
+
+
+def test_partial_answer_ignores_tool_output_of_earlier_turns():
+    messages = [
+        HumanMessage(content="P001"),
+        call("P001"),
+        ToolMessage(content="P001 cortada", tool_call_id="c1"),
+        AIMessage(content="La P001 está cortada."),
+        HumanMessage(content="¿Y la P002?"),
+    ]
+    assert nodes.partial_answer(messages).content == nodes.DEADLINE_NO_DATA
+
+
+def test_two_turns_on_one_thread_start_from_a_clean_slate(replay):
+    _, codes = replay(20)
+    graph = builder.compile(checkpointer=MemorySaver())
+    config = deadline_config(time.time() + 30, {"configurable": {"thread_id": "hilo-1"}})
+    question = f"estado de la {codes[0]}"
+
+    first = graph.invoke({"messages": [HumanMessage(content=question)]}, config=config)
+    assert first["tool_rounds"] == 1 and len(first["round_signatures"]) == 1
+
+    # Same question again: without the reset it would be taken for a repeated round
+    visited = [
+        node
+        for update in graph.stream({"messages": [HumanMessage(content=question)]}, config=config, stream_mode="updates")
+        for node in update
+    ]
+    assert visited == ["llm_call", "tools", "reflection"]
+    second = graph.get_state(config).values
+    assert second["tool_rounds"] == 1
+    assert second["round_signatures"] == first["round_signatures"]
+    assert not second["degraded"]
+    assert len(second["messages"]) == 2 * len(first["messages"])
@@ -0,0 +1,104 @@
+"""Concurrent tool execution in ``tool_node``: ordering, errors and timeouts."""
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from agent_rutas.graph import nodes
+from agent_rutas.utils.deadline import current_deadline
+
+
+@tool
+def eco(texto: str) -> str:
+    """Devuelve el texto."""
+    return texto
+
+
+@tool
+def lenta(segundos: float) -> str:
+    """Duerme ``segundos``."""
+    time.sleep(segundos)
+    return "tarde"
+
+
+@tool
+def plazo() -> str:
+    """Devuelve el deadline vigente."""
+    return str(current_deadline())
+
+
+@tool
+def rota() -> str:
+    """Falla siempre."""
+    raise RuntimeError("sin datos")
+
+
+@tool
+async def async_eco(texto: str) -> str:
+    """Devuelve el texto (async)."""
+    await asyncio.sleep(0.01)
+    return texto.upper()
+
+
+@tool
+async def async_bloqueante(segundos: float) -> str:
+    """Bloquea el event loop ``segundos`` (no cede el control)."""
+    time.sleep(segundos)
+    return "tarde"
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    monkeypatch.setattr(nodes, "TOOLS", [eco, lenta, plazo, rota, async_eco, async_bloqueante])
+    monkeypatch.setattr(nodes, "TOOL_TIMEOUT_SECONDS", 0.3)
+
+
+def call(name, i, **args):
+    return {"name": name, "args": args, "id": f"call-{i}", "type": "tool_call"}
+
+
+def run(calls, state=None):
+    state = {"messages": [AIMessage(content="", tool_calls=calls)], **(state or {})}
+    return nodes.tool_node(state, config={"configurable": {}})
+
+
+def test_results_keep_call_order(tools):
+    update = run([call("async_eco", 0, texto="a"), call("eco", 1, texto="b"), call("nada", 2)])
+    contents = [m.content for m in update["messages"]]
+    assert contents[:2] == ["A", "b"]
+    assert "not found" in contents[2]
+    assert [m.tool_call_id for m in update["messages"]] == ["call-0", "call-1", "call-2"]
+
+
+def test_errors_and_sync_timeouts_become_messages(tools):
+    update = run([call("rota", 0), call("lenta", 1, segundos=1.0), call("eco", 2, texto="ok")])
+    contents = [m.content for m in update["messages"]]
+    assert "sin datos" in contents[0]
+    assert "no respondió a tiempo" in contents[1]
+    assert contents[2] == "ok"
+    # Failures are not memoized, successes are
+    assert list(update["tool_memo"].values()) == ["ok"]
+
+
+def test_async_tool_blocking_the_loop_times_out(tools):
+    start = time.monotonic()
+    update = run([call("async_bloqueante", 0, segundos=2.0), call("eco", 1, texto="ok")])
+    assert time.monotonic() - start < 1.9
+    assert "no respondió a tiempo" in update["messages"][0].content
+    assert update["messages"][1].content == "ok"
+
+
+def test_sync_tools_run_under_the_tool_budget(tools):
+    before = time.time()
+    deadline = float(run([call("plazo", 0)])["messages"][0].content)
+    assert before < deadline <= time.time() + 0.3
+
+
+def test_repeated_calls_are_served_from_the_memo(tools):
+    first = run([call("eco", 0, texto="Hola")])
+    again = run([call("eco", 1, texto="  hola ")], state={"tool_memo": first["tool_memo"], "tool_rounds": 1})
+    assert again["messages"][0].content == "Hola"
+    assert again["tool_memo"] == {}
+    assert again["tool_rounds"] == 2
@@ -0,0 +1,60 @@
+"""Startup warmup: step ordering, readiness and the snapshot step on a replayed PDF."""
+import threading
+
+import pytest
+
+from agent_rutas.warmup import FAILED, READY, SKIPPED, Warmup, WarmupSkipped, warm_semantic_index, warm_snapshot
+
+
+def test_steps_report_status_and_wait_for_dependencies():
+    order = []
+    gate = threading.Event()
+
+    def first():
+        gate.wait(1)
+        order.append("first")
+        return "ok"
+
+    def second():
+        order.append("second")
+
+    def skipped():
+        raise WarmupSkipped("no aplica")
+
+    warmup = Warmup(strict=False, timeout=5)
+    warmup.add("first", first)
+    warmup.add("second", second, after="first")
+    warmup.add("skipped", skipped)
+    warmup.start()
+    assert not warmup.ready()
+    gate.set()
+    assert warmup.wait(5)
+    report = warmup.report()
+    assert order == ["first", "second"]
+    assert report["ready"]
+    assert report["components"]["first"]["status"] == READY
+    assert report["components"]["first"]["detail"] == "ok"
+    assert report["components"]["skipped"]["status"] == SKIPPED
+
+
+def test_failed_step_blocks_readiness_only_in_strict_mode():
+    def broken():
+        raise RuntimeError("DPV caída")
+
+    for strict in (False, True):
+        warmup = Warmup(strict=strict, timeout=5)
+        warmup.add("snapshot", broken)
+        report = warmup.run()
+        assert report["components"]["snapshot"]["status"] == FAILED
+        assert "RuntimeError: DPV caída" in report["components"]["snapshot"]["detail"]
+        assert report["ready"] is not strict
+
+
+def test_snapshot_step_parses_the_replayed_pdf(replay):
+    _, codes = replay(20)
+    assert warm_snapshot().startswith(f"{len(codes)} rutas, actualizado 08:30hs. 19/10/2026")
+
+
+def test_semantic_index_is_skipped_when_disabled():
+    with pytest.raises(WarmupSkipped, match="ROUTES_SEMANTIC_SEARCH"):
+        warm_semantic_index()